@@ -12,24 +12,541 @@
 
 from exceptions import InputError
 
+from typing import Union
 import xmlrpc.client
+import http.client
+import urllib.parse
+import contextlib
+import itertools
+import threading
+import logging
+import random
+import queue
+import json
+import gzip
+import time
 import ssl
+import re
 import os
 
-class API:
+# The path of Odoo's endpoint for each protocol that `API` can use
+PROTOCOLS = {
+    'xmlrpc': '/xmlrpc/2/object',
+    'jsonrpc': '/jsonrpc',
+}
+# The gzip level that request bodies are compressed with.
+# The markup compresses well at any level, and the lowest levels are the fastest
+GZIP_LEVEL = 1
+
+def chunked(items: list, size: int) -> list:
     """
-        Contains the methods required to connect to an Odoo XMLRPC instance
-        and to perform queries against the database.
+        Splits `items` into lists of at most `size` items, in order
+    """
+    items = list(items)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+def any_of(domain: list) -> list:
+    """
+        Joins the leaves of an Odoo `domain` with OR, for example
+        `[A, B, C]` becomes `['|', '|', A, B, C]`
+    """
+    return ['|'] * (len(domain) - 1) + list(domain)
+
+def ilike_match(pattern: str, value: str) -> bool:
+    """
+        Returns True if Odoo would match `value` with `('field', 'ilike', pattern)`.
+
+        That is a case insensitive containment check, where `%` and `_`
+        in `pattern` are SQL LIKE wildcards
+    """
+    if not isinstance(value, str):
+        return False
+    expression = ''.join(
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    )
+    return re.search(expression, value, re.IGNORECASE | re.DOTALL) is not None
+
+def dump_jsonrpc(arguments: tuple, request_id: int = 1) -> bytes:
+    """
+        Returns the body of a JSON-RPC request that calls Odoo's
+        `execute_kw` with `arguments`, the same as over XMLRPC
+    """
+    return json.dumps({
+        'jsonrpc': '2.0',
+        'method': 'call',
+        'params': {'service': 'object', 'method': 'execute_kw', 'args': list(arguments)},
+        'id': request_id,
+    }, separators=(',', ':')).encode('utf-8')
+
+def load_jsonrpc(body: bytes) -> object:
+    """
+        Returns the result of the JSON-RPC response `body`.
+        Errors are raised as `xmlrpc.client.Fault`, the same
+        as they would have been over XMLRPC, so that callers
+        handle both protocols alike
+    """
+    response = json.loads(body)
+    error = response.get('error')
+    if error:
+        data = error.get('data') or dict()
+        raise xmlrpc.client.Fault(error.get('code', 0), data.get('message') or error.get('message', ''))
+    return response.get('result')
+
+def compress(body: bytes, stats: 'PoolStats') -> tuple:
+    """
+        Returns a tuple of (`body` compressed with gzip, the seconds
+        that took), and counts it to `stats`
+    """
+    start = time.perf_counter()
+    compressed = gzip.compress(body, compresslevel=GZIP_LEVEL)
+    seconds = time.perf_counter() - start
+    stats.add_compression('request', len(body), len(compressed), seconds)
+    return compressed, seconds
+
+def decompress(body: bytes, stats: 'PoolStats') -> tuple:
+    """
+        Returns a tuple of (the gzip-compressed `body` decompressed,
+        the seconds that took), and counts it to `stats`
+    """
+    start = time.perf_counter()
+    decompressed = gzip.decompress(body)
+    seconds = time.perf_counter() - start
+    stats.add_compression('response', len(decompressed), len(body), seconds)
+    return decompressed, seconds
+
+class PoolStats:
+    """
+        Thread-safe counters describing how a `ConnectionPool` is being used.
+
+        `opened` - HTTP connections that had to be established
+        `reused` - requests that were sent over an already open keep-alive connection
+        `reconnects` - requests that were retried on a fresh connection after the old one dropped
+        `idle_closed` - connections that were closed for sitting idle longer than the pool allows
+        `compressed_requests` - request bodies that were compressed with gzip, see `compress`
+        `compressed_responses` - response bodies that arrived compressed with gzip, see `decompress`
+        `<request or response>_bytes_uncompressed` - the size of those bodies uncompressed
+        `<request or response>_bytes_compressed` - the size of those bodies compressed
+        `compress_seconds` and `decompress_seconds` - the time spent compressing and decompressing them
+    """
+
+    FIELDS = (
+        'opened', 'reused', 'reconnects', 'idle_closed',
+        'compressed_requests', 'request_bytes_uncompressed', 'request_bytes_compressed', 'compress_seconds',
+        'compressed_responses', 'response_bytes_uncompressed', 'response_bytes_compressed', 'decompress_seconds',
+    )
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counters = dict.fromkeys(self.FIELDS, 0)
+
+    def increment(self, field: str) -> None:
+        """
+            Adds one to the counter named `field`
+        """
+        with self._lock:
+            self.counters[field] += 1
+
+    def add_compression(self, direction: str, uncompressed: int, compressed: int, seconds: float) -> None:
+        """
+            Counts a body of `uncompressed` bytes that was compressed to,
+            or decompressed from, `compressed` bytes in `seconds`, where
+            `direction` is 'request' or 'response'
+        """
+        with self._lock:
+            self.counters['compressed_%ss' % (direction)] += 1
+            self.counters['%s_bytes_uncompressed' % (direction)] += uncompressed
+            self.counters['%s_bytes_compressed' % (direction)] += compressed
+            self.counters['compress_seconds' if direction == 'request' else 'decompress_seconds'] += seconds
+
+    def as_dict(self) -> dict:
+        """
+            Returns a copy of the counters
+        """
+        with self._lock:
+            return dict(self.counters)
+
+class AdaptiveLimit:
+    """
+        Works out how many requests may be in flight at once, from how
+        the server has been answering, by additive increase and
+        multiplicative decrease (AIMD):
+            - A success raises the limit by one while starting out, then
+                by `1 / limit`, which is about one more per round of requests
+            - A transient failure multiplies the limit by `decrease`
+            - So does a response whose smoothed latency is more than
+                `tolerance` times the fastest seen for that kind and size
+                of request, as the server is queueing them. That only
+                lowers it by a tenth. Sizes are compared by their power of
+                two, so that a batch of 500 is never held to the latency of
+                a batch of 1.
+
+        The limit stays between `minimum` and `maximum`, and is only
+        lowered once per round trip, as the requests that were already
+        in flight say nothing about the lower limit.
+
+        This only does the arithmetic, callers decide what a request is
+        and wait for a free slot. `on_success` and `on_failure` return
+        'increase' or 'decrease' when the whole number of slots changed,
+        so that the decision can be reported, and None otherwise.
+    """
+
+    def __init__(
+        self, minimum: int = 1, maximum: int = 4, initial: int = 1,
+        tolerance: float = 3.0, decrease: float = 0.5
+    ) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.tolerance = tolerance
+        self.decrease = decrease
+        self.slow_start = True
+
+        # Per kind and size of request, the fastest and the smoothed latency
+        self.fastest = dict()
+        self.smoothed = dict()
+        self.last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def slots(self) -> int:
+        """
+            The number of requests that may currently be in flight
+        """
+        return max(self.minimum, int(self.limit))
+
+    def _lower(self, factor: float, window: float) -> Union[str, None]:
+        now = time.monotonic()
+        if now - self.last_decrease < window:
+            return None
+        self.last_decrease = now
+        self.slow_start = False
+        slots = self.slots
+        self.limit = max(float(self.minimum), self.limit * factor)
+        return 'decrease' if self.slots < slots else None
+
+    def on_success(self, kind: tuple, latency: float, size: int = 1) -> Union[str, None]:
+        """
+            Records that a request of `kind`, for `size` records
+            sent or returned, took `latency` seconds
+        """
+        kind = kind + (int(size).bit_length(),)
+        with self._lock:
+            fastest = min(self.fastest.get(kind, latency), latency)
+            smoothed = self.smoothed.get(kind, latency) * 0.8 + latency * 0.2
+            self.fastest[kind] = fastest
+            self.smoothed[kind] = smoothed
+
+            if fastest > 0 and smoothed > fastest * self.tolerance:
+                return self._lower(0.9, smoothed)
+
+            slots = self.slots
+            self.limit = min(float(self.maximum), self.limit + (1.0 if self.slow_start else 1.0 / self.limit))
+            return 'increase' if self.slots > slots else None
+
+    def on_failure(self, kind: tuple) -> Union[str, None]:
+        """
+            Records that a request of `kind` failed in a way that
+            suggests the server is overloaded
+        """
+        with self._lock:
+            return self._lower(self.decrease, self.smoothed.get(kind, 0.0))
+
+class KeepAliveTransport(xmlrpc.client.Transport):
+    """
+        An XMLRPC transport that holds its HTTP/1.1 connection open between
+        requests, closes it once it has been idle for `idle_timeout` seconds,
+        and reconnects once when a reused connection turns out to be unusable.
+
+        Request bodies larger than `gzip_threshold` bytes are compressed
+        with gzip, and when `accept_gzip` is set, the server is asked to
+        compress its responses too.
+
+        Usage is reported to the `stats` (PoolStats) that is shared by the pool.
+        For the last request, the size of the request and response body as
+        sent is kept in `request_bytes` and `response_bytes`, their size
+        uncompressed in `uncompressed_bytes`, and the time spent compressing
+        and decompressing them in `gzip_seconds`.
+    """
+
+    def __init__(
+        self, stats: PoolStats, idle_timeout: float,
+        gzip_threshold: int = None, accept_gzip: bool = True, **kwargs: dict
+    ) -> None:
+        super().__init__(**kwargs)
+        self.stats = stats
+        self.idle_timeout = idle_timeout
+        self.encode_threshold = gzip_threshold
+        self.accept_gzip_encoding = accept_gzip
+        self.last_used = time.monotonic()
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.uncompressed_bytes = (0, 0)
+        self.gzip_seconds = 0.0
+
+    def make_connection(self, host: str) -> http.client.HTTPConnection:
+        """
+            Returns the open connection for `host` if it is still fresh,
+            otherwise a new one
+        """
+        if self._connection[1] is not None:
+            if time.monotonic() - self.last_used > self.idle_timeout:
+                self.stats.increment('idle_closed')
+                self.close()
+            elif host == self._connection[0]:
+                self.stats.increment('reused')
+                return self._connection[1]
+
+        self.stats.increment('opened')
+        return super().make_connection(host)
+
+    def request(self, host: str, handler: str, request_body: bytes, verbose: bool = False) -> tuple:
+        """
+            Sends the request, retrying once on a new connection if the
+            kept-alive one was dropped by the server or left in a state
+            that can't send a request. A failure on a fresh connection
+            is raised as-is.
+        """
+        self.request_bytes = len(request_body)
+        self.response_bytes = 0
+        self.uncompressed_bytes = (len(request_body), 0)
+        self.gzip_seconds = 0.0
+        for attempt in (0, 1):
+            kept_alive = self._connection[1] is not None
+            try:
+                return self.single_request(host, handler, request_body, verbose)
+            except (http.client.ImproperConnectionState, ConnectionError):
+                if attempt or not kept_alive:
+                    raise
+                self.close()
+                self.stats.increment('reconnects')
+            finally:
+                self.last_used = time.monotonic()
+
+    def send_content(self, connection: http.client.HTTPConnection, request_body: bytes) -> None:
+        """
+            Sends the `request_body`, compressed when it is
+            larger than `encode_threshold` bytes
+        """
+        if self.encode_threshold is not None and len(request_body) > self.encode_threshold:
+            request_body, seconds = compress(request_body, self.stats)
+            self.gzip_seconds += seconds
+            connection.putheader('Content-Encoding', 'gzip')
+        self.request_bytes = len(request_body)
+        connection.putheader('Content-Length', str(len(request_body)))
+        connection.endheaders(request_body)
+
+    def read_body(self, response: http.client.HTTPResponse) -> bytes:
+        """
+            Returns the body of the `response`, decompressed
+            if it was compressed, noting its size
+        """
+        body = response.read()
+        self.response_bytes = len(body)
+        if response.getheader('content-encoding', '') == 'gzip':
+            body, seconds = decompress(body, self.stats)
+            self.gzip_seconds += seconds
+        self.uncompressed_bytes = (self.uncompressed_bytes[0], len(body))
+        return body
+
+    def parse_response(self, response: http.client.HTTPResponse) -> tuple:
+        """
+            Parses the body of the `response`, see `read_body`
+        """
+        parser, unmarshaller = self.getparser()
+        parser.feed(self.read_body(response))
+        parser.close()
+        return unmarshaller.close()
+
+class SafeKeepAliveTransport(KeepAliveTransport, xmlrpc.client.SafeTransport):
+    """
+        The HTTPS version of `KeepAliveTransport`
+    """
+
+class JsonKeepAliveTransport(KeepAliveTransport):
+    """
+        A `KeepAliveTransport` for JSON-RPC, which returns
+        the body of each response as bytes, see `JsonRpcProxy`
+    """
+
+    def send_headers(self, connection: http.client.HTTPConnection, headers: list) -> None:
+        super().send_headers(connection, [
+            (name, 'application/json' if name == 'Content-Type' else value) for name, value in headers
+        ])
+
+    def parse_response(self, response: http.client.HTTPResponse) -> bytes:
+        return self.read_body(response)
+
+class SafeJsonKeepAliveTransport(JsonKeepAliveTransport, xmlrpc.client.SafeTransport):
+    """
+        The HTTPS version of `JsonKeepAliveTransport`
+    """
+
+class JsonRpcProxy:
+    """
+        The JSON-RPC counterpart of `xmlrpc.client.ServerProxy`, for
+        Odoo's `/jsonrpc` endpoint. Only `execute_kw` is supported,
+        which takes the same arguments and returns the same results.
+        Calling it with 'close' or 'transport' works the same as
+        calling a ServerProxy with them.
+    """
+
+    def __init__(self, endpoint: str, transport: JsonKeepAliveTransport) -> None:
+        url = urllib.parse.urlsplit(endpoint)
+        self._host = url.netloc
+        self._handler = url.path
+        self._transport = transport
+        self._ids = itertools.count(1)
+
+    def __call__(self, attribute: str) -> object:
+        if attribute == 'close':
+            return self._transport.close
+        if attribute == 'transport':
+            return self._transport
+        raise AttributeError('Attribute %r not found' % (attribute))
+
+    def execute_kw(self, *arguments: tuple) -> object:
+        """
+            Calls Odoo's `execute_kw` with `arguments`
+        """
+        body = dump_jsonrpc(arguments, next(self._ids))
+        return load_jsonrpc(self._transport.request(self._host, self._handler, body))
+
+class ConnectionPool:
+    """
+        A thread-safe pool of XMLRPC ServerProxy objects for `endpoint`,
+        each with its own keep-alive transport. When `protocol` is
+        'jsonrpc', the pool holds `JsonRpcProxy` objects instead.
+
+        `gzip_threshold` and `accept_gzip` are passed to each transport,
+        see `KeepAliveTransport`.
+
+        At most `size` proxies are created. When all of them are in use,
+        `acquire` blocks until one is released. The most recently used
+        proxy is handed out first, as its connection is the most likely
+        to still be open.
+    """
+
+    def __init__(
+        self, endpoint: str, size: int = 4, idle_timeout: float = 60.0,
+        context: ssl.SSLContext = None, protocol: str = 'xmlrpc',
+        gzip_threshold: int = None, accept_gzip: bool = True
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        if size < 1:
+            raise InputError('size', 'The connection pool needs room for at least one connection')
+
+        self.endpoint = endpoint
+        self.protocol = protocol
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.context = context
+        self.compression = {'gzip_threshold': gzip_threshold, 'accept_gzip': accept_gzip}
+        self.stats = PoolStats()
+
+        self._idle = queue.LifoQueue(maxsize=size)
+        self._lock = threading.Lock()
+        self._created = 0
+
+    def _new_proxy(self) -> xmlrpc.client.ServerProxy:
+        if self.protocol == 'jsonrpc':
+            if self.endpoint.startswith('https'):
+                transport = SafeJsonKeepAliveTransport(
+                    self.stats, self.idle_timeout, context=self.context, **self.compression
+                )
+            else:
+                transport = JsonKeepAliveTransport(self.stats, self.idle_timeout, **self.compression)
+            return JsonRpcProxy(self.endpoint, transport)
+
+        if self.endpoint.startswith('https'):
+            transport = SafeKeepAliveTransport(self.stats, self.idle_timeout, context=self.context, **self.compression)
+        else:
+            transport = KeepAliveTransport(self.stats, self.idle_timeout, **self.compression)
+        return xmlrpc.client.ServerProxy(self.endpoint, transport=transport)
+
+    def acquire(self) -> xmlrpc.client.ServerProxy:
+        """
+            Returns an idle proxy, creating one if the pool isn't full yet
+        """
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return self._new_proxy()
+
+        return self._idle.get()
+
+    def release(self, proxy: xmlrpc.client.ServerProxy) -> None:
+        """
+            Returns `proxy` to the pool so that its connection can be reused
+        """
+        self._idle.put_nowait(proxy)
+
+    @contextlib.contextmanager
+    def connection(self) -> xmlrpc.client.ServerProxy:
+        """
+            Context manager that acquires a proxy and always releases it
+        """
+        proxy = self.acquire()
+        try:
+            yield proxy
+        finally:
+            self.release(proxy)
+
+    def close(self) -> None:
+        """
+            Closes the connections of every idle proxy
+        """
+        while True:
+            try:
+                proxy = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            proxy('close')()
+            with self._lock:
+                self._created -= 1
+
+class BaseAPI:
+    """
+        The configuration and the handling of failed requests that
+        `API` and `async_api.AsyncAPI` share. Neither the connections
+        nor the request limit are made here, as each client has its own.
 
         These fields are configured via the environment:
             `odoo_host` - string, required, the hostname of your odoo instance. Include the `http(s)://` at the beginning
             `odoo_database` - string, required, the database your odoo instance interacts with. Case sensitive
             `odoo_user` - integer, optional, the database id of the user to connect to the API with. Defaults to 1 for `admin`
             `odoo_pass` - string, required, the password of the user to connect to the API with
+            `odoo_pool_size` - integer, optional, the number of keep-alive connections to hold open. Defaults to 4
+            `odoo_pool_idle_timeout` - float, optional, seconds an unused connection is kept open for. Defaults to 60
+            `odoo_create_batch_size` - integer, optional, the number of records sent in each request by `do_create_many`. Defaults to 100
+            `odoo_retries` - integer, optional, how many times a request that failed in a transient way is retried. Defaults to 3
+            `odoo_retry_backoff` - float, optional, seconds to wait before the first retry, doubling for each one after. Defaults to 0.5
+            `odoo_transient_faults` - regular expression, optional, the Odoo faults that are transient, such as serialization failures
+            `odoo_throttle` - 1 or 0, optional, adapts how many requests are in flight at once to how the server is coping.
+                See `AdaptiveLimit`. Defaults to 1
+            `odoo_protocol` - string, optional, `xmlrpc` or `jsonrpc`, the endpoint to send requests to. Defaults to `xmlrpc`
+            `odoo_accept_gzip` - 1 or 0, optional, asks the server to compress its responses with gzip. Defaults to 1
+            `odoo_gzip_threshold` - integer, optional, request bodies larger than this many bytes are compressed with gzip.
+                Odoo doesn't decompress requests itself, so only set this when a proxy in front of it does. Unset by default
     """
 
     # The types of query that are able to be made to the Odoo instance
     QUERY_TYPES = ['search', 'create', 'read', 'write', 'unlink', 'search_read']
+    # The types of query that are safe to send again when it isn't known whether the server ran them
+    IDEMPOTENT_QUERY_TYPES = ('search', 'read', 'search_read')
+    # Faults that Odoo raises when a transaction has to be rolled back and tried again,
+    # or when a worker is out of time or memory
+    TRANSIENT_FAULTS = (
+        r'could not serialize access|concurrent update|deadlock detected|'
+        r'lock not available|TransactionRollbackError|timeout|MemoryError'
+    )
+    # The longest wait between retries, in seconds
+    RETRY_BACKOFF_CAP = 30.0
 
     def __init__(self) -> None:
         """
@@ -65,9 +582,136 @@ class API:
                 'Set this by doing `export odoo_pass=\'<your password>\'` '
                 'and run the script again')
 
+        self.protocol = os.environ.get('odoo_protocol', 'xmlrpc')
+        if self.protocol not in PROTOCOLS:
+            raise InputError('odoo_protocol',
+                'Unsupported protocol "%s". Supported protocols are: %s' % (self.protocol, ', '.join(PROTOCOLS)))
+
+        gzip_threshold = os.environ.get('odoo_gzip_threshold', '')
+        self.gzip_threshold = int(gzip_threshold) if gzip_threshold else None
+        self.accept_gzip = os.environ.get('odoo_accept_gzip', '1') == '1'
+        self.pool_size = int(os.environ.get('odoo_pool_size', 4))
+        self.pool_idle_timeout = float(os.environ.get('odoo_pool_idle_timeout', 60))
+
+        self.create_batch_size = int(os.environ.get('odoo_create_batch_size', 100))
+        # When set to a `metrics.Metrics`, every request is recorded to it
+        self.metrics = None
+
+        self.retries = int(os.environ.get('odoo_retries', 3))
+        self.retry_backoff = float(os.environ.get('odoo_retry_backoff', 0.5))
+        self.transient_faults = re.compile(os.environ.get('odoo_transient_faults', self.TRANSIENT_FAULTS), re.IGNORECASE)
+        self.throttle = os.environ.get('odoo_throttle', '1') == '1'
+        # The AdaptiveLimit of the requests in flight, made by each client when `throttle` is set
+        self.limit = None
+
+    def is_transient(self, query_type: str, error: BaseException) -> bool:
+        """
+            Returns True if the request of `query_type` that failed
+            with `error` is likely to succeed when sent again.
+
+            Requests that change data are only sent again when the
+            server can't have run them: it refused them, rolled them
+            back, or the connection couldn't be made
+        """
+        if isinstance(error, xmlrpc.client.Fault):
+            return self.transient_faults.search(str(error.faultString)) is not None
+        if isinstance(error, xmlrpc.client.ProtocolError):
+            if error.errcode in (429, 503):
+                return True
+            return error.errcode in (502, 504) and query_type in self.IDEMPOTENT_QUERY_TYPES
+        if isinstance(error, ConnectionRefusedError):
+            return True
+        if isinstance(error, (OSError, http.client.HTTPException, EOFError)):
+            return query_type in self.IDEMPOTENT_QUERY_TYPES
+        return False
+
+    def _retry_delay(self, kind: tuple, error: BaseException, attempt: int) -> Union[float, None]:
+        """
+            Handles the `error` of the `attempt` (counting from 0) at a
+            request of `kind`. Transient errors lower `self.limit`.
+
+            Returns the seconds to wait before trying again, with
+            jittered exponential backoff, or None if it shouldn't be
+        """
+        if not self.is_transient(kind[0], error):
+            return None
+
+        if self.limit is not None:
+            self._report_limit(self.limit.on_failure(kind), kind, type(error).__name__)
+        if self.metrics is not None:
+            self.metrics.increment('transient_errors')
+        if attempt >= self.retries:
+            logging.error('Giving up on %s of %s after %d attempts: %s', kind[0], kind[1], attempt + 1, error)
+            return None
+
+        backoff = min(self.RETRY_BACKOFF_CAP, self.retry_backoff * 2 ** attempt)
+        delay = backoff / 2 + random.uniform(0, backoff / 2)
+        logging.warning(
+            'Retrying %s of %s in %.2fs (retry %d of %d): %s',
+            kind[0], kind[1], delay, attempt + 1, self.retries, error
+        )
+        if self.metrics is not None:
+            self.metrics.increment('retries')
+        return delay
+
+    def _report_limit(self, decision: Union[str, None], kind: tuple, reason: str) -> None:
+        """
+            Logs and records a `decision` of `self.limit`, made after
+            `reason` for a request of `kind`
+        """
+        if decision is None:
+            return
+        if decision == 'decrease':
+            logging.info('Lowered the request limit to %d after %s for %s of %s', self.limit.slots, reason, *kind)
+        else:
+            logging.debug('Raised the request limit to %d', self.limit.slots)
+        if self.metrics is not None:
+            self.metrics.increment('limit_%s' % (decision))
+            self.metrics.set('request_limit', self.limit.slots)
+
+class API(BaseAPI):
+    """
+        Contains the methods required to connect to an Odoo XMLRPC instance
+        and to perform queries against the database.
+
+        It is configured from the environment, see `BaseAPI`. Requests
+        are sent over a `ConnectionPool` of `odoo_pool_size` connections,
+        and with `odoo_throttle`, no more than `AdaptiveLimit` allows are
+        in flight at once, up to `odoo_pool_size`
+    """
+
+    def __init__(self) -> None:
+        """
+            Gathers Odoo information from the environment, see `BaseAPI`,
+            and opens the connection pool
+        """
+
+        super().__init__()
+
+        context = None
+        if "https" in self.hostname:
+            # Don't verify TLS Certificates, for the same reason as `_connect`
+            context = ssl._create_unverified_context()
+
+        self.pool = ConnectionPool(
+            "%s%s" % (self.hostname, PROTOCOLS[self.protocol]),
+            size=self.pool_size,
+            idle_timeout=self.pool_idle_timeout,
+            context=context,
+            protocol=self.protocol,
+            gzip_threshold=self.gzip_threshold,
+            accept_gzip=self.accept_gzip
+        )
+
+        if self.throttle:
+            self.limit = AdaptiveLimit(maximum=self.pool.size)
+        self._slots = threading.Condition()
+        self._in_flight = 0
+
     def _connect(self) -> xmlrpc.client.ServerProxy:
         """
             Connects to the Odoo instance and returns an XMLRPC object
+            that is not part of the connection pool
         """
 
         endpoint = "%s/xmlrpc/2/object" % (self.hostname)
@@ -80,14 +724,96 @@ class API:
     def _query(self, query_type: str, model: str, query: list, options: dict = {}) -> list:
         """
             Verifies the `query_type` is supported by the API
-            and executes the API request on a new XMLRPC instance, returning the result
+            and executes the API request on a pooled XMLRPC instance, returning the result
         """
 
         if query_type not in self.QUERY_TYPES:
             raise InputError('query_type',
                 'Incorrect Type of query. Available types are: %s' % (', '.join(self.QUERY_TYPES)))
 
-        return self._connect().execute_kw(
+        kind = (query_type, model)
+        attempt = 0
+        while True:
+            self._acquire_slot()
+            start = time.perf_counter()
+            try:
+                result = self._send(query_type, model, query, options)
+            except Exception as error:
+                self._release_slot()
+                if not self._retry(kind, error, attempt):
+                    raise
+                attempt += 1
+                continue
+
+            self._release_slot()
+            if self.limit is not None:
+                latency = time.perf_counter() - start
+                size = len(result) if isinstance(result, list) else 1
+                self._report_limit(self.limit.on_success(kind, latency, size), kind, 'slow responses')
+            return result
+
+    def _acquire_slot(self) -> None:
+        """
+            Waits until fewer requests than `self.limit` allows are in flight
+        """
+        if self.limit is None:
+            return
+        with self._slots:
+            while self._in_flight >= self.limit.slots:
+                self._slots.wait()
+            self._in_flight += 1
+
+    def _release_slot(self) -> None:
+        if self.limit is None:
+            return
+        with self._slots:
+            self._in_flight -= 1
+            self._slots.notify_all()
+
+    def _retry(self, kind: tuple, error: BaseException, attempt: int) -> bool:
+        """
+            Waits before retrying the request of `kind` that failed with `error`
+
+            Returns False if it shouldn't be retried, see `_retry_delay`
+        """
+        delay = self._retry_delay(kind, error, attempt)
+        if delay is None:
+            return False
+        time.sleep(delay)
+        return True
+
+    def _send(self, query_type: str, model: str, query: list, options: dict) -> list:
+        """
+            Sends a single request for `_query` on a pooled connection,
+            recording it to `self.metrics` when set
+        """
+        with self.pool.connection() as connection:
+            if self.metrics is None:
+                return self._execute(connection, query_type, model, query, options)
+
+            transport = connection('transport')
+            error = None
+            start = time.perf_counter()
+            try:
+                return self._execute(connection, query_type, model, query, options)
+            except Exception as exception:
+                error = exception
+                raise
+            finally:
+                self.metrics.observe_request(
+                    query_type, model, time.perf_counter() - start,
+                    transport.request_bytes, transport.response_bytes, error,
+                    transport.uncompressed_bytes, transport.gzip_seconds
+                )
+
+    def _execute(
+        self, connection: xmlrpc.client.ServerProxy, query_type: str, model: str, query: list, options: dict
+    ) -> list:
+        """
+            Sends the request for `_query` on `connection`
+        """
+        # pylint: disable=too-many-arguments
+        return connection.execute_kw(
             self.database,
             self.user_id,
             self.user_pass,
@@ -96,6 +822,12 @@ class API:
             [query],    # query must be a list containing either a list or dict depending on the query_type
             options)    # options will always be an optional dict, but the keys and values will change depending on query_type
 
+    def connection_stats(self) -> dict:
+        """
+            Returns the connection pool's counters, see `PoolStats`
+        """
+        return self.pool.stats.as_dict()
+
     def do_search(self, model: str, query: list = [], options: dict = {'limit': 0}) -> list:
         """
             Searches the `model` for `query` with `options`
@@ -131,6 +863,42 @@ class API:
 
         return self._query('create', model, query)
 
+    def do_create_many(self, model: str, queries: list, batch_size: int = None) -> tuple:
+        """
+            Creates a record on `model` for each dictionary in `queries`,
+            sending `batch_size` (defaults to `self.create_batch_size`)
+            of them in each request.
+
+            When Odoo refuses a batch, its records are created one at a time
+            instead, so that a single bad record doesn't prevent the rest
+            of the batch from being created. Connection errors are not
+            retried this way, and are raised.
+
+            Returns a tuple of (ids, errors):
+                `ids` - a list of the created database IDs, in the same order as `queries`,
+                    with None for each record that couldn't be created
+                `errors` - a dictionary of the index in `queries` to the `xmlrpc.client.Fault`
+                    for each record that couldn't be created
+        """
+
+        ids = list()
+        errors = dict()
+        for batch in chunked(queries, batch_size or self.create_batch_size):
+            try:
+                ids.extend(self._query('create', model, batch))
+                continue
+            except xmlrpc.client.Fault:
+                pass
+
+            for query in batch:
+                try:
+                    ids.append(self.do_create(model, query))
+                except xmlrpc.client.Fault as error:
+                    errors[len(ids)] = error
+                    ids.append(None)
+
+        return ids, errors
+
     def do_read(self, model: str, query: list, options: dict = {}) -> list:
         """
             Reads one or more records on `model` with the supplied `query`
@@ -158,6 +926,19 @@ class API:
 
         return self._query('write', model, query, options)
 
+    def do_write(self, model: str, ids: list, values: dict) -> bool:
+        """
+            Sets the fields in `values` to their values on the
+            records of `model` with the database IDs in `ids`
+
+            Unlike `do_update`, `values` is passed as the `vals`
+            argument of `write`, so it doesn't need wrapping
+
+            Returns True once the records were updated
+        """
+
+        return self._query('write', model, ids, {'vals': values})
+
     def do_delete(self, model: str, query: list) -> list:
         """
             Deletes one or more records on `model`, selected with `query`
@@ -7,7 +7,6 @@
 # pylint: disable=import-error
 # pylint: disable=bad-whitespace
 # pylint: disable=bad-continuation
-# pylint: disable=logging-not-lazy
 # pylint: disable=unnecessary-comprehension
 # pylint: disable=too-many-instance-attributes
 
@@ -20,50 +19,120 @@
 """
 
 import os
+import sys
 import csv
 import time
+import queue
+import asyncio
+import threading
 import logging
-import itertools
+import collections
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union
 
-from openpyxl import load_workbook
-from record import Record
-from api import API
+from readers import open_reader
+from record import Record, RecordList, LazyRecords
+from registry import ModelRegistry, AssetIndex
+from journal import ImportJournal
+from delta import FingerprintStore, fingerprint
+from catalog import SellableCatalog
+from ignore import IgnoreRules
+from metrics import Metrics
+from exceptions import PipelineStopped
+from logs import start_logging
+from api import API, chunked, any_of, ilike_match
+from async_api import AsyncAPI
 
 # Odoo Stuff
 # The database ID of the asset catalog we are importing into
 ASSET_CATALOG_ID = int(os.environ.get('odoo_asset_catalog_id', 0))
 # The database ID of the data destruction we are importing into
 DATA_DESTRUCTION_ID = int(os.environ.get('odoo_data_destruction_id', 0))
+# The number of models that are searched for in a single request
+MODEL_BATCH_SIZE = int(os.environ.get('odoo_model_batch_size', 100))
+# When set, the lines already on the asset catalog are read once up front,
+# rather than searched for one at a time before each line is created
+PREFETCH_ASSETS = os.environ.get('odoo_prefetch_assets', '0') == '1'
+# The number of asset catalog lines that are read in a single request
+ASSET_PAGE_SIZE = int(os.environ.get('odoo_asset_page_size', 1000))
+# When set, models are matched against a local mirror of the sellable items in
+# `sellable_catalog`, which is synced with Odoo first, see `sync_sellable_catalog`
+USE_SELLABLE_CATALOG = os.environ.get('use_sellable_catalog', '0') == '1'
+# The SQLite file that mirrors the sellable items for `USE_SELLABLE_CATALOG`
+SELLABLE_CATALOG = os.environ.get('sellable_catalog', 'sellables.sqlite')
+# The number of sellable items that are read in a single request when syncing
+SELLABLE_PAGE_SIZE = int(os.environ.get('odoo_sellable_page_size', 1000))
+# When set, the mirror is cleared and every sellable item is read again,
+# which forgets the sellable items that were deleted in Odoo
+REBUILD_SELLABLE_CATALOG = os.environ.get('rebuild_sellable_catalog', '0') == '1'
+# The number of threads that upload line items at the same time.
+# Each one uses its own connection, so `odoo_pool_size` should be at least this
+UPLOAD_WORKERS = int(os.environ.get('upload_workers', 1))
+# When set, models are searched for and line items are uploaded with `AsyncAPI`,
+# keeping up to `odoo_async_requests` requests in flight from a single thread
+USE_ASYNC = os.environ.get('use_async', '0') == '1'
+# When set, the spreadsheet is parsed, models are resolved and line items are uploaded
+# at the same time, each on its own thread, see `run_pipeline`. Line items are still
+# uploaded by `upload_workers`, and `use_async` is ignored
+PIPELINE = os.environ.get('pipeline', '0') == '1'
+# The number of Records that can wait between two steps of the pipeline,
+# which bounds its memory when one step is slower than the one before it
+PIPELINE_QUEUE_SIZE = int(os.environ.get('pipeline_queue_size', 1000))
+# When set, the progress of the upload is kept in a journal next to the spreadsheet,
+# so that an interrupted import can be resumed, see `open_journal`
+USE_JOURNAL = os.environ.get('use_journal', '1') == '1'
+# The number of journal entries that are written in a single transaction
+JOURNAL_BATCH_SIZE = int(os.environ.get('journal_batch_size', 500))
+# When set, the import carries on from its journal instead of starting over.
+# Also set by running with `--resume`
+RESUME = os.environ.get('resume', '0') == '1'
+# When set, only the Records that were added or changed since the last import
+# into the same asset catalog and data destruction are uploaded, see `compare_with_previous`
+DELTA_IMPORT = os.environ.get('delta_import', '0') == '1'
+# The SQLite file that keeps the fingerprints of imported Records for `DELTA_IMPORT`
+DELTA_STORE = os.environ.get('delta_store', 'fingerprints.sqlite')
+# When set, the time of each phase and every request to Odoo are measured,
+# and written to a JSON file next to the log and csv, see `metrics.Metrics`
+METRICS = os.environ.get('metrics', '0') == '1'
+# The least severe messages written to the log file and to the console.
+# DEBUG adds a message for every Record and line item, which slows large imports
+LOG_LEVEL = os.environ.get('log_level', 'INFO')
+CONSOLE_LOG_LEVEL = os.environ.get('console_log_level', 'INFO')
 
 # Spreadsheet Stuff
 SPREADSHEET = os.environ.get('spreadsheet', '')
 SHEET = os.environ.get('sheet', '')
 FIRST_ROW = int(os.environ.get('first_row', 1))
-LAST_ROW = int(os.environ.get('last_row', 2000))
+# Zero reads until the data ends, see `BLANK_ROWS_TO_END`
+LAST_ROW = int(os.environ.get('last_row', 0))
 LAST_COL = int(os.environ.get('last_col', 6))
+# The data is considered to have ended after this many blank rows in a row
+BLANK_ROWS_TO_END = int(os.environ.get('blank_rows_to_end', 100))
+# When set, workbooks are streamed a row at a time with openpyxl's read-only mode,
+# instead of every cell of the workbook being loaded into memory up front.
+# CSV and TSV files (by extension) are always streamed
+STREAM_WORKBOOK = os.environ.get('stream_workbook', '1') == '1'
 
 # Items in this list will always create a Record (though that record
 # won't get uploaded to the ERP), and will additionally be added to
 # a spreadsheet as they are come across
-SERIALS_TO_IGNORE = os.environ.get('serials_to_ignore').strip().split('\n')
+SERIALS_TO_IGNORE = os.environ.get('serials_to_ignore', '').strip().split('\n')
+# A file with more serials to ignore, one per line, which can also
+# have rules that match many serials, see `ignore.IgnoreRules`
+IGNORE_FILE = os.environ.get('ignore_file', '')
 
 FILENAME_TIME = '%s' % (time.time())
 IGNORE_CSV = '%s.csv' % (FILENAME_TIME)
 
-# Logging
-logging.basicConfig(
-    filename='%s.log' % (FILENAME_TIME),
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    datefmt='%m/%d/%Y %I:%M:%S %p'
-)
-# Log to console and file
-CONSOLE = logging.StreamHandler()
-CONSOLE.setLevel(logging.INFO)
-FORMATTER = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
-CONSOLE.setFormatter(FORMATTER)
-logging.getLogger('').addHandler(CONSOLE)
+# Log to console and file, from a background thread
+start_logging('%s.log' % (FILENAME_TIME), LOG_LEVEL, CONSOLE_LOG_LEVEL)
+
+# Loaded once, and shared by every ProcessWorkbook
+IGNORE_RULES = IgnoreRules((None, '', 'N/A')).extend(SERIALS_TO_IGNORE)
+if IGNORE_FILE:
+    IGNORE_RULES.load(IGNORE_FILE)
+    logging.info('Loaded %d rules for serials to ignore from %s', len(IGNORE_RULES), IGNORE_FILE)
 
 # Sanity Checks
 if ASSET_CATALOG_ID <= 0:
@@ -75,46 +144,153 @@ class ProcessWorkbook:
     """
         Provides a mechanism for extracting the content
         from the workbook and uploading it to Odoo
-    """
 
-    def __init__(self) -> None:
-        self.api = API()
-        self.workbook = load_workbook(filename=SPREADSHEET, data_only=True)[SHEET]
-
-        # Special Serials
-        self.ignore_csv_file = open(IGNORE_CSV, 'w')
-        self.ignore_csv = csv.DictWriter(
-            self.ignore_csv_file,
-            fieldnames=[
-                'serial', 'asset_tag', 'make',
-                'model', 'device_type', 'children'
-            ],
-            dialect=csv.excel
-        )
-        self.ignore_csv.writeheader()
+        Every argument defaults to its configuration from the environment:
+            `spreadsheet` - the path of the workbook to read
+            `sheet` - the name of the sheet with the data
+            `asset_catalog_id` - the asset catalog to upload to, skipped when 0
+            `data_destruction_id` - the data destruction to upload to, skipped when 0
+            `ignore_csv` - the path that ignored Records are saved to
+            `api` - the API instance to upload with, so that its connections can be shared
+            `models` - the ModelRegistry to use, so that resolved models can be shared
+            `resume` - carry on from the journal of an earlier import, see `open_journal`
+            `asset_index` - the AssetIndex of an earlier import into the same asset
+                catalog, which `prefetch_asset_lines` only reads new lines into
+    """
 
-        # Failed records are rows that for one reason or another didn't generate a Record object
-        self.failed_records = list()
-        self.records = list()
+    # The steps of `run`, in the order they are required
+    PHASES = (
+        'build_record_list',
+        'show_records',
+        'open_journal',
+        'compare_with_previous',
+        'sync_sellable_catalog',
+        'get_odoo_model_ids',
+        'create_missing_model_ids',
+        'remove_ignored_records',
+        'prefetch_asset_lines',
+        'create_line_items',
+        'save_fingerprints',
+    )
+
+    # The columns of a row, as they are named in the failed csv
+    FAILED_COLUMNS = ('serial', 'asset_tag', 'relationship', 'make', 'model', 'device_type')
+
+    # The values that identify a line item in the journal, per Odoo model
+    JOURNAL_KEYS = {
+        'erpwarehouse.asset': ('catalog', 'make', 'serial'),
+        'erpwarehouse.ddl_item': ('ddl', 'serial', 'storser'),
+    }
+
+    def __init__(
+        self, spreadsheet: str = SPREADSHEET, sheet: str = SHEET,
+        asset_catalog_id: int = ASSET_CATALOG_ID, data_destruction_id: int = DATA_DESTRUCTION_ID,
+        ignore_csv: str = IGNORE_CSV, api: API = None, models: ModelRegistry = None,
+        resume: bool = RESUME, asset_index: AssetIndex = None
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self.spreadsheet = spreadsheet
+        self.sheet = sheet
+        self.asset_catalog_id = asset_catalog_id
+        self.data_destruction_id = data_destruction_id
+        self.ignore_csv_path = ignore_csv
+        self.delta_csv_path = '%s-delta.csv' % (os.path.splitext(ignore_csv)[0])
+        self.failed_csv_path = '%s-failed.csv' % (os.path.splitext(ignore_csv)[0])
+        self.metrics_path = '%s.json' % (os.path.splitext(ignore_csv)[0])
+        self.resume = resume
+        self.closed = False
+
+        self.api = api or API()
+        self.async_api = AsyncAPI() if USE_ASYNC and not PIPELINE else None
+        # The event loop that `self.async_api` runs on, kept for the
+        # whole import so that its connections are reused between uploads
+        self.loop = asyncio.new_event_loop() if self.async_api is not None else None
+        self.metrics = None
+        if METRICS:
+            self.metrics = Metrics()
+            self.api.metrics = self.metrics
+            if self.async_api is not None:
+                self.async_api.metrics = self.metrics
+        # Opened by `build_record_list`, as a workbook that was parsed
+        # elsewhere (see `batch.py`) only needs to be uploaded
+        self.reader = None
+
+        # Special Serials, opened by `remove_ignored_records`
+        self.ignore_csv_file = None
+        self.ignore_csv = None
+
+        # Rows that for one reason or another didn't generate a Record object are
+        # written to the failed csv as they are read, opened by `_fail_row`
+        self.failed_csv_file = None
+        self.failed_csv = None
+        # `RecordList` keeps a serial index in sync with its contents,
+        # which keeps duplicate detection constant time per row
+        self.records = RecordList()
         self.records_to_upload = list()
         self.last_parent = None
 
-        # These lists are expected to contain one or more Tuples
-        # Each Tuple will be of the format (make, model)
-        self.models_to_search = list()
-        self.models_to_create = list()
-        # The Tuples here will be of the format ((make, model), id)
-        self.models_to_ids = list()
+        # Every unique (make, model) pair, and its sellable id once known
+        self.models = models if models is not None else ModelRegistry()
+        # A shared registry has to keep the models of every workbook
+        self.owns_models = models is None
+        # The lines already on the asset catalog, when `PREFETCH_ASSETS` is set
+        self.asset_index = None
+        # The asset lines queued to be created, which `asset_index` doesn't have yet
+        self.pending_assets = None
+        # Read into by `prefetch_asset_lines` when it is for the same asset catalog
+        self.previous_asset_index = asset_index
+        # The ImportJournal, opened by `open_journal` when `USE_JOURNAL` is set
+        self.journal = None
+        # The FingerprintStore, opened by `compare_with_previous` when `DELTA_IMPORT` is set
+        self.fingerprints = None
+        # The SellableCatalog, opened by `sync_sellable_catalog` when `USE_SELLABLE_CATALOG` is set
+        self.catalog = None
+        # Serials of the Records that haven't changed since the last import
+        self.unchanged = set()
+        # Serials of the Records that changed since the last import, whose lines are updated
+        self.changed_serials = set()
+        # Changed Records waiting for their line items to be searched for and updated
+        self.pending_updates = list()
+        # Serials of the Records that were in the last import, but not this one
+        self.removed_serials = list()
+        # Serials of the Records that had a line item that couldn't be uploaded
+        self.failed_serials = set()
+        # Line items waiting to be created, per Odoo model.
+        # The Tuples here will be of the format (record, values)
+        self.pending_lines = {
+            'erpwarehouse.asset': list(),
+            'erpwarehouse.ddl_item': list(),
+        }
+        # Uploads running on the upload workers, in the order they were sent.
+        # The Tuples here will be of the format (model, pending, future)
+        self.uploads = collections.deque()
+        self.upload_executor = None
+        if UPLOAD_WORKERS > 1 and self.async_api is None:
+            if UPLOAD_WORKERS > self.api.pool.size:
+                logging.warning(
+                    'There are more upload workers (%d) than connections (%d), some will wait for a connection',
+                    UPLOAD_WORKERS, self.api.pool.size
+                )
+            self.upload_executor = ThreadPoolExecutor(UPLOAD_WORKERS, thread_name_prefix='upload')
 
-        # Serials that match items in this list will always
+        # Serials that match these rules will always
         # be returned False from `self.serial_in_records`
-        self.serials_to_ignore = [None, '', 'N/A']
-        self.serials_to_ignore.extend(SERIALS_TO_IGNORE)
+        self.serials_to_ignore = IGNORE_RULES
 
         self.rows_processed = 0
+        self.rows_failed = 0
         self.sorting_records_uploaded = 0
         self.data_records_uploaded = 0
         self.records_ignored = 0
+        self.lines_resumed = 0
+        self.records_added = 0
+        self.records_changed = 0
+        self.lines_updated = 0
+
+        # Set to stop the threads of `run_pipeline`
+        self.stopping = threading.Event()
+        # The seconds each step of `run_pipeline` spent waiting for the next one
+        self.pipeline_waits = collections.Counter()
 
         logging.info('Initialized ProcessWorkbook')
 
@@ -122,40 +298,95 @@ class ProcessWorkbook:
         """
             Automatically closes file handlers when destructed normally
         """
-        self.ignore_csv_file.close()
+        self.close()
+
+    def close(self, summary: bool = True) -> None:
+        """
+            Closes file handlers and the upload workers, and
+            when `summary` is True, logs what was processed.
+            Only the first call has any effect.
+        """
+        if self.closed:
+            return
+        self.closed = True
+
+        if self.ignore_csv_file is not None:
+            self.ignore_csv_file.close()
+        if self.failed_csv_file is not None:
+            self.failed_csv_file.close()
+        if self.upload_executor is not None:
+            self.upload_executor.shutdown()
+        if self.journal is not None:
+            self.journal.close()
+        if self.fingerprints is not None:
+            self.fingerprints.close()
+        if self.catalog is not None:
+            self.catalog.close()
+        if self.loop is not None:
+            self.loop.run_until_complete(self.async_api.close())
+            self.loop.close()
+        if not summary:
+            return
 
         logging.info('Processed %d rows', (self.rows_processed))
+        if self.rows_failed:
+            logging.info('%d rows failed Record Creation, see %s', self.rows_failed, self.failed_csv_path)
         logging.info('Created %d Records', (len(self.records)))
         logging.info('Uploaded %d Sorting Assets', (self.sorting_records_uploaded))
         logging.info('Uploaded %d Data Destruction Assets', (self.data_records_uploaded))
         logging.info('Prevented %d Records from being uploaded', (self.records_ignored))
-
-        for row in self.failed_records:
+        if self.resume:
+            logging.info('Skipped %d line items that were uploaded before resuming', (self.lines_resumed))
+        if self.fingerprints is not None:
             logging.info(
-                'Row that failed Record Creation: %s | %s | %s | %s | %s' % (
-                    row[0].value,
-                    row[1].value,
-                    row[3].value,
-                    row[4].value,
-                    row[5].value
-                )
+                'Since the last import, %d Records were added, %d changed, %d unchanged and %d removed',
+                self.records_added, self.records_changed, len(self.unchanged), len(self.removed_serials)
             )
+            logging.info('Updated %d line items of changed Records', (self.lines_updated))
+
+        if self.metrics is not None:
+            for counter in (
+                'rows_processed', 'rows_failed', 'sorting_records_uploaded', 'data_records_uploaded',
+                'records_ignored', 'lines_resumed', 'records_added', 'records_changed', 'lines_updated'
+            ):
+                self.metrics.increment(counter, getattr(self, counter))
+            self.metrics.increment('records', len(self.records))
+            self.metrics.write(self.metrics_path)
+            logging.info('Wrote metrics to %s', self.metrics_path)
+
+        connections = self.api.connection_stats()
+        if self.async_api is not None:
+            for name, value in self.async_api.connection_stats().items():
+                connections[name] += value
+        logging.info(
+            'Opened %d API connections, reused %d, reconnected %d, closed %d idle',
+            connections['opened'], connections['reused'],
+            connections['reconnects'], connections['idle_closed']
+        )
+        for direction, verb, seconds in (
+            ('request', 'Compressed', 'compress_seconds'), ('response', 'Decompressed', 'decompress_seconds')
+        ):
+            if connections['compressed_%ss' % (direction)]:
+                logging.info(
+                    '%s %d %ss, %d bytes to %d (%.1f:1), in %.3fs',
+                    verb, connections['compressed_%ss' % (direction)], direction,
+                    connections['%s_bytes_uncompressed' % (direction)],
+                    connections['%s_bytes_compressed' % (direction)],
+                    connections['%s_bytes_uncompressed' % (direction)] / connections['%s_bytes_compressed' % (direction)],
+                    connections[seconds]
+                )
 
         logging.info('ProcessWorkbook Finished')
 
-    def get_id_from_model(self, model: str) -> Union[tuple, None]:
+    def get_id_from_model(self, model: str) -> Union[int, None]:
         """
-            Searches `self.models_to_ids` for
-            a matching `model`, and returns the
-            id if there is one. Returns None
-            otherwise
+            Looks up `model` in `self.models`, and
+            returns the sellable id if there is one.
+            Returns None otherwise
         """
-        for item in self.models_to_ids:
-            if model == item[0][1]:
-                return item[1]
-        return None
+        return self.models.get_id(model)
 
-    def serial_in_records(self, serial: str, records: Record = None) -> bool:
+    def serial_in_records(self, serial: str, records: RecordList = None) -> bool:
         """
             Determines if a particular serial number
             is in a record list, and returns True if so;
@@ -172,20 +403,25 @@ class ProcessWorkbook:
             If the serial is to be ignored, this will
             always return False, to allow the Record object
             to be created (used to save it to a csv)
+
+            When `records` is a `RecordList`, the check is
+            made against its serial index instead of walking
+            every Record
         """
         if records is None:
             records = self.records
         if serial in self.serials_to_ignore:
             return False
-        if serial in [record.serial for record in records if record.serial]:
-            return True
-        return False
+        if isinstance(records, RecordList):
+            return records.has_serial(serial)
+        return serial in {record.serial for record in records if record.serial}
 
     def create_record_from_row(
         self, row: tuple, parent: bool = True, search_model: bool = True
     ) -> Union[bool, Record]:
         """
-            With a provided `row`, this method will first search
+            With a provided `row` (a tuple of values, see
+            `readers.Reader`), this method will first search
             for a matching serial number and if it doesn't exist,
             a new Record will be created with that row's data.
             If the row's serial number is special, the record will
@@ -203,26 +439,25 @@ class ProcessWorkbook:
             created Record object. Otherwise, it returns False
         """
 
-        serial = str(row[0].value)
+        serial = str(row[0])
         if not self.serial_in_records(serial):
             logging.debug('Creating Record for %s', (serial))
             record = Record(
                 serial = serial,
-                asset_tag = str(row[1].value),
-                make = str(row[3].value),
-                model = str(row[4].value),
-                device_type = str(row[5].value),
+                asset_tag = str(row[1]),
+                make = str(row[3]),
+                model = str(row[4]),
+                device_type = str(row[5]),
                 children = None
             )
 
             if parent:
-                record.children = list()
+                record.children = RecordList()
                 self.last_parent = record
 
             if search_model:
                 # Add unique models so we can search for their sellable ids
-                if record.model not in itertools.chain(*self.models_to_search):
-                    self.models_to_search.append((record.make, record.model))
+                self.models.add(record.make, record.model)
 
             return record
         return False
@@ -244,39 +479,116 @@ class ProcessWorkbook:
             When there is no relationship, the Record
             will still be created, without any Children
 
+            Rows are read one at a time from `iter_data_rows`,
+            see `iter_records`.
+
             Returns `self` (this instance of ProcessWorkbook)
         """
         logging.info('Getting rows from the spreadsheet and sorting relationships')
-        for row in self.workbook.iter_rows(
-            min_row=FIRST_ROW,
-            max_col=LAST_COL,
-            max_row=LAST_ROW
-        ):
+        collections.deque(self.iter_records(), maxlen=0)
+        return self
+
+    def iter_records(self, search_models: bool = True) -> Record:
+        """
+            Does the work of `build_record_list`, yielding each
+            Record that isn't a child once it is complete.
+
+            A Child row is added to the last Parent, even when
+            other Records were read in between, so the last
+            Parent and the Records after it are held back until
+            the next Parent is read, or the rows run out.
+
+            `search_models` is passed to `create_record_from_row`
+        """
+        held = list()
+        for row in self.iter_data_rows():
 
-            relationship = row[2].value
+            relationship = row[2]
+            reason = 'duplicate serial'
 
             if relationship == 'Parent':
-                record = self.create_record_from_row(row, True)
+                record = self.create_record_from_row(row, True, search_models)
                 if record:
+                    yield from held
+                    held = [record]
                     self.records.append(record)
 
+            elif relationship == 'Child' and self.last_parent is None:
+                record = None
+                reason = 'child without a parent'
+
             elif relationship == 'Child':
                 record = self.create_record_from_row(row, False, False)
                 if record:
                     self.last_parent.children.append(record)
 
             else:
-                record = self.create_record_from_row(row, False)
+                record = self.create_record_from_row(row, False, search_models)
                 if record:
                     self.records.append(record)
+                    if held:
+                        held.append(record)
+                    else:
+                        yield record
 
             if not record:
-                self.failed_records.append(row)
+                self._fail_row(row, reason)
 
             self.rows_processed += 1
 
+        yield from held
+
+    def _fail_row(self, row: tuple, reason: str) -> 'ProcessWorkbook':
+        """
+            Writes `row`, which didn't generate a Record because
+            of `reason`, to the failed csv along with its row number,
+            opening the failed csv if this is the first one
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if self.failed_csv_file is None:
+            self.failed_csv_file = open(self.failed_csv_path, 'w', newline='')
+            self.failed_csv = csv.writer(self.failed_csv_file, dialect=csv.excel)
+            self.failed_csv.writerow(
+                ('row', 'reason') + self.FAILED_COLUMNS[:len(row)]
+                + tuple('column_%d' % (number) for number in range(len(self.FAILED_COLUMNS) + 1, len(row) + 1))
+            )
+
+        self.rows_failed += 1
+        logging.debug('Row %d failed Record Creation: %s', self.reader.row_number, reason)
+        self.failed_csv.writerow((self.reader.row_number, reason) + tuple(row))
         return self
 
+    def iter_data_rows(self) -> tuple:
+        """
+            Opens the reader for `self.spreadsheet` (see
+            `readers.open_reader`) and yields each row from
+            `FIRST_ROW` as a tuple of `LAST_COL` values,
+            skipping blank rows.
+
+            Reading stops at `LAST_ROW` when it is set, and
+            otherwise at the end of the data, or once there
+            have been `BLANK_ROWS_TO_END` blank rows in a row.
+            Rows that only have formatting count as blank,
+            so a sheet that has been formatted far past its
+            data isn't read to the end.
+
+            The reader is closed once every row has been read.
+        """
+        self.reader = open_reader(
+            self.spreadsheet,
+            sheet=self.sheet,
+            read_only=STREAM_WORKBOOK,
+            first_row=FIRST_ROW,
+            last_row=LAST_ROW,
+            last_col=LAST_COL,
+            blank_rows_to_end=BLANK_ROWS_TO_END
+        )
+        try:
+            yield from self.reader
+        finally:
+            self.reader.close()
+
     def get_records(self) -> 'ProcessWorkbook':
         """
             Deprecated, use `build_record_list` instead.
@@ -287,15 +599,16 @@ class ProcessWorkbook:
 
     def show_records(self) -> None:
         """
-            Logs all of the records stored, in JSON format
+            Logs all of the records stored, in JSON format.
+            They are only serialized if the message is emitted
         """
-        logging.debug([record for record in self.records])
+        logging.debug('%s', LazyRecords(self.records))
 
     def get_odoo_model_ids(self) -> 'ProcessWorkbook':
         """
             Iterates over unique models and searches
             Odoo for the database id of those models.
-            Once the search is complete, `self.models_to_ids`
+            Once the search is complete, `self.models`
             contains a mapping between each unique model
             name and the database id.
 
@@ -303,27 +616,281 @@ class ProcessWorkbook:
             so that a manual search can be done, or a new item
             can be created.
 
-            When a model returns multiple ids, that model is
-            logged so that a manual search can be done to
-            select the "correct" database id.
+            When a model returns multiple ids, the first one
+            is used, as some models are duplicated in Odoo.
+
+            Models are searched for `MODEL_BATCH_SIZE` at a
+            time, with the `ilike` conditions joined together.
+            The results are then matched back to each model
+            locally. Odoo returns them in the same order as it
+            would for a search on a single model, so the first
+            match is the same record as it would be otherwise.
+
+            With `USE_ASYNC`, all the batches are searched for
+            at the same time.
+
+            With `USE_SELLABLE_CATALOG`, models are matched
+            against the local mirror first, and only those it
+            has no match for are searched for.
 
             Returns `self` (this instance of ProcessWorkbook)
         """
         logging.info('Searching Odoo for sellable items with matching models')
-        for model in self.models_to_search:
-            odoo_records = self.api.do_search_and_read(
-                'erpwarehouse.sellable',
-                [('model', 'ilike', model[1])]
+        if self.journal is not None:
+            self._resume_models()
+        if self.catalog is not None:
+            self._match_catalog()
+
+        batches = chunked(self.models.in_state(ModelRegistry.PENDING), MODEL_BATCH_SIZE)
+        queries = [self._model_query(batch) for batch in batches]
+
+        if self.async_api is not None:
+            results = self.loop.run_until_complete(self._gather(
+                self.async_api.do_search_and_read(*query) for query in queries
+            ))
+        else:
+            results = (self.api.do_search_and_read(*query) for query in queries)
+
+        for batch, odoo_records in zip(batches, results):
+            self._match_models(batch, odoo_records)
+
+        if self.journal is not None:
+            self.journal.flush()
+        return self
+
+    def compare_with_previous(self) -> 'ProcessWorkbook':
+        """
+            When `DELTA_IMPORT` is set, compares the fingerprint
+            of each Record (see `delta.fingerprint`) with the last
+            import into the same asset catalog and data destruction.
+
+            Records that haven't changed are left out of the rest of
+            the import, and when this instance has its own ModelRegistry,
+            so are their models. Records that were changed or removed
+            are written to the delta csv.
+
+            The fingerprints are only updated by `save_fingerprints`,
+            once the line items have been uploaded.
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if not DELTA_IMPORT:
+            return self
+
+        previous = self._open_fingerprints()
+        changed = list()
+        for record in self.records:
+            if record.serial not in self.serials_to_ignore:
+                self._compare_record(record, previous, changed)
+
+        self._find_removed(previous)
+        self._write_delta_csv(changed)
+
+        if self.owns_models:
+            self.models = ModelRegistry()
+            for record in self.records:
+                if record.serial not in self.unchanged:
+                    self.models.add(record.make, record.model)
+
+        return self
+
+    def _open_fingerprints(self) -> dict:
+        """
+            Opens `self.fingerprints` for `compare_with_previous`
+
+            Returns the fingerprints of the last import, keyed on serial
+        """
+        logging.info('Comparing Records with the last import')
+        self.fingerprints = FingerprintStore(DELTA_STORE, self.asset_catalog_id, self.data_destruction_id)
+        return self.fingerprints.load()
+
+    def _compare_record(self, record: Record, previous: dict, changed: list) -> bool:
+        """
+            Compares the fingerprint of `record` with `previous`, counting
+            it as added or changed, and adding it to `changed` if it was
+
+            Returns True if `record` hasn't changed since the last import
+        """
+        stored = previous.get(record.serial)
+        if stored is None:
+            self.records_added += 1
+        elif stored == fingerprint(record):
+            self.unchanged.add(record.serial)
+            return True
+        else:
+            self.records_changed += 1
+            self.changed_serials.add(record.serial)
+            changed.append(record)
+        return False
+
+    def _find_removed(self, previous: dict) -> 'ProcessWorkbook':
+        """
+            Sets `self.removed_serials` to the serials in `previous`
+            that no Record has, other than those that were ignored
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        current = set(
+            record.serial for record in self.records
+            if record.serial not in self.serials_to_ignore
+        )
+        self.removed_serials = [serial for serial in previous if serial not in current]
+        return self
+
+    def _write_delta_csv(self, changed: list) -> 'ProcessWorkbook':
+        """
+            Writes the `changed` Records, and the Records that were
+            removed since the last import, to the delta csv
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        with open(self.delta_csv_path, 'w', newline='') as delta_csv_file:
+            delta_csv = csv.DictWriter(
+                delta_csv_file,
+                fieldnames=('status',) + FingerprintStore.COLUMNS,
+                dialect=csv.excel
+            )
+            delta_csv.writeheader()
+            for record in changed:
+                delta_csv.writerow(dict(
+                    status='changed',
+                    **{field: getattr(record, field) for field in FingerprintStore.COLUMNS}
+                ))
+            for row in self.fingerprints.rows(self.removed_serials):
+                delta_csv.writerow(dict(status='removed', **row))
+
+        return self
+
+    def save_fingerprints(self) -> 'ProcessWorkbook':
+        """
+            When `DELTA_IMPORT` is set, stores the fingerprints
+            of the Records that were uploaded, for the next import
+            to compare with. Records that had a line item that
+            couldn't be uploaded, or that were removed, are forgotten,
+            so that they are imported again the next time.
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if self.fingerprints is not None:
+            self.fingerprints.save(
+                [record for record in self.records_to_upload if record.serial not in self.failed_serials],
+                self.removed_serials + list(self.failed_serials)
+            )
+
+        return self
+
+    def _model_key(self, model: tuple) -> str:
+        """
+            Returns the journal key of the sellable id for the (make, model) `model`
+        """
+        return ImportJournal.key('erpwarehouse.sellable', *model)
+
+    def _resume_models(self) -> 'ProcessWorkbook':
+        """
+            Resolves the pending models that have a sellable id
+            in the journal, so that they aren't searched for again
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        resumed = 0
+        for model in self.models.in_state(ModelRegistry.PENDING):
+            sellable_id = self.journal.get(self._model_key(model))
+            if sellable_id:
+                self.models.resolve(model, sellable_id)
+                resumed += 1
+        if resumed:
+            logging.info('Resolved %d models from the journal', resumed)
+
+        return self
+
+    def sync_sellable_catalog(self) -> 'ProcessWorkbook':
+        """
+            When `USE_SELLABLE_CATALOG` is set, opens the local
+            mirror of the sellable items in `SELLABLE_CATALOG`,
+            and reads the sellable items that were written in
+            Odoo since it was last synced into it. With
+            `REBUILD_SELLABLE_CATALOG`, every sellable item is
+            read again
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if USE_SELLABLE_CATALOG and self.catalog is None:
+            self.catalog = SellableCatalog(
+                SELLABLE_CATALOG, '%s/%s' % (self.api.hostname, self.api.database)
+            )
+            if REBUILD_SELLABLE_CATALOG:
+                self.catalog.clear()
+            synced = self.catalog.sync(self.api, SELLABLE_PAGE_SIZE)
+            logging.info(
+                'Synced %d sellable items into %s, which has %d',
+                synced, SELLABLE_CATALOG, len(self.catalog)
             )
 
-            if not odoo_records:
+        return self
+
+    def _match_catalog(self) -> 'ProcessWorkbook':
+        """
+            Resolves the pending models that the sellable catalog
+            has a match for, so that they aren't searched for
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        matched = 0
+        for model in self.models.in_state(ModelRegistry.PENDING):
+            sellable_id = self.catalog.match(model[1])
+            if sellable_id is not None:
+                self.models.resolve(model, sellable_id)
+                matched += 1
+        logging.info('Matched %d models with the sellable catalog', matched)
+
+        return self
+
+    def _model_query(self, batch: list) -> tuple:
+        """
+            Returns the arguments of `do_search_and_read` that
+            find the sellable items of the (make, model) `batch`
+        """
+        return (
+            'erpwarehouse.sellable',
+            any_of([('model', 'ilike', model[1]) for model in batch]),
+            {'fields': ['id', 'make', 'model']}
+        )
+
+    def _match_models(self, batch: list, odoo_records: list) -> 'ProcessWorkbook':
+        """
+            Resolves each (make, model) in `batch` to the first
+            of `odoo_records` that an `ilike` search would match,
+            or marks it as missing
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        for model in batch:
+            match = next(
+                (
+                    odoo_record for odoo_record in odoo_records
+                    if ilike_match(model[1], odoo_record['model'])
+                ),
+                None
+            )
+
+            if match is None:
                 logging.warning('Unable to find model: %s', (model[1]))
-                self.models_to_create.append(model)
+                self.models.mark_missing(model)
             else:
-                # If the search returns more than one, we'll
-                # assume that it was the first one since some
-                # models are duplicated (for whatever reason)
-                self.models_to_ids.append((model, odoo_records[0]['id']))
+                self.models.resolve(model, match['id'])
+                if self.journal is not None:
+                    self.journal.complete(self._model_key(model), match['id'])
+
+        return self
+
+    @staticmethod
+    async def _gather(coroutines: list) -> list:
+        """
+            Runs `coroutines` at the same time, see `self.loop`
+
+            Returns the results of `coroutines`, in order
+        """
+        return await asyncio.gather(*coroutines)
 
     def create_missing_model_ids(self) -> 'ProcessWorkbook':
         """
@@ -334,16 +901,81 @@ class ProcessWorkbook:
             Returns `self` (this instance of ProcessWorkbook)
         """
         logging.info('Creating sellable items for missing models')
-        for model in self.models_to_create:
-            logging.info('Creating model: %s', (model[1]))
-            result = self.api.do_create(
-                'erpwarehouse.sellable',
-                {
-                    'make': model[0],
-                    'model': model[1]
-                }
-            )
-            self.models_to_ids.append((model, result))
+        for model in self.models.in_state(ModelRegistry.MISSING):
+            self._create_model(model)
+
+        if self.journal is not None:
+            self.journal.flush()
+        return self
+
+    def _create_model(self, model: tuple) -> 'ProcessWorkbook':
+        """
+            Creates a sellable item for the (make, model) `model`
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        logging.info('Creating model: %s', (model[1]))
+        result = self.api.do_create(
+            'erpwarehouse.sellable',
+            {
+                'make': model[0],
+                'model': model[1]
+            }
+        )
+        self.models.mark_created(model, result)
+        if self.journal is not None:
+            self.journal.complete(self._model_key(model), result)
+
+        return self
+
+    def open_journal(self) -> 'ProcessWorkbook':
+        """
+            When `USE_JOURNAL` is set, opens the journal of this
+            import, `<spreadsheet>.<sheet>.journal` (or
+            `<spreadsheet>.journal` without a sheet), which records
+            each sellable id and line item as it is uploaded. Each
+            sheet of a workbook has a journal of its own.
+
+            When `self.resume` is set, anything the journal records
+            as done is skipped without asking Odoo again. Line items
+            that were being uploaded when the import stopped are
+            checked for in Odoo first, as they may have been created.
+            Otherwise, the journal is cleared and the import starts over.
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if USE_JOURNAL and self.journal is None:
+            path = '%s.journal' % (self.spreadsheet)
+            if self.sheet:
+                path = '%s.%s.journal' % (self.spreadsheet, self.sheet)
+            self.journal = ImportJournal(path, resume=self.resume, batch_size=JOURNAL_BATCH_SIZE)
+            if self.resume:
+                logging.info(
+                    'Resuming from %s, with %d operations done and %d unfinished',
+                    path, len(self.journal), len(self.journal.unfinished)
+                )
+
+        return self
+
+    def prefetch_asset_lines(self) -> 'ProcessWorkbook':
+        """
+            When `PREFETCH_ASSETS` is set, reads the (make, serial)
+            of every line on the asset catalog into `self.asset_index`,
+            which `asset_line_exists` will then check instead of
+            searching Odoo for each record. When this instance was
+            given the AssetIndex of an earlier import into the same
+            asset catalog, only the lines added since are read.
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if PREFETCH_ASSETS and self.asset_catalog_id:
+            logging.info('Reading existing lines from the asset catalog')
+            self.asset_index = self.previous_asset_index
+            if self.asset_index is None or self.asset_index.catalog_id != self.asset_catalog_id:
+                self.asset_index = AssetIndex(self.asset_catalog_id)
+            self.asset_index.fetch(self.api, ASSET_PAGE_SIZE)
+            self.pending_assets = AssetIndex(self.asset_catalog_id)
+            logging.info('Found %d existing asset catalog lines', len(self.asset_index))
 
         return self
 
@@ -355,46 +987,318 @@ class ProcessWorkbook:
             Determines if a line is the same if either the
             serial number was previously recorded.
 
+            When the asset catalog was prefetched, the check
+            is made against `self.asset_index` without a request,
+            and includes the lines that are queued to be created
+
             Returns True if there is an existing record in Odoo,
             False otherwise.
         """
-        logging.debug('Checking if "%s" already exists before creation in Odoo', (record.serial))
-        result = self.api.do_search(
-            'erpwarehouse.asset',
-            [
-                ('catalog', '=', ASSET_CATALOG_ID),
-                ('make', '=', self.get_id_from_model(record.model)),
-                ('serial', '=ilike', record.serial),
-            ]
-        )
+        if self.asset_index is not None:
+            sellable_id = self.get_id_from_model(record.model)
+            return (
+                self.asset_index.contains(sellable_id, record.serial)
+                or self.pending_assets.contains(sellable_id, record.serial)
+            )
+
+        result = self.api.do_search('erpwarehouse.asset', self._asset_line_domain(record))
         if len(result) > 0:
             return True
         return False
 
+    def _asset_line_domain(self, record: Record) -> list:
+        """
+            Returns the Odoo domain that finds the asset
+            catalog lines matching `record`
+        """
+        return [
+            ('catalog', '=', self.asset_catalog_id),
+            ('make', '=', self.get_id_from_model(record.model)),
+            ('serial', '=ilike', record.serial),
+        ]
+
+    def _queue_line(self, model: str, record: Record, values: dict) -> 'ProcessWorkbook':
+        """
+            Adds a line item with `values` for `record` to the
+            line items waiting to be created on `model`, and
+            creates them once there are enough for a full batch
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if self.journal is not None and self.journal.is_done(self._line_key(model, values)):
+            logging.debug('"%s" was uploaded before resuming, so it was skipped', (record.serial))
+            self.lines_resumed += 1
+            return self
+
+        if model == 'erpwarehouse.asset' and self.pending_assets is not None:
+            self.pending_assets.add(values['make'], values['serial'])
+        pending = self.pending_lines[model]
+        pending.append((record, values))
+        if len(pending) >= self.api.create_batch_size:
+            self._flush_lines(model)
+
+        return self
+
+    def _flush_lines(self, model: str) -> 'ProcessWorkbook':
+        """
+            Sends all the line items waiting to be created
+            on `model` to be uploaded.
+
+            When there are upload workers, the upload runs
+            on one of them, and this only waits for earlier
+            uploads when too many are already in flight.
+            Otherwise, the upload runs right away.
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        pending = self.pending_lines[model]
+        self.pending_lines[model] = list()
+        if not pending:
+            return self
+
+        if self.journal is not None:
+            # On disk before the request, so that a resumed import knows to check for them
+            self.journal.plan([self._line_key(model, values) for _, values in pending])
+            self.journal.flush()
+
+        if self.async_api is not None:
+            # Uploaded together once there are enough to fill the requests in flight
+            self.uploads.append((model, pending, None))
+            if len(self.uploads) >= self.async_api.concurrency:
+                self._upload_async()
+            return self
+
+        if self.upload_executor is None:
+            self._report_lines(model, pending, self._upload_lines(model, pending))
+            return self
+
+        self.uploads.append((model, pending, self.upload_executor.submit(self._upload_lines, model, pending)))
+        self._collect_uploads(limit=UPLOAD_WORKERS * 2)
+
+        return self
+
+    def _upload_lines(self, model: str, pending: list) -> tuple:
+        """
+            Creates the `pending` line items on `model` in as
+            few requests as possible. When the asset catalog
+            wasn't prefetched, asset lines that already exist
+            in Odoo are searched for here and left out. So are
+            asset lines that repeat the make and serial (in any
+            case) of an earlier one in `pending`, and data
+            destruction lines that a resumed import was
+            uploading when it stopped, see `open_journal`.
+
+            This may run on an upload worker, so it must not
+            change any state or log anything. That's left to
+            `_report_lines`, which always runs in order.
+
+            Returns a tuple of (skipped, ids, errors), where
+            `skipped` is a set of the indexes in `pending` that
+            already existed, and `ids` and `errors` are the
+            result of `API.do_create_many` for the rest
+        """
+        skipped = self._repeated_lines(model, pending)
+        if model == 'erpwarehouse.asset' and self.asset_index is None:
+            skipped |= {
+                index for index, (record, _) in enumerate(pending)
+                if index not in skipped and self.asset_line_exists(record)
+            }
+        elif model == 'erpwarehouse.ddl_item':
+            skipped = {
+                index for index in self._unfinished_lines(model, pending)
+                if self.api.do_search(model, self._ddl_line_domain(pending[index][1]))
+            }
+
+        queries = [values for index, (_, values) in enumerate(pending) if index not in skipped]
+        if not queries:
+            return skipped, list(), dict()
+        return (skipped,) + self.api.do_create_many(model, queries)
+
+    def _upload_async(self) -> 'ProcessWorkbook':
+        """
+            Uploads the batches waiting in `self.uploads` with
+            `self.async_api`, all at the same time, and reports
+            them in the order they were sent
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        uploads = list(self.uploads)
+        self.uploads.clear()
+        results = self.loop.run_until_complete(self._gather(
+            self._upload_lines_async(model, pending) for model, pending, _ in uploads
+        ))
+        for (model, pending, _), result in zip(uploads, results):
+            self._report_lines(model, pending, result)
+
+        return self
+
+    async def _upload_lines_async(self, model: str, pending: list) -> tuple:
+        """
+            Coroutine version of `_upload_lines`, using `self.async_api`
+        """
+        skipped = self._repeated_lines(model, pending)
+        if model == 'erpwarehouse.asset' and self.asset_index is None:
+            searched = [index for index in range(len(pending)) if index not in skipped]
+            found = await asyncio.gather(*[
+                self.async_api.do_search('erpwarehouse.asset', self._asset_line_domain(pending[index][0]))
+                for index in searched
+            ])
+            skipped |= {index for index, result in zip(searched, found) if result}
+        elif model == 'erpwarehouse.ddl_item':
+            unfinished = self._unfinished_lines(model, pending)
+            found = await asyncio.gather(*[
+                self.async_api.do_search(model, self._ddl_line_domain(pending[index][1]))
+                for index in unfinished
+            ])
+            skipped = {index for index, result in zip(unfinished, found) if result}
+
+        queries = [values for index, (_, values) in enumerate(pending) if index not in skipped]
+        if not queries:
+            return skipped, list(), dict()
+        return (skipped,) + await self.async_api.do_create_many(model, queries)
+
+    def _repeated_lines(self, model: str, pending: list) -> set:
+        """
+            Returns the indexes in `pending` of the asset line items
+            whose make and serial, compared case insensitively the
+            same as `=ilike`, are the same as an earlier one's
+        """
+        if model != 'erpwarehouse.asset':
+            return set()
+        seen = set()
+        repeated = set()
+        for index, (_, values) in enumerate(pending):
+            key = (values['make'], str(values['serial']).casefold())
+            if key in seen:
+                repeated.add(index)
+            seen.add(key)
+        return repeated
+
+    def _line_key(self, model: str, values: dict) -> str:
+        """
+            Returns the journal key of the line item with `values` on `model`
+        """
+        return ImportJournal.key(model, *[values[field] for field in self.JOURNAL_KEYS[model]])
+
+    def _unfinished_lines(self, model: str, pending: list) -> list:
+        """
+            Returns the indexes in `pending` of the line items that
+            were being uploaded when a resumed import stopped
+        """
+        if self.journal is None or not self.journal.unfinished:
+            return list()
+        return [
+            index for index, (_, values) in enumerate(pending)
+            if self.journal.in_doubt(self._line_key(model, values))
+        ]
+
+    def _ddl_line_domain(self, values: dict) -> list:
+        """
+            Returns the Odoo domain that finds the data
+            destruction lines matching the line item `values`
+        """
+        return [
+            ('ddl', '=', values['ddl']),
+            ('serial', '=', values['serial']),
+            ('storser', '=', values['storser']),
+        ]
+
+    def _report_lines(self, model: str, pending: list, result: tuple) -> 'ProcessWorkbook':
+        """
+            Counts and logs the `result` of `_upload_lines`
+            for the `pending` line items on `model`.
+
+            Line items that already existed, or that Odoo
+            refused, are logged and skipped. The rest, and those
+            that already existed, are recorded in the journal,
+            and asset lines are moved from `self.pending_assets`
+            to `self.asset_index`
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        skipped, ids, errors = result
+        created = 0
+        for index, (record, values) in enumerate(pending):
+            if index in skipped:
+                logging.warning('"%s" already existed, so it was skipped', (record.serial))
+                if self.journal is not None:
+                    self.journal.complete(self._line_key(model, values), None)
+                self._index_line(model, values)
+                continue
+
+            if ids[created] is None:
+                logging.error('Unable to add "%s": %s', record.serial, errors[created].faultString)
+                self.failed_serials.add(record.serial)
+                self._index_line(model, values, uploaded=False)
+            else:
+                if self.journal is not None:
+                    self.journal.complete(self._line_key(model, values), ids[created])
+                self._index_line(model, values)
+                if model == 'erpwarehouse.asset':
+                    self.sorting_records_uploaded += 1
+                else:
+                    self.data_records_uploaded += 1
+                logging.debug('Added id: %s', (ids[created]))
+            created += 1
+
+        return self
+
+    def _index_line(self, model: str, values: dict, uploaded: bool = True) -> 'ProcessWorkbook':
+        """
+            Removes the asset line item with `values` from
+            `self.pending_assets` once its upload is over, and
+            adds it to `self.asset_index` when it was `uploaded`
+            (it is on the asset catalog in Odoo)
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if model == 'erpwarehouse.asset' and self.asset_index is not None:
+            self.pending_assets.discard(values['make'], values['serial'])
+            if uploaded:
+                self.asset_index.add(values['make'], values['serial'])
+
+        return self
+
+    def _collect_uploads(self, limit: int = 0) -> 'ProcessWorkbook':
+        """
+            Reports uploads from the upload workers in the
+            order they were sent, waiting for each in turn,
+            until no more than `limit` are still in flight
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        while len(self.uploads) > limit:
+            model, pending, future = self.uploads.popleft()
+            self._report_lines(model, pending, future.result())
+
+        return self
+
     def _create_asset_catalog_line(self, record: Record) -> 'ProcessWorkbook':
         """
             With the provided `record` (Record) instance,
-            this method will issue an API request to Odoo
-            to create the line item after searching Odoo
-            for that record.
+            this method will queue the line item to be
+            created in Odoo. Unless the asset catalog was
+            prefetched, Odoo is searched for that record
+            when the line item is uploaded.
         """
-        if self.get_id_from_model(record.model):
-            if not self.asset_line_exists(record):
-                result = self.api.do_create(
+        sellable_id = self.get_id_from_model(record.model)
+        if sellable_id:
+            if self.asset_index is None or not self.asset_line_exists(record):
+                self._queue_line(
                     'erpwarehouse.asset',
+                    record,
                     {
-                        'catalog': ASSET_CATALOG_ID,
-                        'make': self.get_id_from_model(record.model),
+                        'catalog': self.asset_catalog_id,
+                        'make': sellable_id,
                         'serial': record.serial,
                         'tag': record.asset_tag,
                     }
                 )
-                self.sorting_records_uploaded += 1
-                logging.debug('Added id: %s', (result))
             else:
                 logging.warning('"%s" already existed, so it was skipped', (record.serial))
         else:
             logging.error('Unable to add "%s" as there is no sellable id', (record.serial))
+            self.failed_serials.add(record.serial)
 
         return self
 
@@ -403,10 +1307,25 @@ class ProcessWorkbook:
     ) -> 'ProcessWorkbook':
         """
             With the provided `record` and optional `child` Record
-            instances, this method will issue an API request to
-            Odoo to create the line item
+            instances, this method will queue the line item to
+            be created in Odoo
         """
+        sellable_id = self.get_id_from_model(record.model)
+        if sellable_id:
+            self._queue_line(
+                'erpwarehouse.ddl_item', record, self._ddl_line_values(record, sellable_id, child)
+            )
+        else:
+            logging.error('Unable to add "%s" as there is no sellable id', (record.serial))
+            self.failed_serials.add(record.serial)
 
+        return self
+
+    def _ddl_line_values(self, record: Record, sellable_id: int, child: Record = None) -> dict:
+        """
+            Returns the values of the data destruction line item
+            of `record` and its optional `child`, for `sellable_id`
+        """
         device_type = '0'
         if record.device_type == 'Hard Drive':
             device_type = 'H'
@@ -423,23 +1342,137 @@ class ProcessWorkbook:
             elif child.device_type == 'Tape':
                 device_type = 'T'
 
-        if self.get_id_from_model(record.model):
-            result = self.api.do_create(
+        return {
+            'ddl': self.data_destruction_id,
+            'make': sellable_id,
+            'serial': record.serial,
+            'storser': child.serial if child else 'N/A',
+            'type': device_type,
+        }
+
+    def _update_record_lines(self, records: list) -> 'ProcessWorkbook':
+        """
+            Updates the line items of `records`, which changed since
+            the last import (see `compare_with_previous`), in place.
+            Their line items are searched for with one request per
+            model, see `_update_lines`.
+
+            The asset catalog lines are found by serial, since the
+            make may be what changed. So are the data destruction lines.
+
+            When Odoo refuses to update the line items of a Record,
+            for a reason other than a transient error, its serial is
+            added to `self.failed_serials` and the rest carry on
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        updating = list()
+        for record in records:
+            sellable_id = self.get_id_from_model(record.model)
+            if sellable_id:
+                updating.append((record, sellable_id))
+            else:
+                logging.error('Unable to update "%s" as there is no sellable id', (record.serial))
+                self.failed_serials.add(record.serial)
+        if not updating:
+            return self
+
+        serials = [record.serial for record, _ in updating]
+        asset_lines = collections.defaultdict(list)
+        if self.asset_catalog_id:
+            domain = [('catalog', '=', self.asset_catalog_id)]
+            domain += any_of([('serial', '=ilike', serial) for serial in serials])
+            options = {'fields': ['serial'], 'order': 'id'}
+            for line in self.api.do_search_and_read('erpwarehouse.asset', domain, options):
+                asset_lines[str(line['serial']).casefold()].append(line['id'])
+
+        ddl_lines = collections.defaultdict(dict)
+        if self.data_destruction_id:
+            for line in self.api.do_search_and_read(
                 'erpwarehouse.ddl_item',
-                {
-                    'ddl': DATA_DESTRUCTION_ID,
-                    'make': self.get_id_from_model(record.model),
-                    'serial': record.serial,
-                    'storser': child.serial if child else 'N/A',
-                    'type': device_type,
+                [('ddl', '=', self.data_destruction_id), ('serial', 'in', serials)],
+                {'fields': ['serial', 'storser'], 'order': 'id'}
+            ):
+                ddl_lines[line['serial']][line['id']] = line['storser']
+
+        for record, sellable_id in updating:
+            try:
+                self._update_lines(
+                    record, sellable_id, asset_lines[str(record.serial).casefold()], ddl_lines[record.serial]
+                )
+            except xmlrpc.client.Fault as error:
+                if self.api.is_transient('write', error):
+                    raise
+                logging.error('Unable to update "%s": %s', record.serial, error.faultString)
+                self.failed_serials.add(record.serial)
+
+        return self
+
+    def _update_lines(self, record: Record, sellable_id: int, asset_ids: list, ddl_lines: dict) -> 'ProcessWorkbook':
+        """
+            Updates the asset catalog lines `asset_ids` of `record`,
+            and its data destruction lines `ddl_lines` (a dictionary
+            of line id to the serial of the drive), to `sellable_id`.
+
+            Data destruction lines are matched to the children of
+            `record` by the serial of the drive, then reused for the
+            children that are new. Line items that aren't in Odoo
+            are queued to be created, and data destruction lines
+            left over from removed children are logged and left alone.
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if self.asset_catalog_id:
+            if asset_ids:
+                self.api.do_write('erpwarehouse.asset', asset_ids, {
+                    'make': sellable_id,
+                    'tag': record.asset_tag,
                 })
-            self.data_records_uploaded += 1
-            logging.debug('Added id: %s', (result))
-        else:
-            logging.error('Unable to add "%s" as there is no sellable id', (record.serial))
+                self.lines_updated += len(asset_ids)
+                if self.asset_index is not None:
+                    self.asset_index.add(sellable_id, record.serial)
+                logging.debug('Updated asset line ids: %s', (asset_ids))
+            else:
+                self._create_asset_catalog_line(record)
+
+        if self.data_destruction_id:
+            existing = dict(ddl_lines)
+            lines = [self._ddl_line_values(record, sellable_id, child) for child in record.children or (None,)]
+            unmatched = list()
+            for values in lines:
+                line_id = next((key for key, storser in existing.items() if storser == values['storser']), None)
+                if line_id is None:
+                    unmatched.append(values)
+                else:
+                    self._update_ddl_line(existing.pop(line_id), line_id, values)
+
+            for values in unmatched:
+                if existing:
+                    line_id, storser = existing.popitem()
+                    self._update_ddl_line(storser, line_id, values)
+                else:
+                    self._queue_line('erpwarehouse.ddl_item', record, values)
+
+            for storser in existing.values():
+                logging.warning(
+                    '"%s" has a data destruction line for "%s", which is no longer in the spreadsheet',
+                    record.serial, storser
+                )
 
         return self
 
+    def _update_ddl_line(self, storser: str, line_id: int, values: dict) -> 'ProcessWorkbook':
+        """
+            Writes `values` to the data destruction line `line_id`,
+            which was for the drive `storser`
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        self.api.do_write('erpwarehouse.ddl_item', [line_id], values)
+        self.lines_updated += 1
+        logging.debug('Updated data destruction line id %s, which was for "%s"', line_id, storser)
+        return self
+
     def create_line_items(self) -> 'ProcessWorkbook':
         """
             For all the records that we can
@@ -447,60 +1480,399 @@ class ProcessWorkbook:
             create the asset catalog and
             data destruction line items.
 
+            Line items are created in batches
+            of `self.api.create_batch_size`,
+            by `UPLOAD_WORKERS` threads when
+            there is more than one. With
+            `USE_ASYNC`, batches are uploaded
+            at the same time, as many as
+            `self.async_api.concurrency` at once
+
             Returns `self` (this instance of ProcessWorkbook)
         """
         logging.info('Creating Line items for accepted records in Odoo')
         for record in self.records_to_upload:
+            self._create_record_lines(record)
 
-            if ASSET_CATALOG_ID:
-                self._create_asset_catalog_line(record)
+        self._flush_updates()
+        for model in self.pending_lines:
+            self._flush_lines(model)
 
-            if DATA_DESTRUCTION_ID:
-                if not record.children:
-                    self._create_data_destruction_line(record)
-                else:
-                    for child in record.children:
-                        self._create_data_destruction_line(record, child)
+        if self.async_api is not None and self.uploads:
+            self._upload_async()
+
+        self._collect_uploads()
+
+        return self
+
+    def _create_record_lines(self, record: Record) -> 'ProcessWorkbook':
+        """
+            Queues the asset catalog and data destruction
+            line items of `record`, see `create_line_items`
+
+            Records that changed since the last import
+            have their line items updated instead, a batch
+            at a time, see `_update_record_lines`
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if record.serial in self.changed_serials:
+            self.pending_updates.append(record)
+            if len(self.pending_updates) >= self.api.create_batch_size:
+                self._flush_updates()
+            return self
+
+        if self.asset_catalog_id:
+            self._create_asset_catalog_line(record)
+
+        if self.data_destruction_id:
+            if not record.children:
+                self._create_data_destruction_line(record)
+            else:
+                for child in record.children:
+                    self._create_data_destruction_line(record, child)
+
+        return self
+
+    def _flush_updates(self) -> 'ProcessWorkbook':
+        """
+            Updates the line items of all the changed Records
+            waiting in `self.pending_updates`
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        records = self.pending_updates
+        self.pending_updates = list()
+        if records:
+            self._update_record_lines(records)
 
         return self
 
     def remove_ignored_records(self) -> None:
         """
             Populates `self.records_to_upload` with
-            any record that is not also a part of the
-            `self.serials_to_ignore` list, counts the
+            any record that doesn't match the rules in
+            `self.serials_to_ignore`, counts the
             serials that were ignored, and writes those
-            rows to an ignore csv
+            rows to an ignore csv. Records that haven't
+            changed since the last import (see
+            `compare_with_previous`) are left out
         """
         logging.info('Removing Ignored Serials from Records')
+        self._open_ignore_csv()
 
         for record in self.records:
             if record.serial in self.serials_to_ignore:
-                self.records_ignored += 1
-                logging.warning(
-                    '"%s" is special, skipping import and saving to special list', (record.serial)
-                )
-                self.ignore_csv.writerow({
-                    'serial': record.serial,
-                    'asset_tag': record.asset_tag,
-                    'make': record.make,
-                    'model': record.model,
-                    'device_type': record.device_type,
-                    'children': record.children,
-                })
-            else:
+                self._ignore_record(record)
+            elif record.serial not in self.unchanged:
                 self.records_to_upload.append(record)
 
+    def _open_ignore_csv(self) -> 'ProcessWorkbook':
+        """
+            Opens the ignore csv, unless it is already open
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        if self.ignore_csv_file is None:
+            self.ignore_csv_file = open(self.ignore_csv_path, 'w')
+            self.ignore_csv = csv.DictWriter(
+                self.ignore_csv_file,
+                fieldnames=[
+                    'serial', 'asset_tag', 'make',
+                    'model', 'device_type', 'children'
+                ],
+                dialect=csv.excel
+            )
+            self.ignore_csv.writeheader()
+
+        return self
+
+    def _ignore_record(self, record: Record) -> 'ProcessWorkbook':
+        """
+            Counts `record` as ignored, and writes it to the ignore csv
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        self.records_ignored += 1
+        logging.warning(
+            '"%s" is special, skipping import and saving to special list', (record.serial)
+        )
+        self.ignore_csv.writerow({
+            'serial': record.serial,
+            'asset_tag': record.asset_tag,
+            'make': record.make,
+            'model': record.model,
+            'device_type': record.device_type,
+            'children': record.children,
+        })
+
+        return self
+
+    def run_pipeline(self) -> 'ProcessWorkbook':
+        """
+            Does the same as running `PHASES` one after the other,
+            but with each step working on the Records that the step
+            before it has finished with, rather than waiting for
+            every Record to get through that step first:
+
+                `parse` reads the spreadsheet into Records (see
+                    `iter_records`) on its own thread
+                `resolve` leaves out the ignored and unchanged
+                    Records, and resolves the models of the rest
+                    in batches on its own thread, so that a Record
+                    is only passed on once its sellable id is known
+                the main thread then creates the line items of each
+                    Record, uploading them as in `create_line_items`
+
+            The steps are joined by queues of `PIPELINE_QUEUE_SIZE`
+            Records. The seconds that each step spent waiting for
+            a full queue are logged, which shows the slowest step.
+
+            Only the models of Records that are uploaded are searched
+            for, and a model batch is searched for early when the
+            spreadsheet is being read slower than models are resolved.
+
+            Returns `self` (this instance of ProcessWorkbook)
+        """
+        logging.info('Parsing, resolving models and uploading at the same time')
+        self.run_phase('open_journal')
+        self.run_phase('sync_sellable_catalog')
+        previous = self._open_fingerprints() if DELTA_IMPORT else None
+        changed = list()
+        self._open_ignore_csv()
+
+        parsed = queue.Queue(PIPELINE_QUEUE_SIZE)
+        resolved = queue.Queue(PIPELINE_QUEUE_SIZE)
+        threads = [
+            threading.Thread(
+                target=self._run_stage, name='parse', daemon=True,
+                args=('parse', self._parse_stage, (parsed,), parsed)
+            ),
+            threading.Thread(
+                target=self._run_stage, name='resolve', daemon=True,
+                args=('resolve', self._resolve_stage, (parsed, resolved, previous, changed), resolved)
+            ),
+        ]
+        self.stopping.clear()
+        for thread in threads:
+            thread.start()
+        try:
+            self.run_phase('prefetch_asset_lines')
+            record = self._get(resolved, 'resolved')
+            while record is not None:
+                self._create_record_lines(record)
+                record = self._get(resolved, 'resolved')
+
+            self._flush_updates()
+            for model in self.pending_lines:
+                self._flush_lines(model)
+            self._collect_uploads()
+        finally:
+            self.stopping.set()
+            for thread in threads:
+                thread.join()
+
+        if previous is not None:
+            self._find_removed(previous)
+            self._write_delta_csv(changed)
+        self.run_phase('save_fingerprints')
+        logging.info(
+            'Pipeline waits: parse %.3fs, resolve %.3fs',
+            self.pipeline_waits['parse'], self.pipeline_waits['resolve']
+        )
+
+        return self
+
+    def _run_stage(self, name: str, work, args: tuple, output: queue.Queue) -> None:
+        """
+            Runs the step `name` of `run_pipeline` by calling
+            `work` with `args`, then puts None on `output` to
+            mark the end of its Records, or the exception that
+            `work` raised, so that the next step raises it too
+        """
+        # pylint: disable=broad-except
+        try:
+            if self.metrics is None:
+                work(*args)
+            else:
+                with self.metrics.phase('pipeline_%s' % (name)):
+                    work(*args)
+        except PipelineStopped:
+            return
+        except BaseException as error:
+            logging.error('The %s step of the pipeline failed: %s', name, error)
+            self._put(output, error, name)
+            return
+        self._put(output, None, name)
+
+    def _put(self, target: queue.Queue, item, stage: str) -> None:
+        """
+            Puts `item` on `target` for the step after `stage`,
+            timing how long `stage` waited for space on it
+
+            Raises PipelineStopped if the pipeline was stopped while waiting
+        """
+        try:
+            target.put_nowait(item)
+            return
+        except queue.Full:
+            pass
+
+        start = time.perf_counter()
+        while True:
+            if self.stopping.is_set():
+                raise PipelineStopped(stage)
+            try:
+                target.put(item, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+
+        waited = time.perf_counter() - start
+        self.pipeline_waits[stage] += waited
+        if self.metrics is not None:
+            self.metrics.increment('pipeline_%s_waits' % (stage))
+            self.metrics.increment('pipeline_%s_wait_seconds' % (stage), waited)
+
+    def _get(self, source: queue.Queue, name: str, block: bool = True):
+        """
+            Returns the next item on the queue `name`, or None
+            once the step before it has finished. Raises the
+            exception that step failed with instead, or
+            `queue.Empty` if `block` isn't set and there is
+            nothing on the queue yet
+
+            Raises PipelineStopped if the pipeline was stopped while waiting
+        """
+        if self.metrics is not None:
+            self.metrics.set('pipeline_%s_queue' % (name), source.qsize())
+
+        while True:
+            if self.stopping.is_set():
+                raise PipelineStopped(name)
+            try:
+                item = source.get(timeout=0.1) if block else source.get_nowait()
+                break
+            except queue.Empty:
+                if not block:
+                    raise
+
+        if isinstance(item, BaseException):
+            raise item
+        return item
+
+    def _parse_stage(self, parsed: queue.Queue) -> None:
+        """
+            The `parse` step of `run_pipeline`, which puts each
+            Record on `parsed` once its Children have been read
+        """
+        for record in self.iter_records(search_models=False):
+            self._put(parsed, record, 'parse')
+
+    def _resolve_stage(
+        self, parsed: queue.Queue, resolved: queue.Queue,
+        previous: Union[dict, None], changed: list
+    ) -> None:
+        """
+            The `resolve` step of `run_pipeline`, which puts each
+            Record from `parsed` that is to be uploaded on `resolved`,
+            once the sellable id of its model is known. Records whose
+            model is known go ahead of those held for a search, and no
+            more than `PIPELINE_QUEUE_SIZE` are held before searching.
+
+            When `previous` is set, Records are compared with those
+            fingerprints as in `compare_with_previous`
+        """
+        # Models waiting to be searched for, and the Records waiting on them, in order
+        batch = list()
+        held = list()
+        while True:
+            try:
+                record = self._get(parsed, 'parsed', block=not batch)
+            except queue.Empty:
+                self._resolve_batch(batch, held, resolved)
+                continue
+            if record is None:
+                break
+
+            if record.serial in self.serials_to_ignore:
+                self._ignore_record(record)
+                continue
+            if previous is not None and self._compare_record(record, previous, changed):
+                continue
+            self.records_to_upload.append(record)
+
+            if self._resolve_model(record, batch):
+                self._put(resolved, record, 'resolve')
+            else:
+                held.append(record)
+                if len(batch) >= MODEL_BATCH_SIZE or len(held) >= PIPELINE_QUEUE_SIZE:
+                    self._resolve_batch(batch, held, resolved)
+
+        self._resolve_batch(batch, held, resolved)
+
+    def _resolve_model(self, record: Record, batch: list) -> bool:
+        """
+            Registers the model of `record`, and resolves it from
+            the journal or the sellable catalog when it can. Otherwise,
+            it is added to `batch` to be searched for, unless it is
+            already in there
+
+            Returns True if the sellable id of the model is known
+        """
+        self.models.add(record.make, record.model)
+        if self.get_id_from_model(record.model) is not None:
+            return True
+
+        model = self.models.by_model[record.model]
+        if model not in batch:
+            sellable_id = self.journal.get(self._model_key(model)) if self.journal is not None else None
+            if not sellable_id and self.catalog is not None:
+                sellable_id = self.catalog.match(model[1])
+            if sellable_id:
+                self.models.resolve(model, sellable_id)
+                return True
+            batch.append(model)
+        return False
+
+    def _resolve_batch(self, batch: list, held: list, resolved: queue.Queue) -> None:
+        """
+            Searches Odoo for the models in `batch`, creating any
+            that are missing, then puts the `held` Records on `resolved`
+        """
+        if batch:
+            self._match_models(batch, self.api.do_search_and_read(*self._model_query(batch)))
+            for model in batch:
+                if self.models.state(model) == ModelRegistry.MISSING:
+                    self._create_model(model)
+            if self.journal is not None:
+                self.journal.flush()
+            batch.clear()
+
+        for record in held:
+            self._put(resolved, record, 'resolve')
+        held.clear()
+
     def run(self) -> None:
         """
-            Runs everything in the order that is required
+            Runs everything in the order that is required, see `PHASES`,
+            or with `PIPELINE`, runs the steps at the same time
+        """
+        if PIPELINE:
+            self.run_phase('run_pipeline')
+            return
+        for phase in self.PHASES:
+            self.run_phase(phase)
+
+    def run_phase(self, phase: str) -> None:
+        """
+            Runs the method named `phase`, timing it when `METRICS` is set
         """
-        self.build_record_list()
-        self.show_records()
-        self.get_odoo_model_ids()
-        self.create_missing_model_ids()
-        self.remove_ignored_records()
-        self.create_line_items()
+        if self.metrics is None:
+            getattr(self, phase)()
+            return
+        with self.metrics.phase(phase):
+            getattr(self, phase)()
 
 if __name__ == '__main__':
-    ProcessWorkbook().run()
+    ProcessWorkbook(resume=RESUME or '--resume' in sys.argv[1:]).run()
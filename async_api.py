@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=missing-module-docstring
+# pylint: disable=line-too-long
+# pylint: disable=bad-continuation
+# pylint: disable=dangerous-default-value
+# pylint: disable=protected-access
+
+from exceptions import InputError
+from api import BaseAPI, AdaptiveLimit, PoolStats, PROTOCOLS, chunked, dump_jsonrpc, load_jsonrpc, compress, decompress
+
+import xmlrpc.client
+import urllib.parse
+import collections
+import itertools
+import asyncio
+import logging
+import time
+import ssl
+import os
+
+class AsyncConnection:
+    """
+        A single keep-alive HTTP/1.1 connection, made with asyncio streams
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+        self.last_used = time.monotonic()
+
+    def close(self) -> None:
+        """
+            Closes the connection without waiting for it to finish closing
+        """
+        self.writer.close()
+
+    async def _read_body(self, headers: dict) -> bytes:
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = bytearray()
+            while True:
+                size = int((await self.reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # Trailers, if any, end with an empty line
+                    while (await self.reader.readline()) not in (b'\r\n', b'\n', b''):
+                        pass
+                    return bytes(body)
+                body.extend(await self.reader.readexactly(size))
+                await self.reader.readexactly(2)
+        if 'content-length' in headers:
+            return await self.reader.readexactly(int(headers['content-length']))
+        return await self.reader.read()
+
+    async def post(
+        self, host: str, handler: str, body: bytes, content_type: str = 'text/xml', headers: tuple = ()
+    ) -> tuple:
+        """
+            Sends `body` to `handler` on `host`, with any
+            other `headers` as (name, value) tuples
+
+            Returns a tuple of (status, headers, body) where `headers`
+            has lowercase names
+        """
+        # pylint: disable=too-many-arguments
+        self.writer.write(
+            b'POST %s HTTP/1.1\r\n'
+            b'Host: %s\r\n'
+            b'User-Agent: %s\r\n'
+            b'Content-Type: %s\r\n'
+            b'Content-Length: %d\r\n'
+            b'%s'
+            b'\r\n' % (
+                handler.encode(), host.encode(), xmlrpc.client.Transport.user_agent.encode(),
+                content_type.encode(), len(body),
+                b''.join(b'%s: %s\r\n' % (name.encode(), value.encode()) for name, value in headers)
+            )
+        )
+        self.writer.write(body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('The server closed the connection')
+        status = int(status_line.split()[1])
+
+        headers = dict()
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        response = await self._read_body(headers)
+        self.last_used = time.monotonic()
+        return status, headers, response
+
+class AsyncAPI(BaseAPI):
+    """
+        An asyncio counterpart to `API`, for keeping many requests
+        in flight from a single thread.
+
+        It is configured from the same environment as `API`, see
+        `BaseAPI`, but has none of its connections. Up to
+        `odoo_pool_size` of its own connections are kept alive between
+        requests, for `odoo_pool_idle_timeout` seconds. Additionally:
+            `odoo_async_requests` - integer, optional, the most requests that can be in flight at once. Defaults to 100.
+                With `odoo_throttle`, the limit adapts to the server up to this many
+
+        Requests are marshalled with `xmlrpc.client`, or `json` when
+        `odoo_protocol` is `jsonrpc`, and sent with asyncio streams,
+        so nothing outside the standard library is needed. The `do_*` methods are coroutines, and otherwise behave
+        the same as those of `API`.
+
+        Connections belong to the event loop they were opened on, so
+        when an instance is used on a new event loop, it starts over
+        with new connections.
+    """
+
+    def __init__(self, concurrency: int = None) -> None:
+        super().__init__()
+
+        url = urllib.parse.urlsplit("%s%s" % (self.hostname, PROTOCOLS[self.protocol]))
+        self.use_https = url.scheme == 'https'
+        self.host = url.hostname
+        self.port = url.port or (443 if self.use_https else 80)
+        self.netloc = url.netloc
+        self.handler = url.path
+
+        if concurrency is None:
+            concurrency = int(os.environ.get('odoo_async_requests', 100))
+        if concurrency < 1:
+            raise InputError('odoo_async_requests', 'At least one request has to be allowed in flight')
+
+        self.concurrency = concurrency
+        if self.throttle:
+            self.limit = AdaptiveLimit(maximum=concurrency)
+        self.stats = PoolStats()
+        self._ids = itertools.count(1)
+        # The event loop that the connections and request slots below belong to
+        self._loop = None
+        self._waiting = collections.deque()
+        self._in_flight = 0
+        self._idle = list()
+
+    def _use_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """
+            Starts over on `loop`, without the connections and the
+            requests waiting for a slot of the event loop used before,
+            as they can't be used from another one
+        """
+        if self._idle or self._in_flight:
+            logging.debug(
+                'AsyncAPI moved to a new event loop, leaving %d idle connections and %d requests behind',
+                len(self._idle), self._in_flight
+            )
+        self._loop = loop
+        self._waiting = collections.deque()
+        self._in_flight = 0
+        self._idle = list()
+
+    async def _open(self) -> AsyncConnection:
+        context = None
+        if self.use_https:
+            # Don't verify TLS Certificates, for the same reason as `API._connect`
+            context = ssl._create_unverified_context()
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=context)
+        self.stats.increment('opened')
+        return AsyncConnection(reader, writer)
+
+    async def _acquire(self) -> tuple:
+        """
+            Returns a tuple of (connection, kept_alive), preferring
+            the most recently used idle connection
+        """
+        while self._idle:
+            connection = self._idle.pop()
+            if time.monotonic() - connection.last_used > self.pool_idle_timeout:
+                self.stats.increment('idle_closed')
+                connection.close()
+                continue
+            self.stats.increment('reused')
+            return connection, True
+        return await self._open(), False
+
+    def _release(self, connection: AsyncConnection, headers: dict) -> None:
+        if headers.get('connection', '').lower() == 'close' or len(self._idle) >= self.pool_size:
+            connection.close()
+        else:
+            self._idle.append(connection)
+
+    async def _send(self, body: bytes, headers: tuple = ()) -> tuple:
+        """
+            Sends `body` with `headers` on a pooled connection, retrying
+            once on a new connection if a kept-alive one was dropped by
+            the server
+
+            Returns a tuple of (response headers, response body)
+        """
+        for attempt in (0, 1):
+            connection, kept_alive = await self._acquire()
+            try:
+                status, response_headers, response = await connection.post(
+                    self.netloc, self.handler, body,
+                    'application/json' if self.protocol == 'jsonrpc' else 'text/xml', headers
+                )
+            except (ConnectionError, asyncio.IncompleteReadError):
+                connection.close()
+                if attempt or not kept_alive:
+                    raise
+                self.stats.increment('reconnects')
+                continue
+            except BaseException:
+                connection.close()
+                raise
+
+            self._release(connection, response_headers)
+            if status != 200:
+                raise xmlrpc.client.ProtocolError(self.netloc + self.handler, status, '', response_headers)
+            return response_headers, response
+        return dict(), b''
+
+    async def _query(self, query_type: str, model: str, query: list, options: dict = {}) -> list:
+        """
+            Verifies the `query_type` is supported by the API and executes
+            the API request, waiting while too many requests are in flight.
+            Transient failures are retried the same as `API._query`
+        """
+
+        if query_type not in self.QUERY_TYPES:
+            raise InputError('query_type',
+                'Incorrect Type of query. Available types are: %s' % (', '.join(self.QUERY_TYPES)))
+
+        if self._loop is not asyncio.get_running_loop():
+            self._use_loop(asyncio.get_running_loop())
+
+        arguments = (self.database, self.user_id, self.user_pass, model, query_type, [query], options)
+        if self.protocol == 'jsonrpc':
+            body = dump_jsonrpc(arguments, next(self._ids))
+        else:
+            body = xmlrpc.client.dumps(arguments, 'execute_kw').encode('utf-8')
+
+        kind = (query_type, model)
+        attempt = 0
+        while True:
+            await self._acquire_slot()
+            start = time.perf_counter()
+            try:
+                result = await self._request(query_type, model, body)
+            except Exception as error:
+                self._release_slot()
+                delay = self._retry_delay(kind, error, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+
+            self._release_slot()
+            if self.limit is not None:
+                latency = time.perf_counter() - start
+                size = len(result) if isinstance(result, list) else 1
+                self._report_limit(self.limit.on_success(kind, latency, size), kind, 'slow responses')
+            return result
+
+    def _free_slots(self) -> int:
+        slots = self.limit.slots if self.limit is not None else self.concurrency
+        return slots - self._in_flight
+
+    async def _acquire_slot(self) -> None:
+        """
+            Waits until fewer requests than `self.limit` allows, or
+            `self.concurrency` without one, are in flight.
+            Requests get a slot in the order they asked for one
+        """
+        if not self._waiting and self._free_slots() > 0:
+            self._in_flight += 1
+            return
+
+        waiter = self._loop.create_future()
+        self._waiting.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over as this was cancelled
+                self._release_slot()
+            raise
+
+    def _release_slot(self) -> None:
+        """
+            Frees a slot, and hands free slots to the requests waiting
+            for one, only waking as many of them as can be sent
+        """
+        self._in_flight -= 1
+        while self._waiting and self._free_slots() > 0:
+            waiter = self._waiting.popleft()
+            if not waiter.done():
+                self._in_flight += 1
+                waiter.set_result(None)
+
+    async def _request(self, query_type: str, model: str, body: bytes) -> list:
+        """
+            Sends a single marshalled request for `_query`, compressed
+            the same as `API` would, recording it to `self.metrics` when set
+        """
+        uncompressed = len(body)
+        gzip_seconds = 0.0
+        headers = (('Accept-Encoding', 'gzip'),) if self.accept_gzip else ()
+        if self.gzip_threshold is not None and len(body) > self.gzip_threshold:
+            body, gzip_seconds = compress(body, self.stats)
+            headers += (('Content-Encoding', 'gzip'),)
+
+        response = b''
+        error = None
+        start = time.perf_counter()
+        try:
+            response_headers, response = await self._send(body, headers)
+            decoded = response
+            if response_headers.get('content-encoding', '') == 'gzip':
+                decoded, seconds = decompress(response, self.stats)
+                gzip_seconds += seconds
+            return self._decode(decoded)
+        except Exception as exception:
+            error = exception
+            raise
+        finally:
+            if self.metrics is not None:
+                self.metrics.observe_request(
+                    query_type, model, time.perf_counter() - start, len(body), len(response), error,
+                    (uncompressed, len(decoded) if response else 0), gzip_seconds
+                )
+
+    def _decode(self, response: bytes) -> object:
+        """
+            Returns the result of the `response` body.
+            Raises xmlrpc.client.Fault when the response is a fault
+        """
+        if self.protocol == 'jsonrpc':
+            return load_jsonrpc(response)
+        return xmlrpc.client.loads(response)[0][0]
+
+    def connection_stats(self) -> dict:
+        """
+            Returns the counters of this instance's connections, see `PoolStats`
+        """
+        return self.stats.as_dict()
+
+    async def close(self) -> None:
+        """
+            Closes every idle connection
+        """
+        while self._idle:
+            connection = self._idle.pop()
+            connection.close()
+            try:
+                await connection.writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+
+    async def do_search(self, model: str, query: list = [], options: dict = {'limit': 0}) -> list:
+        """
+            Coroutine version of `API.do_search`
+        """
+
+        return await self._query('search', model, query, options)
+
+    async def do_create(self, model: str, query: list) -> list:
+        """
+            Coroutine version of `API.do_create`
+        """
+
+        return await self._query('create', model, query)
+
+    async def do_create_many(self, model: str, queries: list, batch_size: int = None) -> tuple:
+        """
+            Coroutine version of `API.do_create_many`.
+            The batches are sent at the same time, and the records
+            of a refused batch are then created at the same time.
+        """
+
+        async def create_batch(batch: list) -> tuple:
+            try:
+                return await self._query('create', model, batch), dict()
+            except xmlrpc.client.Fault:
+                pass
+
+            results = await asyncio.gather(
+                *[self.do_create(model, query) for query in batch],
+                return_exceptions=True
+            )
+            ids = list()
+            errors = dict()
+            for index, result in enumerate(results):
+                if isinstance(result, xmlrpc.client.Fault):
+                    errors[index] = result
+                    ids.append(None)
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    ids.append(result)
+            return ids, errors
+
+        ids = list()
+        errors = dict()
+        for batch_ids, batch_errors in await asyncio.gather(
+            *[create_batch(batch) for batch in chunked(queries, batch_size or self.create_batch_size)]
+        ):
+            for index, error in batch_errors.items():
+                errors[len(ids) + index] = error
+            ids.extend(batch_ids)
+
+        return ids, errors
+
+    async def do_search_and_read(self, model: str, query: list, options: dict = {}) -> list:
+        """
+            Coroutine version of `API.do_search_and_read`
+        """
+
+        return await self._query('search_read', model, query, options)
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=bad-continuation
+
+"""
+    Imports several workbooks in one go, as listed in a manifest.
+
+    The manifest is a CSV file with a header and these columns:
+        `workbook` - the path of the workbook, relative to the manifest
+        `sheet` - the name of the sheet with the data
+        `asset_catalog_id` - the asset catalog to upload to, 0 to skip it
+        `data_destruction_id` - the data destruction to upload to, 0 to skip it
+
+    The workbooks are parsed at the same time in a process pool.
+    Every model they use is then resolved once, and the line items
+    are uploaded a workbook at a time over the same API connections.
+
+    Usage: `python3 batch.py [--resume] <manifest.csv>`, with the same
+    environment as `app.py`, or the `batch_manifest` variable.
+    `batch_processes` sets how many workbooks are parsed at once,
+    and defaults to the number of CPUs. Each workbook has its own
+    journal, so `--resume` carries on with every unfinished one.
+"""
+
+import os
+import sys
+import csv
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+from api import API
+from record import RecordBatch
+from registry import ModelRegistry
+from logs import log_directly
+from app import ProcessWorkbook, FILENAME_TIME, RESUME
+
+BATCH_PROCESSES = int(os.environ.get('batch_processes', 0)) or None
+
+def read_manifest(path: str) -> list:
+    """
+        Returns the entries of the manifest at `path` as a list of dictionaries,
+        with `workbook` made relative to the manifest's directory
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    with open(path, newline='') as manifest:
+        return [
+            {
+                'workbook': os.path.join(directory, entry['workbook']),
+                'sheet': entry['sheet'],
+                'asset_catalog_id': int(entry.get('asset_catalog_id') or 0),
+                'data_destruction_id': int(entry.get('data_destruction_id') or 0),
+            }
+            for entry in csv.DictReader(manifest)
+        ]
+
+def parse_workbook(entry: dict) -> dict:
+    """
+        Runs in a worker process. Builds the Records of the
+        workbook in `entry`, writing the rows that failed to its
+        failed csv, and returns what is needed to upload them,
+        as a dictionary of `records`, `models`, `rows_failed`
+        and `rows_processed`
+    """
+    workbook = ProcessWorkbook(
+        spreadsheet=entry['workbook'], sheet=entry['sheet'], ignore_csv=entry['ignore_csv']
+    )
+    workbook.build_record_list()
+    workbook.close(summary=False)
+    return {
+        # Much faster to pickle than the Records themselves
+        'records': RecordBatch.from_records(workbook.records),
+        'models': list(workbook.models),
+        'rows_failed': workbook.rows_failed,
+        'rows_processed': workbook.rows_processed,
+    }
+
+class BatchImport:
+    """
+        Parses and uploads every workbook listed in a manifest,
+        sharing one API and ModelRegistry between them
+    """
+
+    # The phases of ProcessWorkbook that `parse_workbook` already ran
+    PARSE_PHASES = ('build_record_list', 'show_records')
+
+    # The counters of ProcessWorkbook that are reported per workbook and totalled
+    COUNTERS = (
+        'rows_processed', 'records', 'sorting_records_uploaded',
+        'data_records_uploaded', 'records_ignored', 'rows_failed'
+    )
+
+    def __init__(self, manifest: str, resume: bool = RESUME) -> None:
+        self.entries = read_manifest(manifest)
+        self.resume = resume
+        self.api = API()
+        self.models = ModelRegistry()
+        self.results = list()
+
+    def parse(self) -> list:
+        """
+            Parses every workbook at the same time, and returns
+            a ProcessWorkbook for each that is ready to be uploaded
+        """
+        logging.info('Parsing %d workbooks', len(self.entries))
+        for index, entry in enumerate(self.entries):
+            entry['ignore_csv'] = '%s-%d.csv' % (FILENAME_TIME, index)
+        # The workers don't have the thread that writes the log, so they write it themselves
+        with ProcessPoolExecutor(BATCH_PROCESSES, initializer=log_directly) as executor:
+            parsed = list(executor.map(parse_workbook, self.entries))
+
+        workbooks = list()
+        for entry, result in zip(self.entries, parsed):
+            workbook = ProcessWorkbook(
+                spreadsheet=entry['workbook'],
+                sheet=entry['sheet'],
+                asset_catalog_id=entry['asset_catalog_id'],
+                data_destruction_id=entry['data_destruction_id'],
+                ignore_csv=entry['ignore_csv'],
+                api=self.api,
+                models=self.models,
+                resume=self.resume,
+            )
+            workbook.records = result['records'].to_records()
+            workbook.rows_failed = result['rows_failed']
+            workbook.rows_processed = result['rows_processed']
+            for make, model in result['models']:
+                self.models.add(make, model)
+            workbooks.append(workbook)
+        return workbooks
+
+    def upload(self, workbook: ProcessWorkbook) -> dict:
+        """
+            Uploads the line items of a parsed `workbook`, resolving
+            any of its models that no earlier workbook used
+
+            Returns the counters of the `workbook`
+        """
+        logging.info('Uploading %s (%s)', workbook.spreadsheet, workbook.sheet)
+        # The shared API records to the workbook that is being uploaded
+        self.api.metrics = workbook.metrics
+        for phase in workbook.PHASES:
+            if phase not in self.PARSE_PHASES:
+                workbook.run_phase(phase)
+
+        counters = {
+            counter: getattr(workbook, counter) for counter in self.COUNTERS
+        }
+        counters['records'] = len(workbook.records)
+        workbook.close()
+        return counters
+
+    def run(self) -> 'BatchImport':
+        """
+            Parses every workbook, then uploads them one at a time,
+            and logs a summary of each workbook and of the batch
+
+            Returns `self` (this instance of BatchImport)
+        """
+        for workbook in self.parse():
+            self.results.append((workbook.spreadsheet, workbook.sheet, self.upload(workbook)))
+
+        totals = dict.fromkeys(self.COUNTERS, 0)
+        for spreadsheet, sheet, counters in self.results:
+            logging.info(
+                '%s (%s): %d rows, %d Records, %d Sorting Assets, %d Data Destruction Assets, %d ignored, %d failed',
+                spreadsheet, sheet, *[counters[counter] for counter in self.COUNTERS]
+            )
+            for counter in self.COUNTERS:
+                totals[counter] += counters[counter]
+
+        logging.info(
+            'Batch of %d workbooks: %d rows, %d Records, %d Sorting Assets, %d Data Destruction Assets, %d ignored, %d failed',
+            len(self.results), *[totals[counter] for counter in self.COUNTERS]
+        )
+        logging.info('Resolved %d models for the whole batch', len(self.models))
+        return self
+
+if __name__ == '__main__':
+    ARGUMENTS = [argument for argument in sys.argv[1:] if argument != '--resume']
+    BatchImport(
+        ARGUMENTS[0] if ARGUMENTS else os.environ.get('batch_manifest', ''),
+        resume=RESUME or '--resume' in sys.argv[1:]
+    ).run()
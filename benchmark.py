@@ -0,0 +1,646 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Benchmarks for the import pipeline.
+
+    Each benchmark generates its own synthetic data in a
+    temporary directory, so nothing here needs a real
+    spreadsheet. Benchmarks that talk to the API are
+    expected to point at a stand-in server, never at
+    a production ERP.
+
+    Usage: `python3 benchmark.py [name ...]`, where `name`
+    is one of the keys of `BENCHMARKS`. All benchmarks are
+    ran when no name is given.
+"""
+
+import os
+import sys
+import csv
+import time
+import tempfile
+import tracemalloc
+import xmlrpc.client
+
+# app.py reads its configuration from the environment on import,
+# so these have to be in place before it is imported anywhere below
+os.environ.setdefault('odoo_host', 'http://localhost:8069')
+os.environ.setdefault('odoo_database', 'benchmark')
+os.environ.setdefault('odoo_user', '1')
+os.environ.setdefault('odoo_pass', 'benchmark')
+os.environ.setdefault('serials_to_ignore', 'N/A')
+os.environ.setdefault('first_row', '2')
+
+# Benchmarks change into `WORKDIR` so the log and csv files land there,
+# which means the modules have to be importable from the script's directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+WORKDIR = tempfile.mkdtemp(prefix='xlsx-to-itad-odoo-')
+SHEET = 'Benchmark'
+
+def make_rows(count: int) -> list:
+    """
+        Returns `count` spreadsheet rows in the layout that `ProcessWorkbook`
+        expects: serial, asset tag, relationship, make, model, device type.
+        Every fifth row is a Parent followed by a Child drive, and every
+        hundredth row repeats an earlier serial so duplicates are exercised.
+    """
+    rows = list()
+    for number in range(count):
+        if number % 100 == 99:
+            serial = 'SN%08d' % (number - 50)
+        else:
+            serial = 'SN%08d' % (number)
+
+        if number % 5 == 0:
+            relationship = 'Parent'
+        elif number % 5 == 1:
+            relationship = 'Child'
+        else:
+            relationship = None
+
+        rows.append((
+            serial,
+            'TAG%08d' % (number),
+            relationship,
+            'Make%d' % (number % 7),
+            'Model%d' % (number % 250),
+            'Hard Drive' if relationship == 'Child' else 'Desktop',
+        ))
+    return rows
+
+def write_workbook(count: int) -> str:
+    """
+        Writes `count` synthetic rows to an xlsx file in `WORKDIR`
+        and returns the path to it
+    """
+    from openpyxl import Workbook
+
+    path = os.path.join(WORKDIR, 'rows-%d.xlsx' % (count))
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(SHEET)
+    sheet.append(('Serial', 'Asset Tag', 'Relationship', 'Make', 'Model', 'Type'))
+    for row in make_rows(count):
+        sheet.append(row)
+    workbook.save(path)
+    return path
+
+def write_delimited(count: int, dialect: str, extension: str) -> str:
+    """
+        Writes `count` synthetic rows to a delimited text file in `WORKDIR`
+        with `dialect`, and returns the path to it
+    """
+    path = os.path.join(WORKDIR, 'rows-%d%s' % (count, extension))
+    with open(path, 'w', newline='') as output:
+        writer = csv.writer(output, dialect=dialect)
+        writer.writerow(('Serial', 'Asset Tag', 'Relationship', 'Make', 'Model', 'Type'))
+        writer.writerows(make_rows(count))
+    return path
+
+def bench_readers(size: int = 100000) -> None:
+    """
+        Compares the rows per second of each reader on the same
+        `size` rows, both for reading alone and for `build_record_list`
+    """
+    os.chdir(WORKDIR)
+    import app
+    from readers import open_reader
+
+    print('readers (%d rows)' % (size))
+    for name, spreadsheet in (
+        ('xlsx', write_workbook(size)),
+        ('csv', write_delimited(size, 'excel', '.csv')),
+        ('tsv', write_delimited(size, 'excel-tab', '.tsv')),
+    ):
+        start = time.perf_counter()
+        reader = open_reader(spreadsheet, sheet=SHEET, first_row=2)
+        rows = sum(1 for _ in reader)
+        reader.close()
+        read = time.perf_counter() - start
+
+        start = time.perf_counter()
+        workbook = app.ProcessWorkbook(spreadsheet=spreadsheet, sheet=SHEET)
+        workbook.build_record_list()
+        build = time.perf_counter() - start
+        del workbook
+
+        print('  %4s: read %9.0f rows/s, build_record_list %9.0f rows/s' % (
+            name, rows / read, size / build))
+
+def bench_build_record_list(sizes: tuple = (1000, 10000, 100000)) -> None:
+    """
+        Times loading the workbook and `ProcessWorkbook.build_record_list`
+        at each of `sizes` and reports the time per row, which should
+        stay flat as the number of rows grows
+    """
+    os.chdir(WORKDIR)
+    import app
+
+    print('build_record_list')
+    for size in sizes:
+        spreadsheet = write_workbook(size)
+
+        start = time.perf_counter()
+        workbook = app.ProcessWorkbook(spreadsheet=spreadsheet, sheet=SHEET)
+        workbook.build_record_list()
+        elapsed = time.perf_counter() - start
+
+        print('  %7d rows: %8.3fs, %6.2fus/row, %d records' % (
+            size, elapsed, elapsed / size * 1e6, len(workbook.records)))
+        del workbook
+
+class LegacyRecord:
+    """
+        The layout of `record.Record` before it used `__slots__`: a
+        `__dict__` per instance, no interning, and a plain list for
+        every parent's children, held in a plain list, the same as
+        `app.py` built them then. Only used for comparison
+    """
+
+    def __init__(self, row: tuple, parent: bool) -> None:
+        self.serial = str(row[0])
+        self.asset_tag = str(row[1])
+        self.make = str(row[3])
+        self.model = str(row[4])
+        self.device_type = str(row[5])
+        self.children = [] if parent else None
+
+def measure(build: 'function') -> tuple:
+    """
+        Returns (result, bytes) for calling `build`, where `bytes`
+        is the memory still allocated by it once it returned
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def bench_record_memory(size: int = 100000) -> None:
+    """
+        Compares the bytes per Record of the previous Record layout,
+        the current one, and a `RecordBatch`, for `size` rows
+    """
+    from record import Record, RecordList, RecordBatch
+
+    # The rows are built before measuring, so the strings themselves aren't
+    # counted, only what each layout needs to hold them
+    rows = [tuple(str(value) if value is not None else None for value in row) for row in make_rows(size)]
+
+    def legacy() -> list:
+        records, parent = list(), None
+        for row in rows:
+            record = LegacyRecord(row, row[2] == 'Parent')
+            if row[2] == 'Child' and parent is not None:
+                parent.children.append(record)
+            else:
+                records.append(record)
+                parent = record if row[2] == 'Parent' else parent
+        return records
+
+    def current() -> RecordList:
+        records, parent = RecordList(), None
+        for row in rows:
+            record = Record(
+                serial=row[0], asset_tag=row[1], make=row[3], model=row[4], device_type=row[5],
+                children=RecordList() if row[2] == 'Parent' else None
+            )
+            if row[2] == 'Child' and parent is not None:
+                parent.children.append(record)
+            else:
+                records.append(record)
+                parent = record if row[2] == 'Parent' else parent
+        return records
+
+    print('record memory (%d rows)' % (size))
+    _, legacy_bytes = measure(legacy)
+    records, current_bytes = measure(current)
+    _, batch_bytes = measure(lambda: RecordBatch.from_records(records))
+    for name, used in (('before', legacy_bytes), ('Record', current_bytes), ('RecordBatch', batch_bytes)):
+        print('  %11s: %6.1f bytes/row, %7.1f MiB' % (name, used / size, used / 2 ** 20))
+
+def bench_end_to_end(
+    sizes: tuple = (1000, 5000), latency: float = 0.002, jitter: float = 0.001,
+    fault_rate: float = 0.0, drop_rate: float = 0.0, workers: int = 0
+) -> None:
+    """
+        Runs every phase of `ProcessWorkbook.run` against a
+        `standin.StandInOdoo` at each of `sizes`, and reports
+        the requests, wall time and Records per second of each.
+
+        `latency`, `jitter`, `fault_rate`, `drop_rate` and `workers`
+        are passed to the stand-in. Half of the models already have
+        a sellable item, so both searching and creating them is
+        measured.
+    """
+    os.chdir(WORKDIR)
+    from standin import StandInOdoo
+
+    odoo = StandInOdoo(
+        latency=latency, jitter=jitter, fault_rate=fault_rate, drop_rate=drop_rate, workers=workers, seed=1
+    )
+    odoo.start()
+    os.environ['odoo_host'] = odoo.url
+    import app
+
+    print('end to end (%.1fms latency, %.1fms jitter, %.1f%% faults, %.1f%% drops)' % (
+        latency * 1e3, jitter * 1e3, fault_rate * 100, drop_rate * 100))
+    for size in sizes:
+        spreadsheet = write_workbook(size)
+        odoo.reset().seed('erpwarehouse.sellable', [
+            {'make': 'Make%d' % (number % 7), 'model': 'Model%d' % (number)} for number in range(0, 250, 2)
+        ])
+
+        workbook = app.ProcessWorkbook(
+            spreadsheet=spreadsheet, sheet=SHEET, asset_catalog_id=1, data_destruction_id=1,
+            ignore_csv=os.path.join(WORKDIR, 'ignored-%d.csv' % (size))
+        )
+        print('  %d rows' % (size))
+        total_time, total_calls = 0.0, 0
+        for phase in workbook.PHASES:
+            calls = odoo.total_calls()
+            start = time.perf_counter()
+            try:
+                getattr(workbook, phase)()
+            except (xmlrpc.client.Error, ConnectionError) as error:
+                # Injected faults and drops that the import doesn't recover from
+                print('    %24s: failed after %d requests, %r' % (phase, odoo.total_calls() - calls, error))
+                break
+            elapsed = time.perf_counter() - start
+            calls = odoo.total_calls() - calls
+            total_time += elapsed
+            total_calls += calls
+            print('    %24s: %6d requests, %8.3fs, %10.0f records/s' % (
+                phase, calls, elapsed, len(workbook.records) / elapsed if elapsed else 0))
+        else:
+            print('    %24s: %6d requests, %8.3fs, %10.0f records/s' % (
+                'run', total_calls, total_time, len(workbook.records) / total_time))
+        workbook.close(summary=False)
+
+    odoo.stop()
+
+def bench_protocols(sellables: int = 250, lines: int = 5000, repeat: int = 20) -> None:
+    """
+        Compares XMLRPC and JSON-RPC on the queries this tool sends
+        to Odoo, against a `standin.StandInOdoo` with `sellables` and
+        `lines` on the asset catalog, each query ran `repeat` times.
+
+        Reports the bytes sent and received per request, the round
+        trip per request, and the time to decode each response alone
+    """
+    os.chdir(WORKDIR)
+    import json
+    from standin import StandInOdoo
+    from metrics import Metrics
+    from api import API, any_of, load_jsonrpc
+
+    odoo = StandInOdoo(seed=1)
+    odoo.start()
+    os.environ['odoo_host'] = odoo.url
+    sellable_ids = odoo.seed('erpwarehouse.sellable', [
+        {'make': 'Make%d' % (number % 7), 'model': 'Model%d' % (number)} for number in range(sellables)
+    ])
+    odoo.seed('erpwarehouse.asset', [
+        {'catalog': 1, 'make': sellable_ids[number % sellables], 'serial': 'SN%08d' % (number), 'tag': 'TAG%08d' % (number)}
+        for number in range(lines)
+    ])
+
+    queries = (
+        ('sellable search_read', 'do_search_and_read', 'erpwarehouse.sellable', (
+            any_of([('model', 'ilike', 'Model%d' % (number)) for number in range(0, 200, 2)]),
+            {'fields': ['id', 'make', 'model']},
+        )),
+        ('asset search', 'do_search', 'erpwarehouse.asset', (
+            [('catalog', '=', 1), ('make', '=', sellable_ids[0]), ('serial', '=ilike', 'SN%08d' % (0))],
+        )),
+        ('asset page', 'do_search_and_read', 'erpwarehouse.asset', (
+            [('catalog', '=', 1)],
+            {'fields': ['make', 'serial'], 'limit': 1000, 'offset': 0, 'order': 'id'},
+        )),
+        ('asset create x100', 'do_create', 'erpwarehouse.asset', (
+            [{'catalog': 2, 'make': sellable_ids[0], 'serial': 'NEW%08d' % (number), 'tag': 'TAG'} for number in range(100)],
+        )),
+    )
+
+    print('protocols (%d sellables, %d asset lines, %d requests each)' % (sellables, lines, repeat))
+    for protocol in ('xmlrpc', 'jsonrpc'):
+        os.environ['odoo_protocol'] = protocol
+        api = API()
+        api.metrics = Metrics()
+        print('  %s' % (protocol))
+        for name, method, model, arguments in queries:
+            result = getattr(api, method)(model, *arguments)
+            elapsed = time.perf_counter()
+            for _ in range(repeat):
+                getattr(api, method)(model, *arguments)
+            elapsed = time.perf_counter() - elapsed
+
+            # The same response, decoded on its own, without the round trip
+            if protocol == 'xmlrpc':
+                body = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True).encode('utf-8')
+                decode = lambda body=body: xmlrpc.client.loads(body)
+            else:
+                body = json.dumps({'jsonrpc': '2.0', 'id': 1, 'result': result}).encode('utf-8')
+                decode = lambda body=body: load_jsonrpc(body)
+            decoded = time.perf_counter()
+            for _ in range(repeat):
+                decode()
+            decoded = time.perf_counter() - decoded
+
+            (entry,) = api.metrics.requests.values()
+            count = entry['latency'].count
+            print('    %20s: %8.0f bytes sent, %8.0f bytes received, %7.2fms/request, %7.3fms to decode' % (
+                name, entry['request_bytes'] / count, entry['response_bytes'] / count,
+                elapsed / repeat * 1e3, decoded / repeat * 1e3))
+            api.metrics.requests.clear()
+        api.pool.close()
+
+    odoo.stop()
+
+def bench_compression(sellables: int = 2000, lines: int = 5000, repeat: int = 20) -> None:
+    """
+        Compares XMLRPC with and without gzip on the largest requests
+        this tool sends, against a `standin.StandInOdoo` that compresses
+        its responses like a proxy would, with `sellables` and `lines`
+        on the asset catalog, each query ran `repeat` times.
+
+        Reports the bytes on the wire, the compression ratio, and the
+        time spent compressing and decompressing per request. The
+        stand-in is on loopback, so the round trip only shows the
+        cost; `break-even` is the link speed below which the bytes
+        saved take longer to send than the compression took
+    """
+    os.chdir(WORKDIR)
+    from standin import StandInOdoo
+    from metrics import Metrics
+    from api import API
+
+    odoo = StandInOdoo(seed=1, gzip_threshold=1024)
+    odoo.start()
+    os.environ['odoo_host'] = odoo.url
+    os.environ['odoo_protocol'] = 'xmlrpc'
+    sellable_ids = odoo.seed('erpwarehouse.sellable', [
+        {'make': 'Make%d' % (number % 7), 'model': 'Model%d' % (number)} for number in range(sellables)
+    ])
+    odoo.seed('erpwarehouse.asset', [
+        {'catalog': 1, 'make': sellable_ids[number % sellables], 'serial': 'SN%08d' % (number), 'tag': 'TAG%08d' % (number)}
+        for number in range(lines)
+    ])
+
+    queries = (
+        ('sellable catalog', 'do_search_and_read', 'erpwarehouse.sellable', (
+            [], {'fields': ['id', 'make', 'model']},
+        )),
+        ('asset page', 'do_search_and_read', 'erpwarehouse.asset', (
+            [('catalog', '=', 1)],
+            {'fields': ['make', 'serial'], 'limit': 1000, 'offset': 0, 'order': 'id'},
+        )),
+        ('asset create x100', 'do_create', 'erpwarehouse.asset', (
+            [{'catalog': 2, 'make': sellable_ids[0], 'serial': 'NEW%08d' % (number), 'tag': 'TAG'} for number in range(100)],
+        )),
+    )
+
+    print('compression (%d sellables, %d asset lines, %d requests each)' % (sellables, lines, repeat))
+    for name, accept_gzip, gzip_threshold in (('off', '0', ''), ('gzip', '1', '1024')):
+        os.environ['odoo_accept_gzip'] = accept_gzip
+        os.environ['odoo_gzip_threshold'] = gzip_threshold
+        api = API()
+        api.metrics = Metrics()
+        print('  %s' % (name))
+        for query, method, model, arguments in queries:
+            elapsed = time.perf_counter()
+            for _ in range(repeat):
+                getattr(api, method)(model, *arguments)
+            elapsed = time.perf_counter() - elapsed
+
+            (entry,) = api.metrics.requests.values()
+            sent = entry['request_bytes'] + entry['response_bytes']
+            uncompressed = entry['uncompressed_request_bytes'] + entry['uncompressed_response_bytes']
+            saved = uncompressed - sent
+            print('    %18s: %8.0f bytes, %5.1f:1, %6.3fms gzip, %7.2fms/request, break-even %s' % (
+                query, sent / repeat, uncompressed / sent, entry['gzip_seconds'] / repeat * 1e3,
+                elapsed / repeat * 1e3,
+                '%.0f Mbit/s' % (saved * 8 / entry['gzip_seconds'] / 1e6) if entry['gzip_seconds'] else '-'
+            ))
+            api.metrics.requests.clear()
+        api.pool.close()
+
+    del os.environ['odoo_gzip_threshold']
+    odoo.stop()
+
+def bench_logging(messages: int = 50000) -> None:
+    """
+        Times logging `messages` record-level messages, as the import
+        loops do, through the queue that `logs.start_logging` sets up,
+        and then through the same handlers written directly with DEBUG
+        on, as the log was before. Only the log file is written to,
+        so the console isn't flooded
+    """
+    os.chdir(WORKDIR)
+    import logging
+    import app # pylint: disable=unused-import
+    from logs import LazyQueueHandler, stop_logging
+
+    root = logging.getLogger()
+    (queued,) = [handler for handler in root.handlers if isinstance(handler, LazyQueueHandler)]
+    file_handler, console = queued.listener.handlers
+    console_level = console.level
+    console.setLevel(logging.CRITICAL)
+
+    def per_message(level: int) -> float:
+        start = time.perf_counter()
+        for number in range(messages):
+            logging.log(level, 'Creating Record for %s', 'SN%08d' % (number))
+        return (time.perf_counter() - start) / messages * 1e6
+
+    print('logging (%d messages)' % (messages))
+    print('  %26s: DEBUG %6.2fus/message, INFO %6.2fus/message' % (
+        'queued, DEBUG off', per_message(logging.DEBUG), per_message(logging.INFO)))
+
+    stop_logging()
+    root.setLevel(logging.DEBUG)
+    file_handler.setLevel(logging.DEBUG)
+    print('  %26s: DEBUG %6.2fus/message, INFO %6.2fus/message' % (
+        'direct, DEBUG on (before)', per_message(logging.DEBUG), per_message(logging.INFO)))
+    console.setLevel(console_level)
+
+def bench_pipeline(sizes: tuple = (1000, 5000), latency: float = 0.002, jitter: float = 0.001) -> None:
+    """
+        Compares running the phases of `ProcessWorkbook.run` one
+        after the other with `ProcessWorkbook.run_pipeline`, against
+        a `standin.StandInOdoo` with `latency` and `jitter`, at each
+        of `sizes`. Uploads use the `upload_workers` configuration.
+
+        Reports the wall time and requests of each, and the seconds
+        each step of the pipeline waited for the next one
+    """
+    os.chdir(WORKDIR)
+    from standin import StandInOdoo
+
+    odoo = StandInOdoo(latency=latency, jitter=jitter, seed=1)
+    odoo.start()
+    os.environ['odoo_host'] = odoo.url
+    import app
+
+    print('pipeline (%.1fms latency, %.1fms jitter, %d upload workers)' % (
+        latency * 1e3, jitter * 1e3, app.UPLOAD_WORKERS))
+    for size in sizes:
+        spreadsheet = write_workbook(size)
+        print('  %d rows' % (size))
+        for mode in ('phases', 'pipeline'):
+            odoo.reset().seed('erpwarehouse.sellable', [
+                {'make': 'Make%d' % (number % 7), 'model': 'Model%d' % (number)} for number in range(0, 250, 2)
+            ])
+            workbook = app.ProcessWorkbook(
+                spreadsheet=spreadsheet, sheet=SHEET, asset_catalog_id=1, data_destruction_id=1,
+                ignore_csv=os.path.join(WORKDIR, 'ignored-%s-%d.csv' % (mode, size))
+            )
+            start = time.perf_counter()
+            if mode == 'pipeline':
+                workbook.run_pipeline()
+            else:
+                for phase in workbook.PHASES:
+                    getattr(workbook, phase)()
+            elapsed = time.perf_counter() - start
+            print('    %8s: %6d requests, %8.3fs, %10.0f records/s, waits parse %.3fs resolve %.3fs' % (
+                mode, odoo.total_calls(), elapsed, len(workbook.records) / elapsed,
+                workbook.pipeline_waits['parse'], workbook.pipeline_waits['resolve']))
+            workbook.close(summary=False)
+
+    odoo.stop()
+
+def bench_sellable_catalog(sellables: int = 5000, models: int = 1000, latency: float = 0.002) -> None:
+    """
+        Compares resolving `models` by searching a `standin.StandInOdoo`
+        with `sellables` sellable items, with matching them against
+        a `catalog.SellableCatalog` that is synced from scratch, and
+        against one that only has to sync a few new sellable items.
+
+        Reports the requests and wall time of each
+    """
+    os.chdir(WORKDIR)
+    from standin import StandInOdoo
+    from catalog import SellableCatalog
+    from registry import ModelRegistry
+
+    odoo = StandInOdoo(latency=latency, seed=1)
+    odoo.start()
+    os.environ['odoo_host'] = odoo.url
+    odoo.seed('erpwarehouse.sellable', [
+        {'make': 'Make%d' % (number % 7), 'model': 'Model%d' % (number)} for number in range(sellables)
+    ])
+    # Written one at a time, long before the new sellable items of the warm catalog
+    for sellable in odoo.tables['erpwarehouse.sellable'].values():
+        sellable['write_date'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(1577836800 + sellable['id']))
+    import app
+
+    path = os.path.join(WORKDIR, 'sellables.sqlite')
+    print('sellable catalog (%d sellables, %d models, %.1fms latency)' % (sellables, models, latency * 1e3))
+    for mode in ('search', 'cold catalog', 'warm catalog'):
+        if mode == 'warm catalog':
+            odoo.seed('erpwarehouse.sellable', [{'make': 'New', 'model': 'NewModel%d' % (number)} for number in range(10)])
+        registry = ModelRegistry()
+        for number in range(0, models * 2, 2):
+            registry.add('Make%d' % (number % 7), 'Model%d' % (number))
+        workbook = app.ProcessWorkbook(models=registry, ignore_csv=os.path.join(WORKDIR, 'catalog.csv'))
+        calls = odoo.total_calls()
+        start = time.perf_counter()
+        if mode != 'search':
+            workbook.catalog = SellableCatalog(path, odoo.url)
+            workbook.catalog.sync(workbook.api)
+        workbook.get_odoo_model_ids()
+        elapsed = time.perf_counter() - start
+        print('  %12s: %6d requests, %8.3fs, %d resolved' % (
+            mode, odoo.total_calls() - calls, elapsed, len(registry.in_state(ModelRegistry.RESOLVED))))
+        workbook.close(summary=False)
+
+    odoo.stop()
+
+def bench_ignore_rules(sizes: tuple = (10, 1000, 10000), serials: int = 100000) -> None:
+    """
+        Times checking `serials` serials against an ignore list of each
+        of `sizes` serials, as a plain list and as `ignore.IgnoreRules`.
+        The rules also have a hundred prefixes, and a glob and a regular
+        expression, which the list can't express
+    """
+    from ignore import IgnoreRules
+
+    checked = ['SN%08d' % (number) for number in range(serials)]
+    print('ignore rules (%d serials checked)' % (serials))
+    for size in sizes:
+        exact = ['IGN%08d' % (number) for number in range(size)]
+        listed = [None, '', 'N/A'] + exact
+        rules = IgnoreRules((None, '', 'N/A')).extend(exact).extend(
+            ['prefix:VEND%03d' % (number) for number in range(100)] + ['glob:*-RMA', r'regex:TEST\d+']
+        )
+        for name, container in (('list', listed), ('rules', rules)):
+            start = time.perf_counter()
+            for serial in checked:
+                serial in container  # pylint: disable=pointless-statement
+            elapsed = time.perf_counter() - start
+            print('  %6d %5s: %8.3fs, %8.2fus per serial' % (size, name, elapsed, elapsed / serials * 1e6))
+
+def bench_daemon(jobs: int = 5, rows: int = 50, latency: float = 0.002) -> None:
+    """
+        Compares importing `jobs` spreadsheets of `rows` rows each with
+        a new `app.py` process per spreadsheet, with a `daemon.Daemon`
+        that keeps its connections and caches between them, against a
+        `standin.StandInOdoo` with `latency`.
+
+        Reports the wall time and requests of each spreadsheet
+    """
+    os.chdir(WORKDIR)
+    import subprocess
+    from standin import StandInOdoo
+
+    odoo = StandInOdoo(latency=latency, seed=1)
+    odoo.start()
+    os.environ['odoo_host'] = odoo.url
+    os.environ['odoo_asset_catalog_id'] = os.environ['odoo_data_destruction_id'] = '1'
+    import daemon
+
+    spreadsheets = [write_delimited(rows + number, 'excel', '.csv') for number in range(jobs)]
+    print('daemon (%d spreadsheets of %d rows, %.1fms latency)' % (jobs, rows, latency * 1e3))
+    for mode in ('process', 'daemon'):
+        odoo.reset()
+        watcher = daemon.Daemon(tempfile.mkdtemp(dir=WORKDIR))
+        for number, spreadsheet in enumerate(spreadsheets):
+            calls = odoo.total_calls()
+            start = time.perf_counter()
+            if mode == 'process':
+                subprocess.run(
+                    [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')],
+                    env=dict(os.environ, spreadsheet=spreadsheet), check=True,
+                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+                )
+            else:
+                watcher.run_job(watcher.start_job(spreadsheet))
+            print('  %8s %d: %6d requests, %8.3fs' % (
+                mode, number, odoo.total_calls() - calls, time.perf_counter() - start))
+
+    odoo.stop()
+
+BENCHMARKS = {
+    'build_record_list': bench_build_record_list,
+    'readers': bench_readers,
+    'record_memory': bench_record_memory,
+    'end_to_end': bench_end_to_end,
+    'protocols': bench_protocols,
+    'compression': bench_compression,
+    'logging': bench_logging,
+    'pipeline': bench_pipeline,
+    'sellable_catalog': bench_sellable_catalog,
+    'ignore_rules': bench_ignore_rules,
+    'daemon': bench_daemon,
+}
+
+if __name__ == '__main__':
+    for name in sys.argv[1:] or BENCHMARKS:
+        BENCHMARKS[name]()
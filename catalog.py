@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+"""
+    Provides the SellableCatalog class, a local copy of the
+    sellable items in Odoo, so that models can be matched
+    without searching Odoo for them on every import.
+"""
+
+import re
+import bisect
+import sqlite3
+from typing import Union
+
+from api import API
+
+class SellableCatalog:
+    """
+        A SQLite mirror of the id, make, model and write date of
+        the sellable items in an Odoo database, named by `source`
+        so that one file can mirror several databases.
+
+        `sync` only reads the sellable items that were written since
+        the last sync. `match` then finds the sellable item that
+        `('model', 'ilike', model)` would return first, the same as
+        `api.ilike_match`, against an index of the lowercased models
+        in id order. Sellable items that are deleted in Odoo are kept
+        until the mirror is rebuilt with `clear`.
+
+        It can be used from any thread, but only one at a time.
+    """
+
+    # Separates the models in the index, and can't be in a search
+    SEPARATOR = '\x00'
+
+    def __init__(self, path: str, source: str) -> None:
+        self.path = path
+        self.source = source
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS sellables ('
+            'source TEXT NOT NULL, id INTEGER NOT NULL, '
+            'make TEXT, model TEXT, write_date TEXT, '
+            'PRIMARY KEY (source, id))'
+        )
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS syncs ('
+            'source TEXT PRIMARY KEY, write_date TEXT NOT NULL)'
+        )
+        self.connection.commit()
+
+        # Built by `_index` the first time a model is matched:
+        # the ids in order, the models joined by `SEPARATOR`,
+        # and where each model starts in that string
+        self.ids = None
+        self.models = None
+        self.offsets = None
+
+    def __len__(self) -> int:
+        return self.connection.execute(
+            'SELECT COUNT(*) FROM sellables WHERE source = ?', (self.source,)
+        ).fetchone()[0]
+
+    def last_sync(self) -> Union[str, None]:
+        """
+            Returns the latest write date that was synced, or None
+            if the mirror is empty
+        """
+        row = self.connection.execute(
+            'SELECT write_date FROM syncs WHERE source = ?', (self.source,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def sync(self, api: API, page_size: int = 1000) -> int:
+        """
+            Reads the sellable items written since the last sync with
+            `api`, `page_size` at a time in id order, and stores them.
+
+            Items written at the same time as the last sync are read
+            again, since Odoo's write dates are only to the second.
+            Nothing is stored unless every page was read.
+
+            Returns the number of sellable items that were read
+        """
+        since = self.last_sync()
+        domain = [('write_date', '>=', since)] if since else []
+        latest = since or ''
+        after = 0
+        count = 0
+        with self.connection:
+            while True:
+                sellables = api.do_search_and_read(
+                    'erpwarehouse.sellable',
+                    domain + [('id', '>', after)],
+                    {'fields': ['id', 'make', 'model', 'write_date'], 'limit': page_size, 'order': 'id'}
+                )
+                self.connection.executemany(
+                    'INSERT OR REPLACE INTO sellables VALUES (?, ?, ?, ?, ?)',
+                    (
+                        (self.source, sellable['id'], sellable['make'] or None,
+                            sellable['model'] or None, sellable['write_date'] or None)
+                        for sellable in sellables
+                    )
+                )
+                for sellable in sellables:
+                    latest = max(latest, sellable['write_date'] or '')
+                count += len(sellables)
+                if len(sellables) < page_size:
+                    break
+                after = sellables[-1]['id']
+
+            if latest:
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO syncs VALUES (?, ?)', (self.source, latest)
+                )
+
+        if count:
+            self.ids = None
+        return count
+
+    def clear(self) -> 'SellableCatalog':
+        """
+            Forgets every sellable item of this source, so that
+            the next sync reads all of them again
+
+            Returns `self` (this instance of SellableCatalog)
+        """
+        with self.connection:
+            self.connection.execute('DELETE FROM sellables WHERE source = ?', (self.source,))
+            self.connection.execute('DELETE FROM syncs WHERE source = ?', (self.source,))
+        self.ids = None
+        return self
+
+    def _index(self) -> None:
+        self.ids = list()
+        self.offsets = list()
+        models = list()
+        offset = 1
+        for sellable_id, model in self.connection.execute(
+            'SELECT id, model FROM sellables WHERE source = ? AND model IS NOT NULL ORDER BY id',
+            (self.source,)
+        ):
+            model = model.lower()
+            self.ids.append(sellable_id)
+            self.offsets.append(offset)
+            models.append(model)
+            offset += len(model) + 1
+        self.models = self.SEPARATOR + self.SEPARATOR.join(models)
+
+    def match(self, model: str) -> Union[int, None]:
+        """
+            Returns the id of the first sellable item that a search
+            for `('model', 'ilike', model)` would return, or None if
+            none of them would match. `%` and `_` in `model` are
+            wildcards, as they are in Odoo.
+
+            The first item is the one with the lowest id, which is
+            the order Odoo returns sellable items in
+        """
+        if self.ids is None:
+            self._index()
+        pattern = model.lower()
+        if self.SEPARATOR in pattern:
+            return None
+
+        if '%' in pattern or '_' in pattern:
+            expression = ''.join(
+                '[^\x00]*' if char == '%' else '[^\x00]' if char == '_' else re.escape(char)
+                for char in pattern
+            )
+            found = re.search(expression, self.models)
+            position = found.start() if found else -1
+        else:
+            position = self.models.find(pattern)
+
+        if position < 0 or not self.ids:
+            return None
+        # A match can start on the separator before a model, when `model` is empty
+        return self.ids[max(bisect.bisect_right(self.offsets, position) - 1, 0)]
+
+    def close(self) -> None:
+        """
+            Closes the mirror
+        """
+        self.connection.close()
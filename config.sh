@@ -7,25 +7,99 @@ export odoo_host='https://erp'
 export odoo_database='OceanTech'
 export odoo_user=1
 export odoo_pass=''
+# Number of keep-alive connections to hold open to Odoo, and how many seconds an unused one stays open
+export odoo_pool_size=4
+export odoo_pool_idle_timeout=60
 
 # Odoo Records - These are the database ids of the records that contain the table/list
 export odoo_asset_catalog_id=0
 export odoo_data_destruction_id=0
+# How many models to search for in a single request
+export odoo_model_batch_size=100
+# Read the lines already on the asset catalog once (1), instead of searching before each line is created (0)
+export odoo_prefetch_assets=1
+# How many asset catalog lines to read in a single request
+export odoo_asset_page_size=1000
+# How many line items to create in a single request
+export odoo_create_batch_size=100
+# How many threads upload line items at the same time. 1 uploads from the main thread
+export upload_workers=1
+# Search for models and upload line items with asyncio (1) instead of threads (0),
+# with at most this many requests in flight at once
+export use_async=0
+export odoo_async_requests=100
+# Parse, resolve models and upload at the same time (1), each on its own thread,
+# with at most pipeline_queue_size Records waiting between two of them
+export pipeline=0
+export pipeline_queue_size=1000
+# Match models against a local mirror of the sellable items (1), which only reads
+# the sellable items written since the last import. Set rebuild_sellable_catalog=1
+# to read all of them again, such as after sellable items were deleted in Odoo
+export use_sellable_catalog=0
+export sellable_catalog=sellables.sqlite
+export odoo_sellable_page_size=1000
+export rebuild_sellable_catalog=0
+# Retry requests that failed in a transient way this many times, waiting
+# odoo_retry_backoff seconds (doubling, with jitter) before each one
+export odoo_retries=3
+export odoo_retry_backoff=0.5
+# Adapt how many requests are in flight to how the server is coping (1)
+export odoo_throttle=1
+# Talk to Odoo over XMLRPC (xmlrpc) or JSON-RPC (jsonrpc)
+export odoo_protocol=xmlrpc
+# Ask Odoo (or the proxy in front of it) to compress responses with gzip (1)
+export odoo_accept_gzip=1
+# Compress request bodies larger than this many bytes with gzip. Odoo doesn't
+# decompress requests itself, so leave this unset unless a proxy in front of it does
+export odoo_gzip_threshold=
+# Keep a journal of the upload next to the spreadsheet (1) so that it can be resumed,
+# written this many entries at a time. Resume an import with `resume=1` or `--resume`
+export use_journal=1
+export journal_batch_size=500
+export resume=0
+# Only upload the Records that were added or changed (1) since the last import into
+# the same asset catalog and data destruction, remembered in this file
+export delta_import=0
+export delta_store=fingerprints.sqlite
+# Measure each phase and every request to Odoo (1), and write them to <time>.json
+export metrics=0
+# The least severe messages written to the log file and to the console.
+# DEBUG adds a message for every Record and line item, and slows large imports
+export log_level=INFO
+export console_log_level=INFO
 
 # Spreadsheet configuration
-export spreadsheet='<path to your spreadsheet>.xlsx/xlsm'
+# .csv and .tsv files are read with the same column layout, and are much faster to read than a workbook
+export spreadsheet='<path to your spreadsheet>.xlsx/xlsm/csv/tsv'
+# Not used for .csv and .tsv files
 export sheet='<The Sheet name with the data>'
 
 # Assumes the actual first row is a header
 export first_row=2
-# The last row there is any data we care about
-export last_row=2000
+# The last row there is any data we care about. 0 reads until the data ends
+export last_row=0
+# When last_row is 0, the data ends after this many blank rows in a row
+export blank_rows_to_end=100
+# Stream the sheet a row at a time (1), or load the whole workbook into memory first (0)
+export stream_workbook=1
 # The last column that we care about
 export last_col=6
 
+# Batch imports (batch.py) - how many workbooks to parse at once. 0 uses every CPU
+export batch_processes=0
+
+# Daemon mode (daemon.py) - the directory that spreadsheets are dropped into,
+# and how many seconds to wait between looking for new ones
+export watch_directory=
+export watch_interval=1
+
 # Serials to ignore are special cases that we should skip that line item
 # One per line.
 export serials_to_ignore=$(cat << EOF
 N/A
 EOF
 )
+# A file with more serials to ignore, one per line. Lines can also be rules that
+# match many serials: prefix:<text>, glob:<pattern> or regex:<expression>.
+# Lines that start with # are comments
+export ignore_file=
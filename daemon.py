@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+
+"""
+    Imports spreadsheets as they are dropped into a directory, one
+    at a time, from a process that keeps running between them.
+
+    The API connections, the sellable ids of the models that were
+    resolved, and the lines on each asset catalog (when
+    `odoo_prefetch_assets` is set) are kept between imports, so
+    that importing a small spreadsheet only takes the requests
+    that its own rows need.
+
+    Each spreadsheet (of a type in `readers.READERS`) that is dropped
+    into the directory is moved to a job directory of its own,
+    `jobs/<time>-<name>/input/`, and its log, csv files and metrics
+    are written to `jobs/<time>-<name>/import.*`, with its journal
+    next to the spreadsheet. Once it is imported, the job directory is
+    moved to `done/`, or to `failed/` if the import stopped with an
+    error. Jobs that are still in `jobs/` when the daemon starts,
+    because it was stopped during them, are resumed from their journal.
+
+    The sheet, asset catalog and data destruction come from the
+    environment, the same as for `app.py`. A `<name>.json` file
+    dropped before the spreadsheet can set any of them for that
+    spreadsheet with `sheet`, `asset_catalog_id` and `data_destruction_id`.
+
+    A file is picked up once it hasn't changed since the last look,
+    or when it was last modified before then, such as when it was
+    written elsewhere and moved into the directory.
+
+    Usage: `python3 daemon.py <directory>`, with the same environment
+    as `app.py`, or the `watch_directory` variable. `watch_interval`
+    sets the seconds between looks at the directory. The daemon stops
+    after the job it is on when it receives SIGTERM.
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import logging
+import threading
+
+from api import API
+from registry import ModelRegistry
+from readers import READERS
+from logs import job_log
+from app import ProcessWorkbook, SHEET, ASSET_CATALOG_ID, DATA_DESTRUCTION_ID, LOG_LEVEL
+
+WATCH_DIRECTORY = os.environ.get('watch_directory', '')
+WATCH_INTERVAL = float(os.environ.get('watch_interval', 1.0))
+
+class Daemon:
+    """
+        Watches `directory` for spreadsheets and imports each of them
+        in turn, sharing one API, ModelRegistry and AssetIndex per
+        asset catalog between them
+    """
+
+    # The subdirectories of running, finished and failed jobs
+    JOBS = 'jobs'
+    DONE = 'done'
+    FAILED = 'failed'
+    # The subdirectory of a job with its spreadsheet and settings
+    INPUT = 'input'
+    # The name of the log, csv files and metrics of a job, before their extension
+    OUTPUT = 'import'
+
+    def __init__(self, directory: str, interval: float = WATCH_INTERVAL) -> None:
+        self.directory = directory
+        self.interval = interval
+        for subdirectory in (self.JOBS, self.DONE, self.FAILED):
+            os.makedirs(os.path.join(directory, subdirectory), exist_ok=True)
+
+        self.api = API()
+        self.models = ModelRegistry()
+        # Asset catalog id -> the AssetIndex of the last job into it that finished
+        self.asset_indexes = dict()
+        # The (size, modification time) of each file at the last look
+        self.seen = dict()
+        # Set to stop once the current job is done
+        self.stopping = threading.Event()
+        self.jobs_done = 0
+        self.jobs_failed = 0
+
+    def find_ready(self) -> list:
+        """
+            Returns the paths of the spreadsheets in the directory that
+            have finished being written, oldest first
+        """
+        ready = list()
+        seen = dict()
+        looked = time.time()
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or os.path.splitext(entry.name)[1].lower() not in READERS:
+                continue
+            stat = entry.stat()
+            state = (stat.st_size, stat.st_mtime)
+            if self.seen.get(entry.path) == state or stat.st_mtime < looked - self.interval:
+                ready.append((stat.st_mtime, entry.path))
+            seen[entry.path] = state
+
+        self.seen = seen
+        return [path for _, path in sorted(ready)]
+
+    def start_job(self, path: str) -> str:
+        """
+            Moves the spreadsheet at `path`, and its settings if there
+            are any, into a new job directory
+
+            Returns the path of the job directory
+        """
+        name = os.path.basename(path)
+        job = os.path.join(self.directory, self.JOBS, '%s-%s' % (time.time(), name))
+        os.makedirs(os.path.join(job, self.INPUT))
+        os.replace(path, os.path.join(job, self.INPUT, name))
+        settings = '%s.json' % (os.path.splitext(path)[0])
+        if os.path.exists(settings):
+            os.replace(settings, os.path.join(job, self.INPUT, os.path.basename(settings)))
+        self.seen.pop(path, None)
+        return job
+
+    def run_job(self, job: str, resume: bool = False) -> bool:
+        """
+            Imports the spreadsheet in the job directory `job`, with
+            its log and the files of the import written next to it,
+            then moves `job` to `done/` or `failed/`
+
+            Returns True if the import finished without an error
+        """
+        # pylint: disable=broad-except
+        inputs = os.path.join(job, self.INPUT)
+        name = next(
+            (
+                entry for entry in (sorted(os.listdir(inputs)) if os.path.isdir(inputs) else ())
+                if os.path.splitext(entry)[1].lower() in READERS
+            ),
+            None
+        )
+        spreadsheet = os.path.join(inputs, name or '')
+        settings_path = '%s.json' % (os.path.splitext(spreadsheet)[0])
+        output = os.path.join(job, self.OUTPUT)
+        start = time.perf_counter()
+        finished = False
+        # The models that earlier jobs registered, which this one shouldn't forget
+        known_models = set(self.models)
+        with job_log('%s.log' % (output), LOG_LEVEL):
+            logging.info('%s job %s', 'Resuming' if resume else 'Starting', job)
+            workbook = None
+            try:
+                if name is None:
+                    raise FileNotFoundError('There is no spreadsheet in %s' % (inputs))
+                settings = dict()
+                if os.path.exists(settings_path):
+                    with open(settings_path) as settings_file:
+                        settings = json.load(settings_file)
+                asset_catalog_id = int(settings.get('asset_catalog_id', ASSET_CATALOG_ID))
+                workbook = ProcessWorkbook(
+                    spreadsheet=spreadsheet,
+                    sheet=settings.get('sheet', SHEET),
+                    asset_catalog_id=asset_catalog_id,
+                    data_destruction_id=int(settings.get('data_destruction_id', DATA_DESTRUCTION_ID)),
+                    ignore_csv='%s.csv' % (output),
+                    api=self.api,
+                    models=self.models,
+                    resume=resume,
+                    asset_index=self.asset_indexes.get(asset_catalog_id),
+                )
+                workbook.run()
+                finished = True
+            except Exception:
+                logging.exception('Job %s failed', job)
+            finally:
+                if workbook is not None:
+                    workbook.close()
+                    # The index of a failed job may have lines that never made it to Odoo,
+                    # and `fetch` only reads newer lines, so the next job reads them all again
+                    if finished and workbook.asset_index is not None:
+                        self.asset_indexes[workbook.asset_catalog_id] = workbook.asset_index
+                    else:
+                        self.asset_indexes.pop(workbook.asset_catalog_id, None)
+                if not finished:
+                    self.forget_models(known_models)
+
+        if finished:
+            self.jobs_done += 1
+        else:
+            self.jobs_failed += 1
+        target = os.path.join(self.directory, self.DONE if finished else self.FAILED, os.path.basename(job))
+        os.replace(job, target)
+        logging.info(
+            'Job %s %s in %.3fs, see %s',
+            name, 'finished' if finished else 'failed', time.perf_counter() - start, target
+        )
+        return finished
+
+    def forget_models(self, known: set) -> 'Daemon':
+        """
+            Unregisters the models that a failed job registered
+            without getting a sellable id for, that aren't in
+            `known`. Otherwise, the next job would create the
+            sellable items that the failed job found missing,
+            whether or not it uses them
+
+            Returns `self` (this instance of Daemon)
+        """
+        for key in list(self.models):
+            if key not in known and self.models.state(key) in (ModelRegistry.PENDING, ModelRegistry.MISSING):
+                self.models.discard(key)
+
+        return self
+
+    def run(self) -> 'Daemon':
+        """
+            Resumes the jobs that were left unfinished, then imports
+            the spreadsheets that are dropped into the directory until
+            `stopping` is set
+
+            Returns `self` (this instance of Daemon)
+        """
+        logging.info('Watching %s for spreadsheets', self.directory)
+        jobs = os.path.join(self.directory, self.JOBS)
+        for job in sorted(os.listdir(jobs)):
+            if self.stopping.is_set():
+                break
+            self.run_job(os.path.join(jobs, job), resume=True)
+
+        while not self.stopping.is_set():
+            ready = self.find_ready()
+            for path in ready:
+                if self.stopping.is_set():
+                    break
+                self.run_job(self.start_job(path))
+            if not ready:
+                self.stopping.wait(self.interval)
+
+        logging.info(
+            'Stopped watching %s, after %d jobs finished and %d failed',
+            self.directory, self.jobs_done, self.jobs_failed
+        )
+        return self
+
+if __name__ == '__main__':
+    DAEMON = Daemon(sys.argv[1] if len(sys.argv) > 1 else WATCH_DIRECTORY)
+    signal.signal(signal.SIGTERM, lambda *_: DAEMON.stopping.set())
+    DAEMON.run()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+"""
+    Provides the FingerprintStore class, which remembers the
+    rows of earlier imports so that an updated spreadsheet
+    only needs the rows that changed to be imported again.
+"""
+
+import sqlite3
+import hashlib
+
+from record import Record
+
+def fingerprint(record: Record) -> str:
+    """
+        Returns a digest of the fields of `record` and its children,
+        which changes whenever any of them does
+    """
+    parts = [str(getattr(record, field)) for field in Record.FIELDS]
+    for child in record.children or ():
+        parts.append('\x1e')
+        parts.extend(str(getattr(child, field)) for field in Record.FIELDS)
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+class FingerprintStore:
+    """
+        A SQLite store of the Records that were imported into each
+        asset catalog and data destruction pair, keyed on serial,
+        with the fingerprint (see `fingerprint`) of each one.
+
+        The fields of each Record are kept as well, so that Records
+        that are no longer in the spreadsheet can be reported.
+    """
+
+    COLUMNS = Record.FIELDS
+
+    def __init__(self, path: str, asset_catalog_id: int, data_destruction_id: int) -> None:
+        self.path = path
+        self.pair = (asset_catalog_id, data_destruction_id)
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS fingerprints ('
+            'asset_catalog_id INTEGER NOT NULL, data_destruction_id INTEGER NOT NULL, '
+            'serial TEXT NOT NULL, fingerprint TEXT NOT NULL, '
+            'asset_tag TEXT, make TEXT, model TEXT, device_type TEXT, '
+            'PRIMARY KEY (asset_catalog_id, data_destruction_id, serial))'
+        )
+        self.connection.commit()
+
+    def load(self) -> dict:
+        """
+            Returns the fingerprint of every Record imported
+            into this pair, keyed on serial
+        """
+        return dict(self.connection.execute(
+            'SELECT serial, fingerprint FROM fingerprints '
+            'WHERE asset_catalog_id = ? AND data_destruction_id = ?',
+            self.pair
+        ))
+
+    def rows(self, serials: list) -> list:
+        """
+            Returns the stored fields of the Records with `serials`,
+            as dictionaries of `COLUMNS`
+        """
+        rows = list()
+        for serial in serials:
+            row = self.connection.execute(
+                'SELECT %s FROM fingerprints '
+                'WHERE asset_catalog_id = ? AND data_destruction_id = ? AND serial = ?' % (', '.join(self.COLUMNS)),
+                self.pair + (serial,)
+            ).fetchone()
+            if row is not None:
+                rows.append(dict(zip(self.COLUMNS, row)))
+        return rows
+
+    def save(self, records: list, removed: list) -> None:
+        """
+            Stores the fingerprints of `records`, and forgets
+            the Records with the `removed` serials, in a single
+            transaction
+        """
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    self.pair + (record.serial, fingerprint(record), record.asset_tag,
+                        record.make, record.model, record.device_type)
+                    for record in records
+                )
+            )
+            self.connection.executemany(
+                'DELETE FROM fingerprints '
+                'WHERE asset_catalog_id = ? AND data_destruction_id = ? AND serial = ?',
+                (self.pair + (serial,) for serial in removed)
+            )
+
+    def close(self) -> None:
+        """
+            Closes the store
+        """
+        self.connection.close()
@@ -19,3 +19,9 @@ class InputError(Exception):
     def __init__(self, field: str, message: str) -> Exception:
         self.field = field
         self.message = message
+
+class PipelineStopped(Exception):
+    """
+        Raised in a stage of a pipelined import when
+        the import was stopped, so that it exits early
+    """
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+"""
+    Provides the IgnoreRules class, which decides which serials
+    are special and are saved to the ignore csv instead of
+    being uploaded.
+"""
+
+import re
+import fnmatch
+
+class IgnoreRules:
+    """
+        A set of rules that serials are checked against with `in`.
+
+        Each rule is a line, in one of these forms:
+            `<serial>` - that exact serial
+            `prefix:<text>` - every serial that starts with `<text>`
+            `glob:<pattern>` - every serial that matches the shell
+                style `<pattern>`, with `*`, `?` and `[...]`
+            `regex:<expression>` - every serial that the regular
+                `<expression>` matches in full
+        Blank lines, and lines that start with `#`, are skipped.
+        Every rule is case sensitive.
+
+        Exact serials are kept in a set, and prefixes in a set per
+        prefix length, so checking a serial takes the same time no
+        matter how many of them there are. Globs and regular
+        expressions are compiled into a single expression the
+        first time a serial is checked against them.
+    """
+
+    def __init__(self, exact: tuple = ()) -> None:
+        # Serials that are always ignored, which may be None
+        self.exact = set(exact)
+        # The length of a prefix -> the prefixes of that length
+        self.prefixes = dict()
+        # The globs and regular expressions, as expressions
+        self.expressions = list()
+        self.matcher = None
+
+    def __len__(self) -> int:
+        return len(self.exact) + sum(map(len, self.prefixes.values())) + len(self.expressions)
+
+    def __contains__(self, serial: str) -> bool:
+        if serial in self.exact:
+            return True
+        if not isinstance(serial, str):
+            return False
+        for length, prefixes in self.prefixes.items():
+            if serial[:length] in prefixes:
+                return True
+        if not self.expressions:
+            return False
+        if self.matcher is None:
+            self.matcher = re.compile('|'.join('(?:%s)' % (expression) for expression in self.expressions))
+        return self.matcher.fullmatch(serial) is not None
+
+    def add(self, rule: str) -> 'IgnoreRules':
+        """
+            Adds the `rule` line, see `IgnoreRules`
+
+            Raises re.error if the expression of a `regex:` rule is invalid
+
+            Returns `self` (this instance of IgnoreRules)
+        """
+        rule = rule.strip()
+        if not rule or rule.startswith('#'):
+            return self
+
+        kind, _, value = rule.partition(':')
+        if kind == 'prefix' and value:
+            self.prefixes.setdefault(len(value), set()).add(value)
+        elif kind == 'glob' and value:
+            self.expressions.append(fnmatch.translate(value))
+            self.matcher = None
+        elif kind == 'regex' and value:
+            re.compile(value)
+            self.expressions.append(value)
+            self.matcher = None
+        else:
+            self.exact.add(rule)
+        return self
+
+    def extend(self, rules: 'iterable') -> 'IgnoreRules':
+        """
+            Adds every line of `rules`, see `add`
+
+            Returns `self` (this instance of IgnoreRules)
+        """
+        for rule in rules:
+            self.add(rule)
+        return self
+
+    def load(self, path: str) -> 'IgnoreRules':
+        """
+            Adds every line of the file at `path`, see `add`
+
+            Returns `self` (this instance of IgnoreRules)
+        """
+        with open(path, encoding='utf-8') as rules:
+            return self.extend(rules)
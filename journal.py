@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+"""
+    Provides the ImportJournal class, which records the
+    progress of an import so that it can be resumed.
+"""
+
+import sqlite3
+import threading
+from typing import Union
+
+class ImportJournal:
+    """
+        A SQLite journal of the operations an import sends to Odoo.
+
+        Each operation is identified by a key (see `key`), and is either:
+            `PLANNED` - about to be sent, its outcome isn't known yet
+            `DONE` - completed, with the resulting Odoo id
+
+        When an import is resumed, `DONE` operations can be skipped
+        without asking Odoo, and only `PLANNED` operations need to be
+        checked, as the import may have stopped before or after Odoo
+        completed them.
+
+        Writes are buffered and committed `batch_size` at a time, or
+        when `flush` is called. Call `flush` before sending the
+        operations that were just planned, so that they are on disk
+        first. The journal uses SQLite's write-ahead log, so a commit
+        is a single append to it.
+
+        When `resume` is False, the journal is cleared and the
+        import starts over.
+
+        The journal is safe to use from any thread.
+    """
+
+    PLANNED = 'planned'
+    DONE = 'done'
+
+    def __init__(self, path: str, resume: bool = False, batch_size: int = 500) -> None:
+        self.path = path
+        self.batch_size = batch_size
+        # Every use of the connection is under `self._lock`
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        # A commit is durable once it's in the write-ahead log
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS operations ('
+            'key TEXT PRIMARY KEY, status TEXT NOT NULL, odoo_id INTEGER)'
+        )
+        if not resume:
+            self.connection.execute('DELETE FROM operations')
+        self.connection.commit()
+
+        # The journal is read once and then kept in memory,
+        # so that lookups are safe from any thread
+        self.done = dict()
+        # Operations that an earlier run planned, but didn't record as done
+        self.unfinished = set()
+        for key, status, odoo_id in self.connection.execute('SELECT key, status, odoo_id FROM operations'):
+            if status == self.DONE:
+                self.done[key] = odoo_id
+            else:
+                self.unfinished.add(key)
+
+        self._buffer = list()
+
+    def __len__(self) -> int:
+        return len(self.done)
+
+    @staticmethod
+    def key(*parts: tuple) -> str:
+        """
+            Returns the journal key for an operation described by `parts`,
+            such as the Odoo model and the fields that make it unique
+        """
+        return '\x1f'.join(str(part) for part in parts)
+
+    def get(self, key: str) -> Union[int, None]:
+        """
+            Returns the Odoo id of a `DONE` operation, or None
+        """
+        return self.done.get(key)
+
+    def is_done(self, key: str) -> bool:
+        """
+            Returns True if the operation was completed
+        """
+        return key in self.done
+
+    def in_doubt(self, key: str) -> bool:
+        """
+            Returns True if the operation was planned, but not
+            recorded as completed, by an earlier run
+        """
+        return key in self.unfinished
+
+    def plan(self, keys: list) -> None:
+        """
+            Records that the operations with `keys` are about to be sent
+        """
+        with self._lock:
+            self._buffer.extend((key, self.PLANNED, None) for key in keys)
+            self._flush_if_full()
+
+    def complete(self, key: str, odoo_id: Union[int, None]) -> None:
+        """
+            Records that the operation with `key` resulted in `odoo_id`,
+            which is None when there was nothing to do
+        """
+        with self._lock:
+            self.done[key] = odoo_id
+            self._buffer.append((key, self.DONE, odoo_id))
+            self._flush_if_full()
+
+    def _flush_if_full(self) -> None:
+        if len(self._buffer) >= self.batch_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if not self._buffer:
+            return
+        with self.connection:
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO operations (key, status, odoo_id) VALUES (?, ?, ?)',
+                self._buffer
+            )
+        self._buffer = list()
+
+    def flush(self) -> None:
+        """
+            Writes every buffered operation in a single transaction
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """
+            Flushes the buffer and closes the journal
+        """
+        with self._lock:
+            self._flush()
+            self.connection.close()
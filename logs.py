@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+"""
+    Sets up logging so that the log file and console are written
+    by a background thread, and the threads doing the import only
+    put records on a queue.
+"""
+
+import time
+import queue
+import atexit
+import logging
+import contextlib
+import logging.handlers
+
+FILE_FORMAT = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s', '%m/%d/%Y %I:%M:%S %p')
+CONSOLE_FORMAT = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+        Puts records on the queue as they are, so that their messages
+        are formatted by the `listener` thread instead of the thread
+        that logged them. The arguments of a message must not be
+        changed after it was logged.
+    """
+
+    def __init__(self, listener: logging.handlers.QueueListener) -> None:
+        super().__init__(listener.queue)
+        self.listener = listener
+        self.listening = False
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def start_logging(path: str, level: str = 'INFO', console_level: str = 'INFO') -> LazyQueueHandler:
+    """
+        Logs messages of `level` and above to the file at `path`, and
+        of `console_level` and above to the console, from a background
+        thread. Messages below both levels are dropped before they
+        are formatted or queued.
+
+        The queue is drained when the interpreter exits, see `stop_logging`
+
+        Returns the handler that was added to the root logger
+    """
+    file_handler = logging.FileHandler(path)
+    file_handler.setLevel(level.upper())
+    file_handler.setFormatter(FILE_FORMAT)
+    console = logging.StreamHandler()
+    console.setLevel(console_level.upper())
+    console.setFormatter(CONSOLE_FORMAT)
+
+    listener = logging.handlers.QueueListener(
+        queue.SimpleQueue(), file_handler, console, respect_handler_level=True
+    )
+    handler = LazyQueueHandler(listener)
+
+    root = logging.getLogger()
+    root.setLevel(min(file_handler.level, console.level))
+    root.addHandler(handler)
+    listener.start()
+    handler.listening = True
+    atexit.register(stop_logging)
+    return handler
+
+@contextlib.contextmanager
+def job_log(path: str, level: str = 'INFO') -> logging.Handler:
+    """
+        Context manager that also writes the messages of `level` and
+        above, that are logged while it is open, to the file at `path`.
+        Messages that are still queued when it closes are written
+        before the file is closed
+    """
+    handler = logging.FileHandler(path)
+    handler.setLevel(level.upper())
+    handler.setFormatter(FILE_FORMAT)
+    opened = time.time()
+    handler.addFilter(lambda record: record.created >= opened)
+
+    root = logging.getLogger()
+    queued = next(
+        (target for target in root.handlers if isinstance(target, LazyQueueHandler) and target.listening),
+        None
+    )
+    if queued is None:
+        root.addHandler(handler)
+    else:
+        # Replaced rather than changed, as the listener thread may be looping over it
+        queued.listener.handlers = queued.listener.handlers + (handler,)
+    try:
+        yield handler
+    finally:
+        if queued is None:
+            root.removeHandler(handler)
+        else:
+            # Stopping the listener waits until every message queued before then
+            # is written, messages logged meanwhile stay queued for the restart
+            queued.listener.stop()
+            queued.listener.handlers = tuple(
+                target for target in queued.listener.handlers if target is not handler
+            )
+            queued.listener.start()
+        handler.close()
+
+def log_directly() -> None:
+    """
+        Replaces the queue on the root logger with the handlers of
+        its listener, so that messages are written by the thread
+        that logged them. Used once the listener has stopped, and
+        in worker processes, which don't have a listener thread
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, LazyQueueHandler):
+            handler.listening = False
+            root.removeHandler(handler)
+            for target in handler.listener.handlers:
+                root.addHandler(target)
+
+def stop_logging() -> None:
+    """
+        Writes every message that is still queued, stops the
+        background thread, and logs directly from then on
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, LazyQueueHandler) and handler.listening:
+            handler.listener.stop()
+    log_directly()
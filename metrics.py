@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+"""
+    Provides the Metrics class, which records how long each
+    phase of an import took and how each request to Odoo went,
+    and exports them as JSON.
+"""
+
+import json
+import time
+import bisect
+import threading
+import contextlib
+
+class Histogram:
+    """
+        Counts observed values into buckets, where `bounds` are the
+        upper bounds of every bucket but the last, which is unbounded
+    """
+
+    def __init__(self, bounds: tuple) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def observe(self, value: float) -> None:
+        """
+            Adds `value` to its bucket
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+
+    def as_dict(self) -> dict:
+        """
+            Returns the histogram as a dictionary that can be serialized to JSON
+        """
+        return {
+            'bounds': list(self.bounds),
+            'counts': list(self.counts),
+            'count': self.count,
+            'sum': self.total,
+            'min': self.minimum,
+            'max': self.maximum,
+            'mean': self.total / self.count if self.count else None,
+        }
+
+class Metrics:
+    """
+        Thread-safe measurements of an import:
+            `phases` - the wall time and requests of each phase, in the order they first ran
+            `requests` - per (query type, Odoo model), a histogram of latencies in seconds,
+                the bytes sent and received, their size uncompressed, the time spent
+                compressing and decompressing them, and the errors by type
+            `counters` - named counts of anything else worth recording
+            `gauges` - named values that are replaced, with the lowest and highest they were set to
+
+        Anything that records to a Metrics instance should skip
+        it altogether when there is none, so that measuring costs
+        nothing when it is turned off.
+    """
+
+    # Upper bounds of the latency buckets, in seconds
+    LATENCY_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.phases = dict()
+        self.requests = dict()
+        self.counters = dict()
+        self.gauges = dict()
+        self.request_count = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str) -> None:
+        """
+            Context manager that adds the wall time, and the number
+            of requests sent, while it is open to the phase `name`
+        """
+        requests = self.request_count
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                phase = self.phases.setdefault(name, {'seconds': 0.0, 'requests': 0})
+                phase['seconds'] += elapsed
+                phase['requests'] += self.request_count - requests
+
+    def observe_request(
+        self, query_type: str, model: str, seconds: float,
+        request_bytes: int = 0, response_bytes: int = 0, error: BaseException = None,
+        uncompressed_bytes: tuple = None, gzip_seconds: float = 0.0
+    ) -> None:
+        """
+            Records a request of `query_type` on `model` that took
+            `seconds`, with the size of its payloads as sent, and the
+            `error` it failed with, if any.
+
+            When the payloads were compressed, `uncompressed_bytes` is
+            a tuple of their (request, response) size uncompressed, and
+            `gzip_seconds` is the time spent compressing and decompressing
+        """
+        # pylint: disable=too-many-arguments
+        if uncompressed_bytes is None:
+            uncompressed_bytes = (request_bytes, response_bytes)
+        with self._lock:
+            self.request_count += 1
+            entry = self.requests.get((query_type, model))
+            if entry is None:
+                entry = self.requests[(query_type, model)] = {
+                    'latency': Histogram(self.LATENCY_BOUNDS),
+                    'request_bytes': 0,
+                    'response_bytes': 0,
+                    'uncompressed_request_bytes': 0,
+                    'uncompressed_response_bytes': 0,
+                    'gzip_seconds': 0.0,
+                    'errors': dict(),
+                }
+            entry['latency'].observe(seconds)
+            entry['request_bytes'] += request_bytes
+            entry['response_bytes'] += response_bytes
+            entry['uncompressed_request_bytes'] += uncompressed_bytes[0]
+            entry['uncompressed_response_bytes'] += uncompressed_bytes[1]
+            entry['gzip_seconds'] += gzip_seconds
+            if error is not None:
+                name = type(error).__name__
+                entry['errors'][name] = entry['errors'].get(name, 0) + 1
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """
+            Adds `amount` to the counter `name`
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set(self, name: str, value: float) -> None:
+        """
+            Sets the gauge `name` to `value`
+        """
+        with self._lock:
+            gauge = self.gauges.get(name)
+            if gauge is None:
+                self.gauges[name] = {'value': value, 'min': value, 'max': value}
+            else:
+                gauge['value'] = value
+                gauge['min'] = min(gauge['min'], value)
+                gauge['max'] = max(gauge['max'], value)
+
+    def as_dict(self) -> dict:
+        """
+            Returns every measurement as a dictionary that can be serialized to JSON
+        """
+        with self._lock:
+            return {
+                'started': self.started,
+                'seconds': time.time() - self.started,
+                'phases': [dict(name=name, **phase) for name, phase in self.phases.items()],
+                'requests': [
+                    {
+                        'query_type': query_type,
+                        'model': model,
+                        'latency': entry['latency'].as_dict(),
+                        'request_bytes': entry['request_bytes'],
+                        'response_bytes': entry['response_bytes'],
+                        'uncompressed_request_bytes': entry['uncompressed_request_bytes'],
+                        'uncompressed_response_bytes': entry['uncompressed_response_bytes'],
+                        'gzip_seconds': entry['gzip_seconds'],
+                        'errors': dict(entry['errors']),
+                    }
+                    for (query_type, model), entry in self.requests.items()
+                ],
+                'counters': dict(self.counters),
+                'gauges': {name: dict(gauge) for name, gauge in self.gauges.items()},
+            }
+
+    def write(self, path: str) -> None:
+        """
+            Writes the measurements to `path` as JSON
+        """
+        with open(path, 'w') as output:
+            json.dump(self.as_dict(), output, indent=2)
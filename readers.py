@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+
+"""
+    Provides the readers that turn an input file into rows
+    for `ProcessWorkbook`. Every reader yields each row as a
+    plain tuple of values, in the column layout of the sheet:
+    serial, asset tag, relationship, make, model, device type.
+
+    `open_reader` picks the reader from the file extension.
+"""
+
+import os
+import abc
+import csv
+import logging
+
+from openpyxl import load_workbook
+
+from exceptions import InputError
+
+class Reader(abc.ABC):
+    """
+        Base class for the readers, which handles the row range
+        and detecting where the data ends.
+
+        `first_row` - the first row (counting from 1) to read
+        `last_row` - the last row to read, or 0 to read until the data ends
+        `last_col` - the number of columns in each row. Rows are cut or padded with None to fit
+        `blank_rows_to_end` - when `last_row` is 0, the data ends after this many blank rows in a row
+
+        Blank rows are never yielded. `row_number` is the number
+        (counting from 1) of the row that was yielded last.
+    """
+
+    def __init__(self, path: str, first_row: int = 1, last_row: int = 0,
+            last_col: int = 6, blank_rows_to_end: int = 100) -> None:
+        self.path = path
+        self.first_row = first_row
+        self.last_row = last_row
+        self.last_col = last_col
+        self.blank_rows_to_end = blank_rows_to_end
+        self.row_number = 0
+
+    @abc.abstractmethod
+    def _raw_rows(self) -> tuple:
+        """
+            Yields a tuple of (row number, values) for every row
+            from `first_row`, stopping at `last_row` if it is set
+        """
+
+    def __iter__(self) -> tuple:
+        blank_rows = 0
+        for self.row_number, row in self._raw_rows():
+            if all(value is None for value in row):
+                blank_rows += 1
+                if not self.last_row and blank_rows >= self.blank_rows_to_end:
+                    logging.info('Stopped reading after %d blank rows', blank_rows)
+                    return
+                continue
+
+            blank_rows = 0
+            yield row
+
+    def close(self) -> None:
+        """
+            Releases the input file, if the reader holds it open
+        """
+
+class XlsxReader(Reader):
+    """
+        Reads a `sheet` of an Excel workbook with openpyxl.
+
+        When `read_only` is True, the sheet is streamed a row at
+        a time, otherwise the whole workbook is loaded first.
+    """
+
+    def __init__(self, path: str, sheet: str, read_only: bool = True, **kwargs: dict) -> None:
+        super().__init__(path, **kwargs)
+        self.read_only = read_only
+        self.workbook = load_workbook(filename=path, read_only=read_only, data_only=True)
+        self.sheet = self.workbook[sheet]
+
+    def _raw_rows(self) -> tuple:
+        return enumerate(self.sheet.iter_rows(
+            min_row=self.first_row,
+            max_col=self.last_col,
+            max_row=self.last_row or None,
+            values_only=True
+        ), start=self.first_row)
+
+    def close(self) -> None:
+        if self.read_only:
+            # Read-only workbooks hold the file open until they're closed
+            self.workbook.close()
+
+class CsvReader(Reader):
+    """
+        Reads a delimited text file with the `csv` module, which
+        is much faster than parsing a workbook. The `dialect`
+        defaults to Excel's CSV. Empty cells are read as None,
+        the same as they are in a workbook. Rows are numbered by
+        the line of the file that they start on, so a row after a
+        quoted value with line breaks has the number an editor shows.
+    """
+
+    def __init__(self, path: str, dialect: str = 'excel', **kwargs: dict) -> None:
+        super().__init__(path, **kwargs)
+        self.dialect = dialect
+        self.file = open(path, newline='', encoding='utf-8-sig')
+
+    def _raw_rows(self) -> tuple:
+        padding = (None,) * self.last_col
+        reader = csv.reader(self.file, dialect=self.dialect)
+        number = 1
+        for row in reader:
+            if number >= self.first_row:
+                if self.last_row and number > self.last_row:
+                    return
+                values = tuple(value if value != '' else None for value in row[:self.last_col])
+                yield number, (values + padding)[:self.last_col]
+            # A quoted value can span lines, so the next row starts after the last line this one was read from
+            number = reader.line_num + 1
+
+    def close(self) -> None:
+        self.file.close()
+
+# The reader and its extra arguments for each supported file extension
+READERS = {
+    '.xlsx': (XlsxReader, {}),
+    '.xlsm': (XlsxReader, {}),
+    '.csv': (CsvReader, {'dialect': 'excel'}),
+    '.tsv': (CsvReader, {'dialect': 'excel-tab'}),
+    '.txt': (CsvReader, {'dialect': 'excel-tab'}),
+}
+
+def open_reader(path: str, sheet: str = '', read_only: bool = True, **kwargs: dict) -> Reader:
+    """
+        Returns the reader for `path`, chosen by its extension.
+        `sheet` and `read_only` only apply to workbooks, the rest
+        of the arguments are those of `Reader`
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise InputError('spreadsheet',
+            'Unsupported file type "%s". Supported types are: %s' % (extension, ', '.join(READERS)))
+
+    reader, arguments = READERS[extension]
+    if reader is XlsxReader:
+        arguments = {'sheet': sheet, 'read_only': read_only}
+    return reader(path, **arguments, **kwargs)
@@ -7,10 +7,13 @@
 """
     Provides the Record class, which is a close
     representation of an Odoo Record for the purposes
-    of importing line items.
+    of importing line items, along with the containers
+    that hold them.
 """
 
+import sys
 import json
+from collections import Counter
 
 class Record:
     """
@@ -20,17 +23,27 @@ class Record:
         and this class will enforce that when an instance is created.
         The only field that is not expected to be a string is
         the `children` field, which should be a list containing
-        one or more Record objects, or None
+        one or more Record objects (usually a `RecordList`), or None
+
+        Records use `__slots__` rather than a `__dict__`, and the
+        fields that repeat across a spreadsheet (make, model and
+        device type) are interned, so each distinct value is only
+        stored once no matter how many Records share it.
     """
 
+    __slots__ = ('serial', 'asset_tag', 'make', 'model', 'device_type', 'children')
+
+    # The fields that hold strings, in the order they are stored by `RecordBatch`
+    FIELDS = ('serial', 'asset_tag', 'make', 'model', 'device_type')
+
     def __init__(self, **kwargs: dict) -> None:
         self.serial = str(kwargs.get('serial'))
         self.asset_tag = str(kwargs.get('asset_tag'))
-        self.make = str(kwargs.get('make'))
-        self.model = str(kwargs.get('model'))
-        self.device_type = str(kwargs.get('device_type'))
+        self.make = sys.intern(str(kwargs.get('make')))
+        self.model = sys.intern(str(kwargs.get('model')))
+        self.device_type = sys.intern(str(kwargs.get('device_type')))
 
-        self.children = kwargs.get('children', list())
+        self.children = kwargs.get('children', RecordList())
 
         # Special case for serial numbers recorded as dell links
         if 'dell.com' in self.serial:
@@ -46,23 +59,244 @@ class Record:
         """
         return self.serial
 
-    def __repr__(self) -> str:
-        """
-            Used when iterating over a list of Record objects
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, field) for field in self.__slots__)
 
-            Returns a JSON serialized string that
-            represents this Record. Children will be
-            represented as a list of dictionaries or
-            `null`
+    def __setstate__(self, state: tuple) -> None:
+        for field, value in zip(self.__slots__, state):
+            setattr(self, field, value)
+
+    def as_dict(self) -> dict:
+        """
+            Returns the fields of this Record as a dictionary.
+            Children will be represented as a list of
+            dictionaries or None
         """
-        return json.dumps({
+        return {
             'serial': self.serial,
             'asset_tag': self.asset_tag,
             'make': self.make,
             'model': self.model,
             'device_type': self.device_type,
             'children': [
-                child.__dict__ for child in self.children
+                child.as_dict() for child in self.children
                 if child is not None
             ] if self.children is not None else None,
-        })
+        }
+
+    def __repr__(self) -> str:
+        """
+            Used when iterating over a list of Record objects
+
+            Returns a JSON serialized string that
+            represents this Record. Children will be
+            represented as a list of dictionaries or
+            `null`
+        """
+        return json.dumps(self.as_dict())
+
+class RecordList(list):
+    """
+        A list of Record objects that keeps a hashed index
+        of the serial numbers it contains.
+
+        The index is updated by every method that adds or
+        removes Records, so `has_serial` is a constant time
+        check rather than a walk over the whole list.
+        Serials are counted, since ignored serials may
+        legitimately appear more than once.
+
+        The index is only built the first time it is needed,
+        so lists that are never searched (such as most lists
+        of children) don't pay for one.
+    """
+
+    __slots__ = ('_serials',)
+
+    def __init__(self, records: list = ()) -> None:
+        super().__init__(records)
+        self._serials = None
+
+    @property
+    def serials(self) -> Counter:
+        """
+            The number of Records in this list with each serial
+        """
+        if self._serials is None:
+            self._serials = Counter(record.serial for record in self if record.serial)
+        return self._serials
+
+    def _index(self, record: Record) -> None:
+        if self._serials is not None and record.serial:
+            self._serials[record.serial] += 1
+
+    def _unindex(self, record: Record) -> None:
+        if self._serials is not None and record.serial:
+            self._serials[record.serial] -= 1
+            if self._serials[record.serial] <= 0:
+                del self._serials[record.serial]
+
+    def has_serial(self, serial: str) -> bool:
+        """
+            Returns True if any Record in this list has `serial`
+        """
+        return serial in self.serials
+
+    def append(self, record: Record) -> None:
+        super().append(record)
+        self._index(record)
+
+    def insert(self, index: int, record: Record) -> None:
+        super().insert(index, record)
+        self._index(record)
+
+    def extend(self, records: list) -> None:
+        records = list(records)
+        super().extend(records)
+        for record in records:
+            self._index(record)
+
+    def __reduce__(self) -> tuple:
+        """
+            Pickles the Records alone, as the index is rebuilt from them
+        """
+        return (RecordList, (list(self),))
+
+    def __iadd__(self, records: list) -> 'RecordList':
+        self.extend(records)
+        return self
+
+    def remove(self, record: Record) -> None:
+        super().remove(record)
+        self._unindex(record)
+
+    def pop(self, index: int = -1) -> Record:
+        record = super().pop(index)
+        self._unindex(record)
+        return record
+
+    def clear(self) -> None:
+        super().clear()
+        self._serials = None
+
+    def __setitem__(self, index, value) -> None:
+        if isinstance(index, slice):
+            removed, value = self[index], list(value)
+            added = value
+        else:
+            removed, added = [self[index]], [value]
+        super().__setitem__(index, value)
+        for record in removed:
+            self._unindex(record)
+        for record in added:
+            self._index(record)
+
+    def __delitem__(self, index) -> None:
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        super().__delitem__(index)
+        for record in removed:
+            self._unindex(record)
+
+class RecordBatch:
+    """
+        A columnar container for a large number of Records.
+
+        Rather than an object per Record, each field is kept in
+        its own list, and children are kept as the index of their
+        parent. This takes a fraction of the memory of the same
+        Records as objects, and pickles much faster, which makes
+        it suited to holding or moving (see `batch.py`) the Records
+        of a large import.
+
+        Records are only created when they are asked for, with
+        `to_records`, iteration or indexing.
+    """
+
+    __slots__ = ('columns', 'parents', 'has_children')
+
+    def __init__(self) -> None:
+        self.columns = tuple(list() for _ in Record.FIELDS)
+        # The index of each entry's parent, or -1 when it is a top level Record
+        self.parents = list()
+        # Whether each entry's `children` was a list (even an empty one) rather than None
+        self.has_children = list()
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def _append(self, record: Record, parent: int) -> None:
+        index = len(self.parents)
+        for column, field in zip(self.columns, Record.FIELDS):
+            column.append(getattr(record, field))
+        self.parents.append(parent)
+        self.has_children.append(record.children is not None)
+        for child in record.children or ():
+            self._append(child, index)
+
+    def append(self, record: Record) -> None:
+        """
+            Adds `record` and its children to the batch
+        """
+        self._append(record, -1)
+
+    @classmethod
+    def from_records(cls, records: list) -> 'RecordBatch':
+        """
+            Returns a new RecordBatch that holds `records`
+        """
+        batch = cls()
+        for record in records:
+            batch.append(record)
+        return batch
+
+    def _record(self, index: int) -> Record:
+        record = Record.__new__(Record)
+        for column, field in zip(self.columns, Record.FIELDS):
+            setattr(record, field, column[index])
+        record.children = RecordList() if self.has_children[index] else None
+        return record
+
+    def to_records(self) -> RecordList:
+        """
+            Returns the top level Records of the batch, with their children
+        """
+        records = RecordList()
+        created = list()
+        for index, parent in enumerate(self.parents):
+            record = self._record(index)
+            created.append(record)
+            if parent < 0:
+                records.append(record)
+            else:
+                created[parent].children.append(record)
+        return records
+
+    def __iter__(self) -> Record:
+        return iter(self.to_records())
+
+    def __getstate__(self) -> tuple:
+        return (self.columns, self.parents, self.has_children)
+
+    def __setstate__(self, state: tuple) -> None:
+        self.columns, self.parents, self.has_children = state
+        # Interning doesn't survive pickling, so the repeating columns are interned again
+        for column in self.columns[2:]:
+            column[:] = [sys.intern(value) for value in column]
+
+class LazyRecords:
+    """
+        Wraps a list of Records for logging, so that they are only
+        serialized if a handler actually emits the message, and
+        only once no matter how many handlers emit it
+    """
+
+    __slots__ = ('records', '_text')
+
+    def __init__(self, records: list) -> None:
+        self.records = records
+        self._text = None
+
+    def __str__(self) -> str:
+        if self._text is None:
+            self._text = '[%s]' % (', '.join(repr(record) for record in self.records))
+        return self._text
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+"""
+    Provides the ModelRegistry class, which maps the
+    (make, model) pairs found in a spreadsheet to the
+    database id of their Odoo sellable item, and the
+    AssetIndex class, which mirrors the lines already
+    on an asset catalog.
+"""
+
+from typing import Union
+
+from api import API
+
+class ModelRegistry:
+    """
+        Keeps track of every unique model found in the spreadsheet,
+        and where it is in the process of getting a sellable id.
+
+        Each entry is keyed on its (make, model) pair, and moves through these states:
+            `PENDING` - found in the spreadsheet, not yet searched for in Odoo
+            `MISSING` - searched for, but Odoo has no matching sellable item
+            `RESOLVED` - searched for, and the sellable id is known
+            `CREATED` - was missing, and a sellable item has since been created
+
+        A model is only registered once. When the same model shows up
+        again under a different make, it shares the first pair's entry,
+        as the sellable search is done on the model alone.
+    """
+
+    PENDING = 'pending'
+    MISSING = 'missing'
+    RESOLVED = 'resolved'
+    CREATED = 'created'
+
+    def __init__(self) -> None:
+        # (make, model) -> [state, sellable id]
+        self.entries = dict()
+        # model -> the (make, model) pair it was first registered under
+        self.by_model = dict()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __contains__(self, model: str) -> bool:
+        return model in self.by_model
+
+    def add(self, make: str, model: str) -> bool:
+        """
+            Registers the (`make`, `model`) pair as `PENDING`
+
+            Returns True if the model was new, False if it was already registered
+        """
+        if model in self.by_model:
+            return False
+        self.by_model[model] = (make, model)
+        self.entries[(make, model)] = [self.PENDING, None]
+        return True
+
+    def _set(self, key: tuple, state: str, sellable_id: Union[int, None] = None) -> None:
+        if key not in self.entries:
+            self.add(*key)
+        self.entries[key] = [state, sellable_id]
+
+    def resolve(self, key: tuple, sellable_id: int) -> None:
+        """
+            Records the sellable id that was found for the (make, model) `key`
+        """
+        self._set(key, self.RESOLVED, sellable_id)
+
+    def mark_missing(self, key: tuple) -> None:
+        """
+            Records that no sellable item could be found for the (make, model) `key`
+        """
+        self._set(key, self.MISSING)
+
+    def mark_created(self, key: tuple, sellable_id: int) -> None:
+        """
+            Records the id of the sellable item that was created for the (make, model) `key`
+        """
+        self._set(key, self.CREATED, sellable_id)
+
+    def discard(self, key: tuple) -> None:
+        """
+            Unregisters the (make, model) `key`, if it is registered,
+            so that it starts over as `PENDING` when it is added again
+        """
+        if self.entries.pop(key, None) is not None and self.by_model.get(key[1]) == key:
+            del self.by_model[key[1]]
+
+    def state(self, key: tuple) -> Union[str, None]:
+        """
+            Returns the state of the (make, model) `key`, or None if it isn't registered
+        """
+        entry = self.entries.get(key)
+        return entry[0] if entry else None
+
+    def in_state(self, state: str) -> list:
+        """
+            Returns the (make, model) pairs that are currently in `state`
+        """
+        return [key for key, entry in self.entries.items() if entry[0] == state]
+
+    def get_id(self, model: str) -> Union[int, None]:
+        """
+            Returns the sellable id for `model`, or None
+            if it hasn't been resolved or created yet
+        """
+        key = self.by_model.get(model)
+        if key is None:
+            return None
+        return self.entries[key][1]
+
+class AssetIndex:
+    """
+        A local copy of the (make, serial) pairs that are already
+        on an asset catalog, so that existence checks don't each
+        need a request to Odoo.
+
+        `make` is the sellable id of the line, and serials are
+        compared case insensitively, the same as the `=ilike`
+        search that it replaces.
+    """
+
+    def __init__(self, catalog_id: int) -> None:
+        self.catalog_id = catalog_id
+        self.pairs = set()
+        # The highest line id that was read, so that `fetch` only reads newer lines
+        self.last_id = 0
+
+    def __len__(self) -> int:
+        return len(self.pairs)
+
+    @staticmethod
+    def _key(make: int, serial: str) -> tuple:
+        return (make, str(serial).casefold())
+
+    def add(self, make: int, serial: str) -> None:
+        """
+            Records that a line for `make` and `serial` is on the catalog
+        """
+        self.pairs.add(self._key(make, serial))
+
+    def discard(self, make: int, serial: str) -> None:
+        """
+            Forgets the line for `make` and `serial`, if there is one
+        """
+        self.pairs.discard(self._key(make, serial))
+
+    def contains(self, make: int, serial: str) -> bool:
+        """
+            Returns True if the catalog has a line for `make` and `serial`
+        """
+        return self._key(make, serial) in self.pairs
+
+    def fetch(self, api: API, page_size: int = 1000) -> 'AssetIndex':
+        """
+            Reads every line of the catalog from Odoo with `api`,
+            `page_size` lines at a time in id order, and adds them
+            to the index. Once the index has been fetched, fetching
+            it again only reads the lines that were added since
+
+            Returns `self` (this instance of AssetIndex)
+        """
+        while True:
+            lines = api.do_search_and_read(
+                'erpwarehouse.asset',
+                [('catalog', '=', self.catalog_id), ('id', '>', self.last_id)],
+                {'fields': ['make', 'serial'], 'limit': page_size, 'order': 'id'}
+            )
+            for line in lines:
+                # Many2one fields are read as [id, display name], or False when unset
+                make = line['make'][0] if line['make'] else False
+                self.add(make, line['serial'] or '')
+            if lines:
+                self.last_id = lines[-1]['id']
+            if len(lines) < page_size:
+                return self
@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=bad-continuation
+
+"""
+    A local stand-in for Odoo's `/xmlrpc/2/object` endpoint, so that
+    `API` and `ProcessWorkbook` can be measured without a live ERP.
+
+    Only `execute_kw` is served, over XMLRPC and on the `/jsonrpc`
+    endpoint, with the `search`, `search_read`, `search_count`,
+    `read`, `create` and `write` methods, on in-memory tables
+    for `erpwarehouse.sellable`, `erpwarehouse.asset` and
+    `erpwarehouse.ddl_item`. Credentials aren't checked.
+
+    Latency, jitter and faults can be injected, see `StandInOdoo`.
+
+    Usage: `python3 standin.py [port]`, which serves until it is
+    interrupted. Set `odoo_host` to `http://127.0.0.1:<port>` to
+    point the import at it.
+"""
+
+import re
+import sys
+import json
+import functools
+import time
+import random
+import threading
+import itertools
+import socketserver
+import xmlrpc.client
+from collections import Counter
+from typing import Union
+from xmlrpc.server import SimpleXMLRPCServer, SimpleXMLRPCRequestHandler
+
+from api import ilike_match
+
+# Fields that are many2one relations, and are read as [id, display name]
+MANY2ONE = {
+    'erpwarehouse.asset': ('catalog', 'make'),
+    'erpwarehouse.ddl_item': ('ddl', 'make'),
+}
+
+@functools.lru_cache(maxsize=1024)
+def _like_expression(pattern: str) -> 're.Pattern':
+    return re.compile(''.join(
+        '.*' if char == '%' else '.' if char == '_' else re.escape(char)
+        for char in pattern
+    ), re.IGNORECASE | re.DOTALL)
+
+def like_match(pattern: str, value: str) -> bool:
+    """
+        Returns True if Odoo would match `value` with `('field', '=ilike', pattern)`,
+        that is, the whole of `value` matches `pattern` case insensitively
+    """
+    if not isinstance(value, str):
+        return False
+    if '%' not in pattern and '_' not in pattern:
+        return pattern.casefold() == value.casefold()
+    return _like_expression(pattern).fullmatch(value) is not None
+
+OPERATORS = {
+    '=': lambda value, operand: value == operand,
+    '!=': lambda value, operand: value != operand,
+    '>': lambda value, operand: value is not None and value > operand,
+    '>=': lambda value, operand: value is not None and value >= operand,
+    '<': lambda value, operand: value is not None and value < operand,
+    '<=': lambda value, operand: value is not None and value <= operand,
+    'in': lambda value, operand: value in operand,
+    'not in': lambda value, operand: value not in operand,
+    'ilike': lambda value, operand: ilike_match(operand, value),
+    '=ilike': like_match,
+}
+
+def _leaf(record: dict, term: tuple) -> bool:
+    field, operator, operand = term
+    value = record.get(field)
+    if isinstance(value, list):
+        # Many2one fields compare on their id
+        value = value[0]
+    return OPERATORS[operator](value, operand)
+
+def matches(record: dict, domain: list) -> bool:
+    """
+        Returns True if `record` is matched by the Odoo `domain`,
+        which can use the prefix operators `|`, `&` and `!`
+    """
+    if not any(isinstance(term, str) for term in domain):
+        # Only leaves, which are joined with `&`, so stop at the first that fails
+        return all(_leaf(record, term) for term in domain)
+
+    stack = list()
+    for term in reversed(domain):
+        if term == '!':
+            stack.append(not stack.pop())
+        elif term in ('|', '&'):
+            first, second = stack.pop(), stack.pop()
+            stack.append(first or second if term == '|' else first and second)
+        else:
+            stack.append(_leaf(record, term))
+    # Terms without an operator between them are joined with `&`
+    return all(stack)
+
+class StandInHandler(SimpleXMLRPCRequestHandler):
+    """
+        Keeps connections alive between requests, like Odoo
+        behind a proxy, and drops some of them on purpose
+        when the server has a `drop_rate`. Compressed requests
+        are accepted, and responses are compressed over the
+        server's `gzip_threshold`, like a proxy in front of
+        Odoo would. Odoo on its own does neither.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    rpc_paths = ('/xmlrpc/2/object', '/jsonrpc')
+
+    @property
+    def encode_threshold(self) -> Union[int, None]:
+        """
+            Responses larger than this are compressed, when the client accepts it
+        """
+        return self.server.odoo.gzip_threshold
+
+    def do_POST(self) -> None:
+        if self.server.odoo.should_drop():
+            # Read the request, then close without a response
+            self.rfile.read(int(self.headers.get('content-length', 0)))
+            self.close_connection = True
+            return
+        if self.path == '/jsonrpc':
+            self._do_jsonrpc()
+            return
+        super().do_POST()
+
+    def _do_jsonrpc(self) -> None:
+        """
+            Answers a JSON-RPC call of `execute_kw`, with
+            faults as the errors that Odoo would return
+        """
+        data = self.decode_request_content(self.rfile.read(int(self.headers.get('content-length', 0))))
+        if data is None:
+            # An encoding that isn't supported, which has been answered already
+            return
+        request = json.loads(data)
+        try:
+            reply = {'result': self.server.odoo.execute_kw(*request['params']['args'])}
+        except xmlrpc.client.Fault as fault:
+            reply = {'error': {
+                'code': 200,
+                'message': 'Odoo Server Error',
+                'data': {'name': 'odoo.exceptions.UserError', 'message': fault.faultString},
+            }}
+        body = json.dumps(dict(jsonrpc='2.0', id=request.get('id'), **reply)).encode('utf-8')
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        if self.encode_threshold is not None and len(body) > self.encode_threshold \
+                and self.accept_encodings().get('gzip', 0):
+            body = xmlrpc.client.gzip_encode(body)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class StandInServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    """
+        Serves each connection on its own thread
+    """
+
+    daemon_threads = True
+    request_queue_size = 256
+
+class StandInOdoo:
+    """
+        An in-memory Odoo that answers `execute_kw` over XML-RPC.
+
+        `latency` - seconds that every call takes before it is answered
+        `jitter` - up to this many more seconds are added to each call, at random
+        `fault_rate` - the fraction of calls that return an XML-RPC fault instead
+        `drop_rate` - the fraction of requests whose connection is closed without an answer
+        `workers` - the most calls that are answered at once, like Odoo's workers.
+            Any more wait their turn, so latency grows when the server is pushed too hard.
+            Unlimited when 0
+        `seed` - seeds the random faults and jitter, so that runs can be repeated
+        `gzip_threshold` - responses larger than this many bytes are compressed
+            with gzip when the client accepts it. Never when None
+
+        Injected faults look like a transaction that Odoo had to
+        roll back, which is safe to send again.
+
+        `calls` counts every call by (method, model), and
+        `tables` holds the records of each model by id.
+    """
+
+    MODELS = ('erpwarehouse.sellable', 'erpwarehouse.asset', 'erpwarehouse.ddl_item')
+    FAULT = 'could not serialize access due to concurrent update'
+
+    def __init__(
+        self, latency: float = 0.0, jitter: float = 0.0, fault_rate: float = 0.0,
+        drop_rate: float = 0.0, workers: int = 0, seed: int = None, gzip_threshold: int = None
+    ) -> None:
+        # pylint: disable=too-many-arguments
+        self.latency = latency
+        self.jitter = jitter
+        self.fault_rate = fault_rate
+        self.drop_rate = drop_rate
+        self.workers = threading.BoundedSemaphore(workers) if workers else None
+        self.random = random.Random(seed)
+        self.gzip_threshold = gzip_threshold
+
+        self.tables = {model: dict() for model in self.MODELS}
+        # (model, operator, field) -> {value: set of ids}, built the first time they're searched on
+        self.indexes = dict()
+        self.calls = Counter()
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+        self.server = None
+
+    @property
+    def url(self) -> str:
+        """
+            The `odoo_host` of the running server
+        """
+        host, port = self.server.server_address[:2]
+        return 'http://%s:%d' % (host, port)
+
+    def start(self, port: int = 0) -> 'StandInOdoo':
+        """
+            Starts serving on `port` (any free port when 0)
+            from a background thread
+
+            Returns `self` (this instance of StandInOdoo)
+        """
+        self.server = StandInServer(
+            ('127.0.0.1', port), requestHandler=StandInHandler,
+            logRequests=False, allow_none=True
+        )
+        self.server.odoo = self
+        self.server.register_function(self.execute_kw, 'execute_kw')
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        """
+            Stops serving and closes the listening socket
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def seed(self, model: str, records: list) -> list:
+        """
+            Adds `records` (dictionaries of values) to `model`
+
+            Returns the ids they were given
+        """
+        with self.lock:
+            return [self._create(model, values) for values in records]
+
+    def total_calls(self) -> int:
+        """
+            Returns the number of calls made so far
+        """
+        return sum(self.calls.values())
+
+    def should_drop(self) -> bool:
+        """
+            Returns True if the current request should be dropped
+        """
+        with self.lock:
+            return self.drop_rate > 0 and self.random.random() < self.drop_rate
+
+    def reset(self) -> 'StandInOdoo':
+        """
+            Empties every table, and the counts of calls
+
+            Returns `self` (this instance of StandInOdoo)
+        """
+        with self.lock:
+            self.tables = {model: dict() for model in self.MODELS}
+            self.indexes = dict()
+            self.calls = Counter()
+        return self
+
+    @staticmethod
+    def _index_value(operator: str, value: object) -> object:
+        if isinstance(value, list):
+            value = value[0]
+        if operator == '=ilike':
+            return value.casefold() if isinstance(value, str) else None
+        return value
+
+    def _index(self, model: str, operator: str, field: str) -> dict:
+        """
+            Returns the ids of the records of `model`, keyed on
+            their `field` as `operator` compares it, so that
+            searches on a table with many records stay quick
+        """
+        key = (model, operator, field)
+        if key not in self.indexes:
+            index = self.indexes[key] = dict()
+            for record in self.tables[model].values():
+                index.setdefault(self._index_value(operator, record.get(field)), set()).add(record['id'])
+        return self.indexes[key]
+
+    def _create(self, model: str, values: dict) -> int:
+        record = dict(values)
+        record['id'] = next(self.ids)
+        record['write_date'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+        for field in MANY2ONE.get(model, ()):
+            if field in record and not isinstance(record[field], list):
+                record[field] = [record[field], '%s,%s' % (field, record[field])]
+        self.tables[model][record['id']] = record
+        for (index_model, operator, field), index in self.indexes.items():
+            if index_model == model:
+                index.setdefault(self._index_value(operator, record.get(field)), set()).add(record['id'])
+        return record['id']
+
+    def _write(self, model: str, ids: list, values: dict) -> bool:
+        for record_id in ids:
+            if record_id not in self.tables[model]:
+                raise xmlrpc.client.Fault(4, 'Record %s of %s doesn\'t exist' % (record_id, model))
+        for record_id in ids:
+            record = self.tables[model][record_id]
+            record.update(values)
+            record['write_date'] = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+            for field in MANY2ONE.get(model, ()):
+                if field in values and not isinstance(record[field], list):
+                    record[field] = [record[field], '%s,%s' % (field, record[field])]
+        # The indexes are rebuilt by the next search that needs them
+        for key in [key for key in self.indexes if key[0] == model]:
+            del self.indexes[key]
+        return True
+
+    def _candidates(self, model: str, domain: list) -> list:
+        """
+            Returns the records of `model` that could match `domain`,
+            narrowed down with an index when every term of it has to
+            match and one of them is an exact (`=` or `=ilike`) match
+            on a serial number
+        """
+        table = self.tables[model]
+        if not any(isinstance(term, str) for term in domain):
+            for field, operator, operand in domain:
+                if field != 'serial' or operator not in ('=', '=ilike'):
+                    continue
+                if operator == '=ilike' and ('%' in operand or '_' in operand):
+                    continue
+                ids = self._index(model, operator, field).get(self._index_value(operator, operand), ())
+                return [table[i] for i in sorted(ids)]
+        return table.values()
+
+    def _search(self, model: str, domain: list, options: dict) -> list:
+        records = [record for record in self._candidates(model, domain) if matches(record, domain)]
+        order = options.get('order', 'id')
+        if order:
+            field, _, direction = order.partition(' ')
+            records.sort(key=lambda record: record.get(field) or 0, reverse=direction.lower() == 'desc')
+        offset = options.get('offset', 0)
+        limit = options.get('limit') or None
+        return records[offset:offset + limit if limit else None]
+
+    @staticmethod
+    def _read(records: list, fields: list) -> list:
+        return [
+            {field: record.get(field, False) for field in ['id'] + list(fields or record)}
+            for record in records
+        ]
+
+    def execute_kw(
+        self, database: str, user_id: int, password: str, model: str,
+        method: str, arguments: list, options: dict = None
+    ) -> object:
+        """
+            Answers an Odoo `execute_kw` call, after the injected
+            latency. Raises `xmlrpc.client.Fault` for the injected
+            faults, for unknown models and for unknown methods
+        """
+        # pylint: disable=unused-argument,too-many-arguments
+        if self.workers is None:
+            return self._execute(model, method, arguments, options or dict())
+        with self.workers:
+            return self._execute(model, method, arguments, options or dict())
+
+    def _execute(self, model: str, method: str, arguments: list, options: dict) -> object:
+        with self.lock:
+            delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay:
+            time.sleep(delay)
+
+        with self.lock:
+            self.calls[(method, model)] += 1
+            if self.fault_rate and self.random.random() < self.fault_rate:
+                raise xmlrpc.client.Fault(1, self.FAULT)
+            if model not in self.tables:
+                raise xmlrpc.client.Fault(2, 'Object %s doesn\'t exist' % (model))
+
+            if method == 'create':
+                values = arguments[0]
+                if isinstance(values, list):
+                    return [self._create(model, value) for value in values]
+                return self._create(model, values)
+
+            if method == 'write':
+                return self._write(model, arguments[0], options.get('vals', dict()))
+
+            if method == 'read':
+                records = [self.tables[model][i] for i in arguments[0] if i in self.tables[model]]
+                return self._read(records, options.get('fields'))
+
+            records = self._search(model, arguments[0] if arguments else [], options)
+            if method == 'search':
+                return [record['id'] for record in records]
+            if method == 'search_count':
+                return len(records)
+            if method == 'search_read':
+                return self._read(records, options.get('fields'))
+
+        raise xmlrpc.client.Fault(3, 'Method %s is not supported' % (method))
+
+if __name__ == '__main__':
+    ODOO = StandInOdoo().start(int(sys.argv[1]) if len(sys.argv) > 1 else 8069)
+    print('Serving a stand-in Odoo on %s' % (ODOO.url))
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        ODOO.stop()
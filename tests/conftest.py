@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Shared setup for the tests.
+
+    `app.py` reads its configuration from the environment and starts
+    logging when it is imported, so the environment is set here, and
+    the tests run from a temporary directory that the log and csv
+    files land in. Tests that talk to Odoo use the `odoo` fixture,
+    a `standin.StandInOdoo`, never a real ERP.
+"""
+
+import os
+import sys
+import csv
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.chdir(tempfile.mkdtemp(prefix='xlsx-to-itad-odoo-tests-'))
+
+os.environ.update({
+    'odoo_host': 'http://127.0.0.1:1',
+    'odoo_database': 'tests',
+    'odoo_user': '1',
+    'odoo_pass': 'tests',
+    'serials_to_ignore': 'N/A',
+    'first_row': '2',
+    'use_journal': '1',
+    'resume': '0',
+    'delta_import': '0',
+    'use_async': '0',
+    'upload_workers': '1',
+    'odoo_prefetch_assets': '0',
+})
+
+HEADER = ('Serial', 'Asset Tag', 'Relationship', 'Make', 'Model', 'Type')
+
+@pytest.fixture
+def odoo(monkeypatch: pytest.MonkeyPatch) -> 'standin.StandInOdoo':
+    """
+        A stand-in Odoo with no latency, that new `API` instances connect to
+    """
+    from standin import StandInOdoo
+
+    server = StandInOdoo(seed=1).start()
+    monkeypatch.setenv('odoo_host', server.url)
+    yield server
+    server.stop()
+
+@pytest.fixture
+def write_sheet(tmp_path: 'pathlib.Path') -> 'function':
+    """
+        Returns a function that writes rows, in the layout that
+        `ProcessWorkbook` reads, to a csv file and returns its path
+    """
+    def write(rows: list, name: str = 'sheet.csv') -> str:
+        path = str(tmp_path / name)
+        with open(path, 'w', newline='') as output:
+            writer = csv.writer(output)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        return path
+    return write
+
+@pytest.fixture
+def import_sheet(odoo: 'standin.StandInOdoo', write_sheet: 'function') -> 'function':
+    """
+        Returns a function that writes rows with `write_sheet`, imports
+        them into the stand-in Odoo's asset catalog and data destruction
+        1, and returns the finished `ProcessWorkbook`. Keyword arguments
+        are passed on to `ProcessWorkbook`
+    """
+    # pylint: disable=redefined-outer-name,unused-argument
+    import app
+
+    def run(rows: list, name: str = 'sheet.csv', **kwargs) -> 'app.ProcessWorkbook':
+        spreadsheet = write_sheet(rows, name)
+        workbook = app.ProcessWorkbook(
+            spreadsheet=spreadsheet, asset_catalog_id=1, data_destruction_id=1,
+            ignore_csv='%s-ignored.csv' % (os.path.splitext(spreadsheet)[0]), **kwargs
+        )
+        workbook.run()
+        workbook.close(summary=False)
+        return workbook
+    return run
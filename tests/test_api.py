@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+
+"""
+    Tests that `api.AdaptiveLimit` only lowers the request limit
+    when the server is slowing down, and that `async_api.AsyncAPI`
+    keeps its connections for the whole import
+"""
+
+import pytest
+
+import api
+from api import AdaptiveLimit
+
+KIND = ('create', 'erpwarehouse.asset')
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list:
+    """
+        Makes `AdaptiveLimit` read the time from the returned list,
+        so that each lowering of the limit is in a new round trip
+    """
+    now = [0.0]
+    monkeypatch.setattr(api.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_batches_of_different_sizes_keep_the_limit(clock: list) -> None:
+    """
+        Batches that take longer because they hold more records
+        aren't mistaken for a server that is queueing them
+    """
+    limit = AdaptiveLimit(maximum=8)
+    for round_trip in range(200):
+        clock[0] += 1
+        size = (1, 500, 37, 250)[round_trip % 4]
+        limit.on_success(KIND, 0.002 + 0.001 * size, size)
+    assert limit.slots == 8
+
+def test_slower_batches_of_one_size_lower_the_limit(clock: list) -> None:
+    """
+        Batches of the same size that get slower lower the limit
+    """
+    limit = AdaptiveLimit(maximum=8)
+    for _ in range(50):
+        clock[0] += 1
+        limit.on_success(KIND, 0.05, 100)
+    assert limit.slots == 8
+
+    for _ in range(50):
+        clock[0] += 1
+        limit.on_success(KIND, 0.5, 100)
+    assert limit.slots < 8
+
+def test_async_import_keeps_its_connections(
+    odoo: 'standin.StandInOdoo', import_sheet: 'function', monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+        An import with `use_async` runs every upload on the same event
+        loop, so the connections opened for the first requests are
+        reused by the rest, and it opens no connections of `API` for
+        itself
+    """
+    import app
+
+    monkeypatch.setattr(app, 'USE_ASYNC', True)
+    monkeypatch.setenv('odoo_create_batch_size', '2')
+    monkeypatch.setenv('odoo_async_requests', '2')
+    workbook = import_sheet([
+        ('SN%d' % (number), 'T%d' % (number), None, 'Make', 'Model', 'Desktop') for number in range(12)
+    ])
+    assert (workbook.sorting_records_uploaded, workbook.data_records_uploaded) == (12, 12)
+    assert not hasattr(workbook.async_api, 'pool')
+    stats = workbook.async_api.connection_stats()
+    assert stats['opened'] <= 2 < stats['reused']
+    assert workbook.loop.is_closed()
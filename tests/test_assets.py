@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Tests that each serial gets one line on the asset catalog,
+    however the lines already there are checked for
+"""
+
+import pytest
+
+ROWS = [
+    ('abc123', 'T1', None, 'Dell', 'Latitude', 'Laptop'),
+    ('ABC123', 'T2', None, 'Dell', 'Latitude', 'Laptop'),
+]
+
+def test_prefetched_case_variants_make_one_line(
+    odoo: 'standin.StandInOdoo', import_sheet: 'function', monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+        With the asset catalog prefetched, a serial that differs from
+        one that is still waiting to be uploaded only by case is
+        skipped, the same as the `=ilike` search it replaces
+    """
+    import app
+
+    monkeypatch.setattr(app, 'PREFETCH_ASSETS', True)
+    workbook = import_sheet(ROWS)
+    assert workbook.sorting_records_uploaded == 1
+    assert len(odoo.tables['erpwarehouse.asset']) == 1
+    assert len(workbook.asset_index) == 1 and len(workbook.pending_assets) == 0
+
+@pytest.mark.parametrize('use_async', [False, True])
+def test_searched_case_variants_make_one_line(
+    odoo: 'standin.StandInOdoo', import_sheet: 'function', monkeypatch: pytest.MonkeyPatch,
+    use_async: bool
+) -> None:
+    """
+        Without the asset catalog prefetched, a serial that differs
+        from an earlier one in the same batch only by case is skipped
+        as already existing, rather than both being searched for and
+        created together
+    """
+    import app
+
+    monkeypatch.setattr(app, 'USE_ASYNC', use_async)
+    workbook = import_sheet(ROWS)
+    assert workbook.sorting_records_uploaded == 1
+    assert len(odoo.tables['erpwarehouse.asset']) == 1
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+
+"""
+    Tests that `catalog.SellableCatalog` matches models the same
+    as Odoo's `ilike`, as `api.ilike_match` implements it
+"""
+
+import random
+
+import pytest
+
+from api import API, ilike_match
+from catalog import SellableCatalog
+
+MODELS = [
+    'OptiPlex 7010', 'optiplex 7010 SFF', 'PowerEdge R720', 'PowerEdge R720xd', 'R720',
+    'ThinkPad (X1) Carbon', 'ThinkPad X1', 'EliteBook 840 G5', 'EliteBook_840', 'Surface Pro 4',
+    '100% Cotton', 'a.b+c', 'Latitude E7450', 'latitude e7450', 'MacBook Pro', '', None,
+]
+
+PATTERNS = [
+    'OptiPlex 7010', 'OPTIPLEX', '7010 s', 'r720', 'R720X', 'edge r', '(x1)', 'X1) C',
+    'elitebook_840', 'elitebook 840', '840_G', 'Pro', 'pro 4', '%', '_', '', '%book%',
+    'Lat%7450', 'e74_0', '100%', 'a.b', '.b+', 'missing', '7010%SFF', 'R720%Carbon',
+    'Surface%Pro%4', '1', 'xd', 'book', 'Cotton',
+]
+
+def expected(pattern: str, sellables: list) -> int:
+    """
+        Returns the id of the first of `sellables` (in id order)
+        that `api.ilike_match` matches `pattern` with, or None
+    """
+    return next((sellable['id'] for sellable in sellables if ilike_match(pattern, sellable['model'])), None)
+
+@pytest.fixture
+def sellables(odoo: 'standin.StandInOdoo') -> list:
+    """
+        Seeds the stand-in with `MODELS` and returns them as sellable items
+    """
+    ids = odoo.seed('erpwarehouse.sellable', [{'make': 'Make', 'model': model} for model in MODELS])
+    return [{'id': sellable_id, 'model': model} for sellable_id, model in zip(ids, MODELS)]
+
+def test_match_agrees_with_ilike(tmp_path: 'pathlib.Path', sellables: list) -> None:
+    """
+        Every pattern matches the same sellable item as `api.ilike_match`,
+        the first by id, including wildcards and patterns that would
+        span two models if they weren't kept apart
+    """
+    catalog = SellableCatalog(str(tmp_path / 'sellables.sqlite'), 'tests')
+    assert catalog.sync(API(), page_size=5) == len(MODELS)
+    assert len(catalog) == len(MODELS)
+
+    for pattern in PATTERNS:
+        assert catalog.match(pattern) == expected(pattern, sellables), pattern
+    catalog.close()
+
+def test_match_agrees_with_ilike_on_random_patterns(tmp_path: 'pathlib.Path', sellables: list) -> None:
+    """
+        Random slices of the models, with random wildcards and
+        case, match the same sellable item as `api.ilike_match`
+    """
+    catalog = SellableCatalog(str(tmp_path / 'sellables.sqlite'), 'tests')
+    catalog.sync(API())
+    generator = random.Random(1)
+    for _ in range(2000):
+        model = generator.choice([model for model in MODELS if model])
+        start = generator.randrange(len(model))
+        pattern = [
+            generator.choice('%_') if generator.random() < 0.15 else char
+            for char in model[start:generator.randrange(start, len(model)) + 1]
+        ]
+        pattern = ''.join(pattern).swapcase() if generator.random() < 0.5 else ''.join(pattern)
+        assert catalog.match(pattern) == expected(pattern, sellables), pattern
+    catalog.close()
+
+def test_sync_reads_new_sellables_and_clear_forgets(
+    tmp_path: 'pathlib.Path', odoo: 'standin.StandInOdoo', sellables: list
+) -> None:
+    """
+        Sellable items created after a sync are found by the next
+        one, and `clear` empties the mirror of its source only
+    """
+    path = str(tmp_path / 'sellables.sqlite')
+    catalog = SellableCatalog(path, 'tests')
+    catalog.sync(API())
+    assert catalog.match('brand new') is None
+
+    new_id = odoo.seed('erpwarehouse.sellable', [{'make': 'Make', 'model': 'Brand New 9000'}])[0]
+    assert catalog.sync(API()) >= 1
+    assert catalog.match('brand new') == new_id
+    assert catalog.match('OptiPlex') == sellables[0]['id']
+
+    other = SellableCatalog(path, 'other')
+    assert len(other) == 0 and other.match('OptiPlex') is None
+    other.close()
+
+    catalog.clear()
+    assert len(catalog) == 0 and catalog.last_sync() is None
+    assert catalog.match('OptiPlex') is None
+    catalog.close()
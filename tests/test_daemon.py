@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Tests for `daemon.Daemon`, which imports the spreadsheets
+    dropped into a directory
+"""
+
+import os
+import json
+
+import pytest
+
+def drop(write_sheet: 'function', name: str, rows: list) -> str:
+    """
+        Writes `rows` to the spreadsheet `name`.csv, with settings
+        that import it into asset catalog and data destruction 1
+
+        Returns the path of the spreadsheet
+    """
+    spreadsheet = write_sheet(rows, '%s.csv' % (name))
+    with open('%s.json' % (os.path.splitext(spreadsheet)[0]), 'w') as settings:
+        json.dump({'asset_catalog_id': 1, 'data_destruction_id': 1}, settings)
+    return spreadsheet
+
+def test_jobs_and_asset_indexes(
+    odoo: 'standin.StandInOdoo', write_sheet: 'function', tmp_path: 'pathlib.Path',
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+        A finished job is moved to `done/` and its asset index kept for
+        the next job, while a failed job is moved to `failed/`, with its
+        error in its log, and its asset index is dropped
+    """
+    import app
+    import daemon
+
+    monkeypatch.setattr(app, 'PREFETCH_ASSETS', True)
+    watcher = daemon.Daemon(str(tmp_path / 'watch'))
+
+    first = drop(write_sheet, 'first', [('SN1', 'T1', None, 'Make', 'Model', 'Desktop')])
+    assert watcher.run_job(watcher.start_job(first))
+    assert len(os.listdir(os.path.join(watcher.directory, watcher.DONE))) == 1
+    assert len(watcher.asset_indexes[1]) == 1
+
+    create_line_items = app.ProcessWorkbook.create_line_items
+    def fail(workbook: 'app.ProcessWorkbook') -> None:
+        create_line_items(workbook)
+        raise RuntimeError('stopped after uploading')
+    monkeypatch.setattr(app.ProcessWorkbook, 'create_line_items', fail)
+
+    second = drop(write_sheet, 'second', [('SN2', 'T2', None, 'Make', 'Model', 'Desktop')])
+    assert not watcher.run_job(watcher.start_job(second))
+    failed = os.path.join(watcher.directory, watcher.FAILED)
+    job, = os.listdir(failed)
+    with open(os.path.join(failed, job, '%s.log' % (watcher.OUTPUT))) as log:
+        assert 'RuntimeError: stopped after uploading' in log.read()
+    assert len(odoo.tables['erpwarehouse.asset']) == 2
+    assert 1 not in watcher.asset_indexes
+
+def test_failed_job_forgets_its_missing_models(
+    odoo: 'standin.StandInOdoo', write_sheet: 'function', tmp_path: 'pathlib.Path',
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+        The models that a failed job found missing aren't created
+        by the next job, which doesn't use them
+    """
+    import app
+    import daemon
+
+    watcher = daemon.Daemon(str(tmp_path / 'watch'))
+    create_missing_model_ids = app.ProcessWorkbook.create_missing_model_ids
+    def fail(workbook: 'app.ProcessWorkbook') -> None:
+        # pylint: disable=unused-argument
+        raise RuntimeError('stopped before creating models')
+    monkeypatch.setattr(app.ProcessWorkbook, 'create_missing_model_ids', fail)
+
+    first = drop(write_sheet, 'first', [('SN1', 'T1', None, 'Make', 'Unused Model', 'Desktop')])
+    assert not watcher.run_job(watcher.start_job(first))
+    assert 'Unused Model' not in watcher.models
+
+    monkeypatch.setattr(app.ProcessWorkbook, 'create_missing_model_ids', create_missing_model_ids)
+    second = drop(write_sheet, 'second', [('SN2', 'T2', None, 'Make', 'Model', 'Desktop')])
+    assert watcher.run_job(watcher.start_job(second))
+    models = [sellable['model'] for sellable in odoo.tables['erpwarehouse.sellable'].values()]
+    assert 'Model' in models and 'Unused Model' not in models
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Tests that a delta import only uploads what changed, and
+    updates the line items of changed Records in place
+"""
+
+import xmlrpc.client
+
+import pytest
+
+ROWS = [
+    ('SN1', 'T1', 'Parent', 'Make', 'Model A', 'Desktop'),
+    ('HD1', 'T2', 'Child', 'Make', 'Drive', 'Hard Drive'),
+    ('SN2', 'T3', None, 'Make', 'Model A', 'Desktop'),
+    ('SN3', 'T4', None, 'Make', 'Model B', 'Desktop'),
+]
+
+@pytest.mark.parametrize('pipeline', [False, True])
+def test_changed_records_are_updated(
+    odoo: 'standin.StandInOdoo', import_sheet: 'function', tmp_path: 'pathlib.Path',
+    monkeypatch: pytest.MonkeyPatch, pipeline: bool
+) -> None:
+    """
+        Unchanged Records are left alone, and changed Records have
+        their asset and data destruction lines updated rather than
+        getting a second data destruction line
+    """
+    import app
+
+    monkeypatch.setattr(app, 'DELTA_IMPORT', True)
+    monkeypatch.setattr(app, 'DELTA_STORE', str(tmp_path / 'fingerprints.sqlite'))
+    monkeypatch.setattr(app, 'PIPELINE', pipeline)
+
+    first = import_sheet(ROWS)
+    assert (first.records_added, first.sorting_records_uploaded, first.data_records_uploaded) == (3, 3, 3)
+
+    rows = list(ROWS)
+    rows[1] = ('HD9', 'T2', 'Child', 'Make', 'Drive', 'Hard Drive')
+    rows[2] = ('SN2', 'T9', None, 'Make', 'Model C', 'Desktop')
+    calls = odoo.calls.copy()
+    second = import_sheet(rows)
+    assert (second.records_changed, len(second.unchanged)) == (2, 1)
+    assert (second.sorting_records_uploaded, second.data_records_uploaded) == (0, 0)
+    assert second.lines_updated == 4
+    # The lines of both changed Records are found with one search per model
+    calls = odoo.calls - calls
+    assert calls[('search_read', 'erpwarehouse.asset')] == calls[('search_read', 'erpwarehouse.ddl_item')] == 1
+    assert not calls[('search', 'erpwarehouse.asset')]
+
+    assets = {line['serial']: line for line in odoo.tables['erpwarehouse.asset'].values()}
+    ddl_items = [line for line in odoo.tables['erpwarehouse.ddl_item'].values()]
+    assert len(assets) == len(odoo.tables['erpwarehouse.asset']) == 3
+    assert sorted((line['serial'], line['storser']) for line in ddl_items) == [
+        ('SN1', 'HD9'), ('SN2', 'N/A'), ('SN3', 'N/A')
+    ]
+    assert assets['SN2']['tag'] == 'T9'
+    model_c = [
+        sellable['id'] for sellable in odoo.tables['erpwarehouse.sellable'].values()
+        if sellable['model'] == 'Model C'
+    ]
+    assert assets['SN2']['make'][0] == model_c[0]
+
+def test_refused_updates_fail_their_record(
+    odoo: 'standin.StandInOdoo', import_sheet: 'function', tmp_path: 'pathlib.Path',
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """
+        A changed Record whose line items Odoo refuses to update is
+        counted as failed, and the other changed Records are updated
+    """
+    # pylint: disable=unused-argument
+    import app
+    from api import API
+
+    monkeypatch.setattr(app, 'DELTA_IMPORT', True)
+    monkeypatch.setattr(app, 'DELTA_STORE', str(tmp_path / 'fingerprints.sqlite'))
+    import_sheet(ROWS)
+
+    write = API.do_write
+    def refuse(self: API, model: str, ids: list, values: dict) -> bool:
+        if values.get('tag') == 'T8':
+            raise xmlrpc.client.Fault(2, 'ValidationError: the tag is not allowed')
+        return write(self, model, ids, values)
+    monkeypatch.setattr(API, 'do_write', refuse)
+
+    rows = list(ROWS)
+    rows[2] = ('SN2', 'T8', None, 'Make', 'Model A', 'Desktop')
+    rows[3] = ('SN3', 'T9', None, 'Make', 'Model B', 'Desktop')
+    workbook = import_sheet(rows)
+    assert workbook.failed_serials == {'SN2'}
+    assert workbook.lines_updated == 2
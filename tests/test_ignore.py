@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+
+"""
+    Tests for each form of rule in `ignore.IgnoreRules`
+"""
+
+import re
+
+import pytest
+
+from ignore import IgnoreRules
+
+def test_exact_serials() -> None:
+    """
+        Plain lines, and the serials given up front, match only themselves
+    """
+    rules = IgnoreRules((None, '', 'N/A')).extend(['SN123', '  SN456  '])
+    for serial in (None, '', 'N/A', 'SN123', 'SN456'):
+        assert serial in rules
+    for serial in ('SN1234', 'sn123', 'N/A ', 'SN45', 42):
+        assert serial not in rules
+
+def test_prefixes() -> None:
+    """
+        `prefix:` rules of several lengths match serials that start with them
+    """
+    rules = IgnoreRules().extend(['prefix:TEST', 'prefix:X'])
+    for serial in ('TEST', 'TEST-001', 'X', 'X9'):
+        assert serial in rules
+    for serial in ('TES', 'ATEST', 'test-001', 'Y', ''):
+        assert serial not in rules
+
+def test_globs() -> None:
+    """
+        `glob:` rules match the whole serial, with shell style wildcards
+    """
+    rules = IgnoreRules().add('glob:LOANER-*-[AB]?')
+    for serial in ('LOANER-1-A1', 'LOANER--BZ', 'LOANER-x-y-A9'):
+        assert serial in rules
+    for serial in ('LOANER-1-C1', 'LOANER-1-A', 'XLOANER-1-A1', 'LOANER-1-A12', 'loaner-1-a1'):
+        assert serial not in rules
+
+def test_regular_expressions() -> None:
+    """
+        `regex:` rules have to match the whole serial, and an
+        invalid expression is refused when it is added
+    """
+    rules = IgnoreRules().extend(['regex:[0-9]{4}', 'regex:DEMO|SAMPLE'])
+    for serial in ('1234', 'DEMO', 'SAMPLE'):
+        assert serial in rules
+    for serial in ('12345', 'A1234', 'DEMO1', 'XSAMPLE'):
+        assert serial not in rules
+
+    with pytest.raises(re.error):
+        rules.add('regex:([')
+
+def test_rules_added_after_a_check() -> None:
+    """
+        Globs and expressions added after serials were checked are used
+    """
+    rules = IgnoreRules().add('glob:A*')
+    assert 'B1' not in rules
+    rules.add('regex:B[0-9]')
+    assert 'B1' in rules and 'A1' in rules
+
+def test_load(tmp_path: 'pathlib.Path') -> None:
+    """
+        `load` reads a rule per line, skipping blank lines and
+        comments, and a line with an unknown kind is an exact serial
+    """
+    path = tmp_path / 'ignore.txt'
+    path.write_text(
+        '# Serials of loaners\n\nSN1\nprefix:TMP\nglob:*-RMA\nregex:Q[0-9]+\nother:value\nprefix:\n',
+        encoding='utf-8'
+    )
+    rules = IgnoreRules().load(str(path))
+    assert len(rules) == 6
+    for serial in ('SN1', 'TMP42', 'X-RMA', 'Q77', 'other:value', 'prefix:'):
+        assert serial in rules
+    for serial in ('# Serials of loaners', '', 'SN2', 'Q', 'X-RMA1'):
+        assert serial not in rules
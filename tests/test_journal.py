@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Tests that `journal.ImportJournal` keeps the progress of an
+    import, and that a resumed import skips what it records as done
+"""
+
+from journal import ImportJournal
+from record import Record
+
+def test_resume_keeps_done_and_planned(tmp_path: 'pathlib.Path') -> None:
+    """
+        A resumed journal knows the operations that were done, with
+        their ids, and those that were planned but not done.
+        Opening it without resuming starts over
+    """
+    path = str(tmp_path / 'import.journal')
+    journal = ImportJournal(path, batch_size=2)
+    done, planned = ImportJournal.key('asset', 1, 'SN1'), ImportJournal.key('asset', 1, 'SN2')
+    journal.plan([done, planned])
+    journal.complete(done, 10)
+    journal.close()
+
+    journal = ImportJournal(path, resume=True)
+    assert journal.is_done(done) and journal.get(done) == 10
+    assert not journal.is_done(planned) and journal.in_doubt(planned)
+    assert not journal.in_doubt(done)
+    journal.close()
+
+    journal = ImportJournal(path)
+    assert len(journal) == 0 and not journal.unfinished
+    journal.close()
+
+def test_resumed_import_skips_done_lines(tmp_path: 'pathlib.Path') -> None:
+    """
+        A resumed import doesn't queue the line items that its
+        journal has as done, and queues the rest as usual
+    """
+    import app
+
+    spreadsheet = str(tmp_path / 'sheet.csv')
+    workbook = app.ProcessWorkbook(spreadsheet=spreadsheet, asset_catalog_id=1, data_destruction_id=1)
+    done = {'catalog': 1, 'make': 5, 'serial': 'SN1', 'tag': 'T1'}
+    journal = ImportJournal('%s.journal' % (spreadsheet))
+    journal.complete(workbook._line_key('erpwarehouse.asset', done), 10)
+    journal.close()
+
+    workbook = app.ProcessWorkbook(
+        spreadsheet=spreadsheet, asset_catalog_id=1, data_destruction_id=1, resume=True
+    ).open_journal()
+    record = Record(serial='SN1', asset_tag='T1', make='Make', model='Model', device_type='Desktop')
+    workbook._queue_line('erpwarehouse.asset', record, done)
+    workbook._queue_line('erpwarehouse.asset', record, dict(done, serial='SN2'))
+    assert workbook.lines_resumed == 1
+    assert [values['serial'] for _, values in workbook.pending_lines['erpwarehouse.asset']] == ['SN2']
+    workbook.journal.close()
+
+def test_resumed_import_uploads_nothing_again(odoo: 'standin.StandInOdoo', import_sheet: 'function') -> None:
+    """
+        Resuming an import that finished uploads nothing again, even
+        when Odoo no longer has its lines, as the journal has them
+        all as done
+    """
+    rows = [
+        ('SN1', 'T1', 'Parent', 'Make', 'Model A', 'Desktop'),
+        ('HD1', 'T2', 'Child', 'Make', 'Drive', 'Hard Drive'),
+        ('SN2', 'T3', None, 'Make', 'Model B', 'Desktop'),
+    ]
+    first = import_sheet(rows)
+    assert (first.sorting_records_uploaded, first.data_records_uploaded) == (2, 2)
+
+    with odoo.lock:
+        odoo.tables['erpwarehouse.asset'].clear()
+        odoo.tables['erpwarehouse.ddl_item'].clear()
+        odoo.indexes.clear()
+    resumed = import_sheet(rows, resume=True)
+    assert (resumed.sorting_records_uploaded, resumed.data_records_uploaded) == (0, 0)
+    assert resumed.lines_resumed == 4
+    assert not odoo.tables['erpwarehouse.asset'] and not odoo.tables['erpwarehouse.ddl_item']
+
+    again = import_sheet(rows)
+    assert (again.sorting_records_uploaded, again.data_records_uploaded) == (2, 2)
+
+def test_each_sheet_has_its_own_journal(tmp_path: 'pathlib.Path') -> None:
+    """
+        Imports of different sheets of the same workbook, such as two
+        entries of a batch manifest, don't share a journal
+    """
+    import app
+
+    spreadsheet = str(tmp_path / 'workbook.xlsx')
+    paths = list()
+    for sheet in ('Servers', 'Laptops'):
+        workbook = app.ProcessWorkbook(spreadsheet=spreadsheet, sheet=sheet).open_journal()
+        paths.append(workbook.journal.path)
+        workbook.journal.close()
+    assert paths == ['%s.Servers.journal' % (spreadsheet), '%s.Laptops.journal' % (spreadsheet)]
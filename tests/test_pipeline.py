@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Tests for the steps of `ProcessWorkbook.run_pipeline`
+"""
+
+import queue
+
+import pytest
+
+from record import Record
+
+def test_resolve_stage_passes_known_models(odoo: 'standin.StandInOdoo', monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+        Records whose model is known aren't held behind those waiting
+        for a search, and no more than `PIPELINE_QUEUE_SIZE` Records
+        are held at once
+    """
+    # pylint: disable=unused-argument
+    import app
+
+    monkeypatch.setattr(app, 'PIPELINE_QUEUE_SIZE', 3)
+    monkeypatch.setattr(app, 'MODEL_BATCH_SIZE', 100)
+    workbook = app.ProcessWorkbook(asset_catalog_id=1, data_destruction_id=1)
+    workbook.models.resolve(('Make', 'Known'), 7)
+
+    held_sizes = list()
+    resolve_batch = workbook._resolve_batch
+    def spy(batch: list, held: list, resolved: queue.Queue) -> None:
+        held_sizes.append(len(held))
+        resolve_batch(batch, held, resolved)
+    monkeypatch.setattr(workbook, '_resolve_batch', spy)
+
+    parsed, resolved = queue.Queue(), queue.Queue()
+    for number in range(8):
+        model = 'Known' if number % 2 else 'New'
+        parsed.put(Record(serial='SN%d' % (number), asset_tag='T%d' % (number), make='Make', model=model))
+    parsed.put(None)
+    workbook._resolve_stage(parsed, resolved, None, list())
+    workbook.close(summary=False)
+
+    order = [resolved.get_nowait().serial for _ in range(resolved.qsize())]
+    assert order == ['SN1', 'SN3', 'SN0', 'SN2', 'SN4', 'SN5', 'SN6', 'SN7']
+    assert max(held_sizes) == 3
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+
+"""
+    Tests that the readers in `readers.py` number
+    their rows as the file shows them
+"""
+
+import pytest
+
+from readers import Reader, open_reader
+
+def test_reader_is_abstract() -> None:
+    """
+        A reader has to say how its rows are read
+    """
+    with pytest.raises(TypeError):
+        Reader('sheet.csv')
+
+def test_csv_rows_are_numbered_by_line(tmp_path: 'pathlib.Path') -> None:
+    """
+        A row after a quoted value with line breaks is numbered by
+        the line it starts on, not by how many rows came before it
+    """
+    path = tmp_path / 'sheet.csv'
+    path.write_text(
+        'Serial,Asset Tag,Relationship,Make,Model,Type\n'
+        'SN1,T1,,Make,"Model\nwith a note\non three lines",Desktop\n'
+        'SN2,T2,,Make,Model,Desktop\n'
+        '\n'
+        'SN3,T3,,Make,Model,Desktop\n'
+    )
+    reader = open_reader(str(path), first_row=2)
+    numbers = list()
+    for row in reader:
+        numbers.append((reader.row_number, row[0]))
+    reader.close()
+    assert numbers == [(2, 'SN1'), (5, 'SN2'), (7, 'SN3')]
+
+    reader = open_reader(str(path), first_row=5, last_row=5)
+    assert [row[0] for row in reader] == ['SN2']
+    reader.close()
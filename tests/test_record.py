@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Part of XLSX to Odoo import
+# Copyright 2020 David Todd <dtodd@oceantech.com>
+# License: MIT License, refer to `license.md` for more information
+
+# pylint: disable=import-error
+# pylint: disable=import-outside-toplevel
+
+"""
+    Tests for the serial index of `record.RecordList`, and the
+    duplicate detection of `ProcessWorkbook.build_record_list`
+"""
+
+import pytest
+
+from record import Record, RecordList
+
+def make_record(serial: str) -> Record:
+    """
+        Returns a Record with `serial` and placeholder fields
+    """
+    return Record(serial=serial, asset_tag='TAG', make='Make', model='Model', device_type='Desktop')
+
+def make_rows(count: int) -> list:
+    """
+        Returns `count` spreadsheet rows where every fifth row is a
+        Parent followed by a Child drive, and every hundredth row
+        repeats an earlier serial, then two rows with an ignored serial
+    """
+    rows = list()
+    for number in range(count):
+        relationship = 'Parent' if number % 5 == 0 else 'Child' if number % 5 == 1 else None
+        rows.append((
+            'SN%08d' % (number - 50 if number % 100 == 99 else number),
+            'TAG%08d' % (number),
+            relationship,
+            'Make%d' % (number % 7),
+            'Model%d' % (number % 250),
+            'Hard Drive' if relationship == 'Child' else 'Desktop',
+        ))
+    return rows + [('N/A', 'TAG', None, 'Make', 'Model', 'Desktop')] * 2
+
+def walk(records: RecordList) -> 'iterator':
+    """
+        Replaces `RecordList.__iter__` in the tests that must not walk
+        a list, which only new, empty lists are allowed to do
+    """
+    if records:
+        raise AssertionError('a list of %d Records was walked' % (len(records)))
+    return list.__iter__(records)
+
+def test_index_follows_every_change() -> None:
+    """
+        Every method that adds or removes Records keeps the index in step
+    """
+    records = RecordList([make_record('A'), make_record('B')])
+    assert records.has_serial('A') and not records.has_serial('C')
+
+    records.append(make_record('C'))
+    records.insert(0, make_record('A'))
+    records.extend([make_record('D')])
+    records += [make_record('E')]
+    assert all(records.has_serial(serial) for serial in 'ABCDE')
+
+    # 'A' is in there twice, so removing one leaves the other
+    records.remove(records[0])
+    assert records.has_serial('A')
+    records.remove(records[0])
+    assert not records.has_serial('A')
+
+    records.pop()
+    assert not records.has_serial('E')
+    records[0] = make_record('F')
+    assert records.has_serial('F') and not records.has_serial('B')
+    records[1:3] = [make_record('G')]
+    assert records.has_serial('G') and not records.has_serial('C') and not records.has_serial('D')
+    del records[0]
+    assert not records.has_serial('F')
+    assert records.serials == {'G': 1}
+
+    records.clear()
+    assert not records.has_serial('G')
+
+def test_lookups_do_not_walk_the_list(monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+        Once the index is built, adding Records and checking serials
+        never iterates over the list, so each check takes the same
+        time however many Records there are
+    """
+    records = RecordList(make_record('SN%d' % (number)) for number in range(1000))
+    assert records.has_serial('SN0')
+    monkeypatch.setattr(RecordList, '__iter__', walk)
+
+    for number in range(1000, 2000):
+        assert not records.has_serial('SN%d' % (number))
+        records.append(make_record('SN%d' % (number)))
+        assert records.has_serial('SN%d' % (number))
+
+def test_build_record_list_is_linear(tmp_path: 'pathlib.Path', monkeypatch: pytest.MonkeyPatch) -> None:
+    """
+        Reading a sheet checks each serial against the index of the
+        Records read so far without walking them, so the work per row
+        doesn't grow with the sheet. Repeated serials are still
+        caught, unless they are ignored
+    """
+    import app
+    from openpyxl import Workbook
+
+    rows = make_rows(2000)
+    spreadsheet = str(tmp_path / 'sheet.xlsx')
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet')
+    sheet.append(('Serial', 'Asset Tag', 'Relationship', 'Make', 'Model', 'Type'))
+    for row in rows:
+        sheet.append(row)
+    workbook.save(spreadsheet)
+
+    process = app.ProcessWorkbook(spreadsheet=spreadsheet, sheet='Sheet')
+    with monkeypatch.context() as patch:
+        patch.setattr(RecordList, '__iter__', walk)
+        process.build_record_list()
+    process.close(summary=False)
+
+    # 400 Child rows, 20 repeated serials, and both ignored serials are kept
+    assert len(process.records) == 2002 - 400 - 20
+    assert sum(len(record.children or ()) for record in process.records) == 400
+    assert process.rows_failed == 20
+    assert [record.serial for record in process.records[-2:]] == ['N/A', 'N/A']
+
+def test_duplicate_serials_fail_their_row(write_sheet: 'function') -> None:
+    """
+        A serial that a Record already has is reported as a failed
+        row, rather than creating a second Record or child, unless
+        the serial is ignored
+    """
+    import app
+
+    spreadsheet = write_sheet([
+        ('SN1', 'T1', 'Parent', 'Make', 'Model', 'Desktop'),
+        ('HD1', 'T2', 'Child', 'Make', 'Drive', 'Hard Drive'),
+        ('SN1', 'T3', 'Child', 'Make', 'Drive', 'Hard Drive'),
+        ('SN2', 'T4', None, 'Make', 'Model', 'Desktop'),
+        ('SN1', 'T5', None, 'Make', 'Model', 'Desktop'),
+        ('N/A', 'T6', None, 'Make', 'Model', 'Desktop'),
+        ('N/A', 'T7', None, 'Make', 'Model', 'Desktop'),
+    ])
+    workbook = app.ProcessWorkbook(
+        spreadsheet=spreadsheet, ignore_csv=spreadsheet.replace('.csv', '-ignored.csv')
+    )
+    workbook.build_record_list()
+    workbook.close(summary=False)
+
+    assert [record.serial for record in workbook.records] == ['SN1', 'SN2', 'N/A', 'N/A']
+    assert [child.serial for child in workbook.records[0].children] == ['HD1']
+    assert workbook.rows_failed == 2
+    with open(workbook.failed_csv_path) as failed:
+        assert failed.read().count('duplicate serial') == 2